@@ -60,7 +60,7 @@ if errorlevel 1 (
     pip install customtkinter>=5.2.0
     
     echo Installing yt-dlp...
-    pip install yt-dlp>=2023.7.6
+    pip install yt-dlp>=2024.3.10
     
     echo Installing Pillow...
     pip install Pillow>=10.0.0
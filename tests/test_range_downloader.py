@@ -0,0 +1,195 @@
+"""
+分段下載測試 - 在本機啟動支持 Range 請求的 HTTP 服務器驅動 RangeFD
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import yt_dlp
+from yt_dlp.utils import DownloadCancelled
+
+from youtube_downloader.core import range_downloader
+from youtube_downloader.core.range_downloader import RangeFD
+
+# 測試用的分段大小、最小文件大小及讀取塊大小，使小文件也走分段下載
+CHUNK_SIZE = 64 * 1024
+MIN_SIZE = 128 * 1024
+BLOCK_SIZE = 16 * 1024
+
+# 測試文件: 16 個分段加半個分段
+DATA = bytes(i % 251 for i in range(CHUNK_SIZE * 16 + CHUNK_SIZE // 2))
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """
+    按服務器的 mode 返回數據: range 支持 Range 請求，ignore_range 總是返回 200，
+    truncate 對從分段起點開始的首次請求只返回一半
+    """
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        server = self.server
+        start, end = 0, len(DATA) - 1
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range') or '')
+        with server.lock:
+            server.requests.append(self.headers.get('Range'))
+        
+        if match is None or server.mode == 'ignore_range':
+            self.send_response(200)
+        else:
+            start = int(match[1])
+            end = min(int(match[2]), end) if match[2] else end
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(DATA)}')
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        
+        body = DATA[start:end + 1]
+        if server.mode == 'truncate' and match is not None and end > start and start % CHUNK_SIZE == 0:
+            with server.lock:
+                first = start not in server.truncated
+                server.truncated.add(start)
+            if first:
+                # 聲明完整長度但只發送一半後斷開連接
+                body = body[:len(body) // 2]
+                self.close_connection = True
+        
+        with server.lock:
+            server.served += len(body)
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+
+class RangeFDTest(unittest.TestCase):
+    """RangeFD 分段下載測試"""
+    
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _RangeHandler)
+        self.server.daemon_threads = True
+        self.server.handle_error = lambda request, client_address: None
+        self.server.lock = threading.Lock()
+        self.server.mode = 'range'
+        self.server.requests = []
+        self.server.truncated = set()
+        self.server.served = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'video.mp4')
+        self.url = f'http://127.0.0.1:{self.server.server_port}/video.mp4'
+        
+        patcher = mock.patch.multiple(
+            range_downloader, RANGE_CHUNK_SIZE=CHUNK_SIZE, RANGE_MIN_SIZE=MIN_SIZE, BLOCK_SIZE=BLOCK_SIZE
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def _download(self, hook=None):
+        """
+        以 RangeFD 下載測試文件
+        
+        Args:
+            hook (function): 額外的進度回調
+        
+        Returns:
+            list: 收到的進度回調字典
+        """
+        statuses = []
+        ydl = yt_dlp.YoutubeDL({'quiet': True, 'noprogress': True, 'retries': 3})
+        self.addCleanup(ydl.close)
+        fd = RangeFD(ydl, ydl.params)
+        fd.add_progress_hook(lambda d: statuses.append(dict(d)))
+        if hook is not None:
+            fd.add_progress_hook(hook)
+        info_dict = {'url': self.url, 'protocol': 'http', 'ext': 'mp4', 'http_headers': {}}
+        self.assertTrue(fd.download(self.filename, info_dict)[0])
+        return statuses
+    
+    def _read_output(self):
+        with open(self.filename, 'rb') as f:
+            return f.read()
+    
+    def test_full_download(self):
+        statuses = self._download()
+        
+        self.assertEqual(self._read_output(), DATA)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['video.mp4'])
+        self.assertEqual(statuses[-1]['status'], 'finished')
+        self.assertTrue(any(d.get('connections') for d in statuses if d['status'] == 'downloading'))
+        self.assertEqual(self.server.served, len(DATA) + 1)
+    
+    def test_resume_after_completed_chunks(self):
+        def cancel(d):
+            if d['status'] == 'downloading' and d['downloaded_bytes'] >= CHUNK_SIZE * 4:
+                raise DownloadCancelled()
+        
+        with self.assertRaises(DownloadCancelled):
+            self._download(cancel)
+        state_file = self.filename + '.ytdl'
+        self.assertTrue(os.path.isfile(state_file))
+        self.assertTrue(os.path.isfile(self.filename + '.part'))
+        
+        self.server.served = 0
+        statuses = self._download()
+        
+        self.assertEqual(self._read_output(), DATA)
+        self.assertFalse(os.path.exists(state_file))
+        # 續傳時只重新下載未完成的分段
+        self.assertLess(self.server.served, len(DATA))
+        first = next(d for d in statuses if d['status'] == 'downloading')
+        self.assertGreaterEqual(first['downloaded_bytes'], CHUNK_SIZE)
+    
+    def test_resume_single_connection_part(self):
+        # 單連接下載留下的 .part 文件 (沒有 .ytdl 記錄) 不能被截斷
+        prefix = CHUNK_SIZE * 5 + 100
+        with open(self.filename + '.part', 'wb') as f:
+            f.write(DATA[:prefix])
+        
+        self._download()
+        
+        self.assertEqual(self._read_output(), DATA)
+        self.assertEqual(self.server.served, len(DATA) - CHUNK_SIZE * 5 + 1)
+    
+    def test_server_ignoring_range_falls_back(self):
+        self.server.mode = 'ignore_range'
+        
+        statuses = self._download()
+        
+        self.assertEqual(self._read_output(), DATA)
+        self.assertEqual(self.server.requests[0], 'bytes=0-0')
+        # 探測後由 HttpFD 以單個請求下載
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertFalse(any('connections' in d for d in statuses))
+    
+    def test_truncated_response_is_retried(self):
+        self.server.mode = 'truncate'
+        
+        statuses = self._download()
+        
+        self.assertEqual(self._read_output(), DATA)
+        # 重試從已寫入的位置繼續，不重新下載已收到的數據
+        self.assertIn(f'bytes={CHUNK_SIZE // 2}-{CHUNK_SIZE - 1}', self.server.requests)
+        self.assertEqual(self.server.served, len(DATA) + 1)
+        self.assertEqual(statuses[-1]['status'], 'finished')
+
+
+if __name__ == '__main__':
+    unittest.main()
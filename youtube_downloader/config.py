@@ -22,6 +22,128 @@ DEFAULT_THUMBNAIL = os.path.join(ASSETS_DIR, "default_thumbnail.png")
 # 默認下載目錄
 DEFAULT_DOWNLOAD_DIR = os.path.join(os.path.expanduser("~"), "Downloads")
 
+# 同時進行的下載任務數的初始值 (之後由並發控制器按吞吐量及錯誤率調整)
+MAX_CONCURRENT_DOWNLOADS = 3
+
+# 下載連接超時 (秒)，同時限制取消操作生效前的最長等待時間
+DOWNLOAD_SOCKET_TIMEOUT = 20
+
+# 每個下載任務每秒最多發送的進度更新次數
+PROGRESS_UPDATE_HZ = 10
+
+# 沒有 expire 參數時，流 URL 的默認有效期 (秒)
+STREAM_URL_TTL = 3600
+
+# 流 URL 在到期前多少秒即視為過期，需要重新提取
+STREAM_EXPIRY_MARGIN = 300
+
+# 影片信息緩存的最大條目數
+METADATA_CACHE_MAX_ENTRIES = 500
+
+# 影片標題、時長等靜態信息的緩存有效期 (秒)
+METADATA_STATIC_TTL = 7 * 24 * 3600
+
+# 播放列表中並行提取影片詳細信息的線程數
+PLAYLIST_DETAIL_WORKERS = 8
+
+# 提取單個播放列表影片詳細信息的超時時間 (秒)
+PLAYLIST_DETAIL_TIMEOUT = 30
+
+# 播放列表快速列表模式: 只使用平面提取結果，影片詳細信息在需要時才獲取
+PLAYLIST_FAST_LISTING = True
+
+# 邊列出邊下載播放列表時，等待下載的條目隊列上限
+PLAYLIST_STREAM_QUEUE_SIZE = 20
+
+# 播放列表批量下載的總帶寬上限 (字節/秒)，由同一播放列表的任務共用，None 表示不限速
+PLAYLIST_RATE_LIMIT = None
+
+# 同步多個播放列表或頻道時，同時列出與同步的播放列表數
+SYNC_MAX_CONCURRENT_PLAYLISTS = 4
+
+# 播放列表窗口影片列表同時顯示的行數
+PLAYLIST_VISIBLE_ROWS = 12
+
+# 播放列表窗口影片標題的最大顯示長度，超出部分截斷
+PLAYLIST_TITLE_MAX_CHARS = 70
+
+# 下載存檔布隆過濾器的預計容量 (影片 ID、格式、品質組合數)
+ARCHIVE_BLOOM_CAPACITY = 1000000
+
+# 後台持久化寫入的定時間隔 (秒)
+PERSIST_FLUSH_INTERVAL = 1.0
+
+# 排隊的持久化寫入請求達到此數量時立即寫入
+PERSIST_MAX_PENDING = 200
+
+# 歷史記錄窗口每頁顯示的記錄數
+HISTORY_PAGE_SIZE = 50
+
+# 歷史記錄搜索框停止輸入後多久開始搜索 (毫秒)
+HISTORY_SEARCH_DEBOUNCE_MS = 300
+
+# 後台檢查文件是否存在的線程數
+FILE_STATUS_WORKERS = 8
+
+# 文件檢查結果的緩存有效期 (秒)
+FILE_STATUS_CACHE_TTL = 60
+
+# 同一磁盤或網絡共享上同時進行的最大文件檢查數
+FILE_STATUS_PER_MOUNT = 2
+
+# 界面事件總線的輪詢間隔 (毫秒)
+UI_FRAME_INTERVAL_MS = 33
+
+# 界面事件總線每幀最多分發的事件數
+UI_MAX_EVENTS_PER_FRAME = 50
+
+# 保留原始音頻流的品質選項 (不轉碼為 MP3，只更換容器)
+NATIVE_AUDIO_QUALITY = "原始音質 (m4a/opus)"
+
+# 後處理線程池大小 (同時執行的合併、音頻轉碼及嵌入縮圖任務數)
+POSTPROCESS_WORKERS = max(1, os.cpu_count() or 1)
+
+# 所有下載任務共用的全局帶寬上限 (字節/秒)，None 表示不限速
+BANDWIDTH_LIMIT = None
+
+# 按時段的全局帶寬上限 [(開始時間, 結束時間, 字節/秒), ...]，時段以外使用 BANDWIDTH_LIMIT
+# 例如工作時間限速 5MB/s、其餘時間全速: [("09:00", "18:00", 5 * 1024 * 1024)]
+BANDWIDTH_SCHEDULE = []
+
+# 帶寬限速的突發容量 (秒)，允許短時間超出上限的數據量為 上限 × 突發容量
+BANDWIDTH_BURST_SECONDS = 0.5
+
+# 多連接分段下載: 大於此大小 (字節) 的單文件流才分段並行下載
+RANGE_MIN_SIZE = 8 * 1024 * 1024
+
+# 多連接分段下載: 每個分段的大小 (字節)
+RANGE_CHUNK_SIZE = 4 * 1024 * 1024
+
+# 多連接分段下載: 初始連接數及每個任務的最大連接數 (實際連接數按觀察到的吞吐量調整)
+RANGE_INITIAL_CONNECTIONS = 2
+RANGE_MAX_CONNECTIONS = 8
+
+# 多連接分段下載: 調整連接數的採樣間隔 (秒)，及增加連接所需的最低吞吐量增幅
+RANGE_TUNE_INTERVAL = 1.0
+RANGE_GAIN_THRESHOLD = 0.1
+
+# DASH/HLS 分片流同時下載的分片數
+FRAGMENT_CONCURRENCY = 4
+
+# 並發控制器: 所有下載管理器合計同時進行的下載任務數的範圍
+CONCURRENCY_MIN_JOBS = 1
+CONCURRENCY_MAX_JOBS = 8
+
+# 並發控制器: 採樣吞吐量及錯誤率並作出調整的間隔 (秒)
+CONCURRENCY_SAMPLE_INTERVAL = 5.0
+
+# 並發控制器: 增加任務數所需的最低吞吐量增幅，及錯誤或限流時任務數的縮減比例
+CONCURRENCY_GAIN_THRESHOLD = 0.1
+CONCURRENCY_DECREASE_FACTOR = 0.5
+
+# 並發控制器: 採樣間隔內失敗任務所佔比例達到此值時縮減任務數
+CONCURRENCY_ERROR_RATE = 0.3
+
 # 默認設置
 DEFAULT_SETTINGS = {
     "format": "mp3",
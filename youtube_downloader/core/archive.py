@@ -0,0 +1,310 @@
+"""
+下載存檔模塊 - 記錄已下載的影片 (影片 ID、格式、品質)，下載前即可判斷是否已下載過
+"""
+import os
+import math
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+from youtube_downloader.config import ARCHIVE_BLOOM_CAPACITY
+from .persistence import get_persistence_writer
+
+
+class BloomFilter:
+    """布隆過濾器 - 以位數組快速排除未下載過的影片，不存在誤判為「不存在」的情況"""
+    
+    def __init__(self, capacity, error_rate=0.01):
+        """
+        初始化布隆過濾器
+        
+        Args:
+            capacity (int): 預計存放的鍵數量
+            error_rate (float): 期望的誤判率
+        """
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        # 已添加的鍵數量 (重複添加也計入)，超過容量後誤判率會上升
+        self.count = 0
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, key):
+        """
+        計算鍵對應的位位置 (雙重哈希)
+        
+        Args:
+            key (str): 鍵
+        
+        Returns:
+            generator: 位位置
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+    
+    def add(self, key):
+        """
+        添加鍵
+        
+        Args:
+            key (str): 鍵
+        """
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, key):
+        for position in self._positions(key):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class DownloadArchive:
+    """
+    下載存檔類 - 布隆過濾器加 SQLite 精確存儲，不受歷史記錄數量上限影響
+    
+    新增與移除的記錄由後台持久化寫入線程批量寫入數據庫，
+    寫入前的記錄保存在內存中，查詢時優先讀取。
+    """
+    
+    def __init__(self, db_file=None, bloom_capacity=ARCHIVE_BLOOM_CAPACITY):
+        """
+        初始化下載存檔
+        
+        Args:
+            db_file (str): 數據庫文件路徑
+            bloom_capacity (int): 布隆過濾器的初始容量，條目超過容量時會以兩倍容量重建
+        """
+        if not db_file:
+            # 默認數據庫文件位於用戶主目錄下
+            archive_dir = os.path.join(os.path.expanduser("~"), ".youtube_downloader")
+            os.makedirs(archive_dir, exist_ok=True)
+            db_file = os.path.join(archive_dir, "download_archive.db")
+        
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._writer = get_persistence_writer()
+        # 尚未寫入數據庫的變更: 鍵 -> 存檔記錄，None 表示已移除
+        self._pending = {}
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS archive ("
+            "video_id TEXT NOT NULL, "
+            "format TEXT NOT NULL, "
+            "quality TEXT NOT NULL, "
+            "file_path TEXT, "
+            "title TEXT, "
+            "downloaded_at INTEGER, "
+            "PRIMARY KEY (video_id, format, quality)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+        
+        count = self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+        self._bloom = self._build_bloom(max(bloom_capacity, count * 2))
+    
+    def _build_bloom(self, capacity):
+        """
+        以數據庫及尚未寫入的記錄構建布隆過濾器
+        
+        Args:
+            capacity (int): 布隆過濾器的容量
+        
+        Returns:
+            BloomFilter: 布隆過濾器
+        """
+        bloom = BloomFilter(capacity)
+        for video_id, format_option, quality_option in self._conn.execute(
+                "SELECT video_id, format, quality FROM archive"):
+            bloom.add(self._key(video_id, format_option, quality_option))
+        for key, record in self._pending.items():
+            if record:
+                bloom.add(key)
+        return bloom
+    
+    @staticmethod
+    def _key(video_id, format_option, quality_option):
+        """
+        構建布隆過濾器的鍵
+        
+        Args:
+            video_id (str): 影片 ID
+            format_option (str): 格式
+            quality_option (str): 品質
+        
+        Returns:
+            str: 鍵
+        """
+        return f"{video_id}\x1f{format_option}\x1f{quality_option}"
+    
+    def get(self, video_id, format_option, quality_option):
+        """
+        獲取存檔記錄
+        
+        Args:
+            video_id (str): 影片 ID
+            format_option (str): 格式
+            quality_option (str): 品質
+        
+        Returns:
+            dict: 存檔記錄 (file_path, title, downloaded_at)，未下載過時返回 None
+        """
+        key = self._key(video_id, format_option, quality_option)
+        if not video_id or key not in self._bloom:
+            return None
+        
+        with self._lock:
+            if key in self._pending:
+                record = self._pending[key]
+                return dict(record) if record else None
+            row = self._conn.execute(
+                "SELECT file_path, title, downloaded_at FROM archive "
+                "WHERE video_id = ? AND format = ? AND quality = ?",
+                (video_id, format_option, quality_option)
+            ).fetchone()
+        
+        if not row:
+            return None
+        return {'file_path': row[0], 'title': row[1], 'downloaded_at': row[2]}
+    
+    def contains(self, video_id, format_option, quality_option):
+        """
+        檢查影片是否已以指定格式與品質下載過
+        
+        Args:
+            video_id (str): 影片 ID
+            format_option (str): 格式
+            quality_option (str): 品質
+        
+        Returns:
+            bool: 是否已下載過
+        """
+        return self.get(video_id, format_option, quality_option) is not None
+    
+    def add(self, video_id, format_option, quality_option, file_path, title=''):
+        """
+        添加存檔記錄
+        
+        Args:
+            video_id (str): 影片 ID
+            format_option (str): 格式
+            quality_option (str): 品質
+            file_path (str): 輸出文件路徑
+            title (str): 影片標題
+        """
+        if not video_id:
+            return
+        
+        key = self._key(video_id, format_option, quality_option)
+        record = {'file_path': file_path, 'title': title, 'downloaded_at': int(time.time())}
+        with self._lock:
+            self._pending[key] = record
+            self._bloom.add(key)
+            if self._bloom.count > self._bloom.capacity:
+                # 條目超過容量，以兩倍容量重建，重建完成前查詢仍使用舊的過濾器
+                self._bloom = self._build_bloom(self._bloom.capacity * 2)
+        self._writer.submit(self, ('add', (video_id, format_option, quality_option), record))
+    
+    def remove(self, video_id, format_option, quality_option):
+        """
+        移除存檔記錄 (布隆過濾器無法刪除，之後的查詢會由精確存儲排除)
+        
+        Args:
+            video_id (str): 影片 ID
+            format_option (str): 格式
+            quality_option (str): 品質
+        """
+        key = self._key(video_id, format_option, quality_option)
+        with self._lock:
+            self._pending[key] = None
+        self._writer.submit(self, ('remove', (video_id, format_option, quality_option), None))
+    
+    def write_batch(self, items):
+        """
+        批量寫入存檔變更 (由持久化寫入線程調用，一批變更一個事務)
+        
+        Args:
+            items (list): (操作, (影片 ID, 格式, 品質), 存檔記錄) 列表
+        """
+        with self._lock:
+            for action, ids, record in items:
+                if action == 'add':
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO archive "
+                        "(video_id, format, quality, file_path, title, downloaded_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        ids + (record['file_path'], record['title'], record['downloaded_at'])
+                    )
+                else:
+                    self._conn.execute(
+                        "DELETE FROM archive WHERE video_id = ? AND format = ? AND quality = ?",
+                        ids
+                    )
+            self._conn.commit()
+            
+            # 已寫入的變更不再需要保存在內存中 (期間又有新變更的鍵保留)
+            for action, ids, record in items:
+                key = self._key(*ids)
+                if key in self._pending and self._pending[key] is record:
+                    del self._pending[key]
+    
+    def link_existing(self, video_id, format_option, quality_option, output_path):
+        """
+        若影片已下載過且文件仍存在，將其硬連結到輸出目錄 (跨磁盤時改為複製)
+        
+        Args:
+            video_id (str): 影片 ID
+            format_option (str): 格式
+            quality_option (str): 品質
+            output_path (str): 輸出目錄
+        
+        Returns:
+            dict: 存檔記錄，file_path 為輸出目錄中的文件路徑；無可用文件時返回 None
+        """
+        record = self.get(video_id, format_option, quality_option)
+        if not record:
+            return None
+        
+        source = record['file_path']
+        if not source or not os.path.exists(source):
+            # 文件已被移動或刪除，需要重新下載
+            self.remove(video_id, format_option, quality_option)
+            return None
+        
+        target = os.path.join(output_path, os.path.basename(source)) if output_path else source
+        if not os.path.exists(target):
+            try:
+                os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+                try:
+                    os.link(source, target)
+                except OSError:
+                    shutil.copy2(source, target)
+            except Exception as e:
+                print(f"無法連結已下載的文件: {source} -> {target}, {str(e)}")
+                return None
+        
+        return dict(record, file_path=target)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_download_archive():
+    """
+    獲取進程內共享的下載存檔實例
+    
+    Returns:
+        DownloadArchive: 下載存檔
+    """
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = DownloadArchive()
+        return _archive
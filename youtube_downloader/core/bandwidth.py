@@ -0,0 +1,254 @@
+"""
+帶寬控制模塊 - 所有下載線程共用的令牌桶限速器，支持全局、分組及單任務上限與按時段限速
+"""
+import time
+import itertools
+import threading
+from datetime import datetime
+
+from youtube_downloader.config import BANDWIDTH_LIMIT, BANDWIDTH_SCHEDULE, BANDWIDTH_BURST_SECONDS
+
+
+def parse_schedule(schedule):
+    """
+    解析限速時段表
+    
+    Args:
+        schedule (list): [(開始時間, 結束時間, 上限), ...]，時間為 "HH:MM"，
+            上限為字節/秒 (None 表示不限速)；結束時間早於開始時間表示跨越午夜
+    
+    Returns:
+        list: [(開始分鐘, 結束分鐘, 上限), ...]
+    """
+    parsed = []
+    for start, end, rate_limit in schedule or ():
+        start_hour, start_minute = (int(part) for part in start.split(':'))
+        end_hour, end_minute = (int(part) for part in end.split(':'))
+        parsed.append((start_hour * 60 + start_minute, end_hour * 60 + end_minute, rate_limit))
+    return parsed
+
+
+class _RateClock:
+    """
+    單個令牌桶 (以虛擬時鐘實現)
+    
+    每消耗 n 字節，理論到達時間向後推移 n / rate 秒；
+    理論到達時間超前當前時間超過突發容量時，調用方需等待超出的部分。
+    """
+    
+    def __init__(self, rate_limit):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate_limit (int): 速度上限 (字節/秒)，None 表示不限速
+        """
+        self.rate_limit = rate_limit
+        self.tat = 0.0
+    
+    def reserve(self, nbytes, now, burst):
+        """
+        消耗令牌
+        
+        Args:
+            nbytes (int): 已傳輸的字節數
+            now (float): 當前時間 (time.monotonic)
+            burst (float): 突發容量 (秒)
+        
+        Returns:
+            float: 需要等待的時間 (秒)
+        """
+        if not self.rate_limit:
+            self.tat = now
+            return 0.0
+        self.tat = max(self.tat, now) + nbytes / self.rate_limit
+        return max(0.0, self.tat - now - burst)
+
+
+class BandwidthGovernor:
+    """
+    帶寬控制器
+    
+    下載線程在進度回調中報告已傳輸的字節數，超出上限時在回調中休眠以限制速度。
+    全局令牌桶由所有進行中的任務共用：任務越多每個任務分到的帶寬越少，
+    任務結束後不再消耗令牌，剩餘任務自動分到其空出的帶寬。
+    同一分組 (如一次播放列表下載) 的任務另外共用分組上限，單個任務也可設置自己的上限。
+    """
+    
+    def __init__(self, rate_limit=BANDWIDTH_LIMIT, schedule=BANDWIDTH_SCHEDULE, burst=BANDWIDTH_BURST_SECONDS):
+        """
+        初始化帶寬控制器
+        
+        Args:
+            rate_limit (int): 時段表以外的全局上限 (字節/秒)，None 表示不限速
+            schedule (list): 限速時段表 [("09:00", "18:00", 5 * 1024 * 1024), ...]
+            burst (float): 突發容量 (秒)，允許短時間超出上限的數據量為 上限 × burst
+        """
+        self.rate_limit = rate_limit
+        self.schedule = parse_schedule(schedule)
+        self.burst = burst
+        self._global = _RateClock(rate_limit)
+        self._groups = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._throttled_seconds = 0.0
+        self._transferred_bytes = 0
+    
+    def set_rate_limit(self, rate_limit, schedule=None):
+        """
+        設置全局上限及時段表，立即對進行中的任務生效
+        
+        Args:
+            rate_limit (int): 時段表以外的全局上限 (字節/秒)，None 表示不限速
+            schedule (list): 限速時段表，為 None 時保持不變
+        """
+        with self._lock:
+            self.rate_limit = rate_limit
+            if schedule is not None:
+                self.schedule = parse_schedule(schedule)
+    
+    def get_rate_limit(self, now=None):
+        """
+        獲取當前時段的全局上限
+        
+        Args:
+            now (datetime): 時間，為 None 時使用當前時間
+        
+        Returns:
+            int: 全局上限 (字節/秒)，None 表示不限速
+        """
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, rate_limit in self.schedule:
+            if start <= end:
+                if start <= minute < end:
+                    return rate_limit
+            elif minute >= start or minute < end:
+                return rate_limit
+        return self.rate_limit
+    
+    def set_group_limit(self, group, rate_limit):
+        """
+        設置分組上限 (同一分組的任務共用)
+        
+        Args:
+            group (str): 分組名稱
+            rate_limit (int): 分組上限 (字節/秒)，None 表示移除分組上限
+        """
+        with self._lock:
+            if rate_limit:
+                clock = self._groups.get(group)
+                if clock is None:
+                    self._groups[group] = _RateClock(rate_limit)
+                else:
+                    clock.rate_limit = rate_limit
+            else:
+                self._groups.pop(group, None)
+    
+    def register(self, job_key, rate_limit=None, group=None):
+        """
+        登記開始傳輸的任務
+        
+        Args:
+            job_key: 任務鍵
+            rate_limit (int): 單個任務的上限 (字節/秒)，None 表示只受全局及分組上限限制
+            group (str): 所屬分組
+        """
+        with self._lock:
+            self._jobs[job_key] = (_RateClock(rate_limit), group)
+    
+    def unregister(self, job_key):
+        """
+        移除已結束傳輸的任務，其帶寬由其他任務分享
+        
+        Args:
+            job_key: 任務鍵
+        """
+        with self._lock:
+            self._jobs.pop(job_key, None)
+    
+    def consume(self, job_key, nbytes, cancel_event=None):
+        """
+        報告已傳輸的字節數，超出上限時阻塞調用線程
+        
+        Args:
+            job_key: 任務鍵
+            nbytes (int): 自上次報告以來傳輸的字節數
+            cancel_event (threading.Event): 取消令牌，設置後立即結束等待
+        
+        Returns:
+            float: 等待的時間 (秒)
+        """
+        if nbytes <= 0:
+            return 0.0
+        
+        with self._lock:
+            now = time.monotonic()
+            self._global.rate_limit = self.get_rate_limit()
+            delay = self._global.reserve(nbytes, now, self.burst)
+            
+            job = self._jobs.get(job_key)
+            if job is not None:
+                job_clock, group = job
+                delay = max(delay, job_clock.reserve(nbytes, now, self.burst))
+                group_clock = self._groups.get(group)
+                if group_clock is not None:
+                    delay = max(delay, group_clock.reserve(nbytes, now, self.burst))
+            
+            self._transferred_bytes += nbytes
+            self._throttled_seconds += delay
+        
+        if delay > 0:
+            if cancel_event is not None:
+                cancel_event.wait(delay)
+            else:
+                time.sleep(delay)
+        return delay
+    
+    def get_metrics(self):
+        """
+        獲取帶寬控制統計
+        
+        Returns:
+            dict: 當前全局上限 rate_limit、進行中的任務數 active_jobs、
+                累計傳輸字節數 transferred_bytes 及累計限速等待時間 throttled_seconds
+        """
+        with self._lock:
+            return {
+                'rate_limit': self.get_rate_limit(),
+                'active_jobs': len(self._jobs),
+                'transferred_bytes': self._transferred_bytes,
+                'throttled_seconds': self._throttled_seconds,
+            }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+_group_ids = itertools.count(1)
+
+
+def new_group_name(prefix):
+    """
+    生成進程內唯一的帶寬分組名稱 (不使用 id()，避免新對象沿用已釋放對象的分組及其令牌欠額)
+    
+    Args:
+        prefix (str): 名稱前綴
+    
+    Returns:
+        str: 分組名稱
+    """
+    return f"{prefix}:{next(_group_ids)}"
+
+
+def get_bandwidth_governor():
+    """
+    獲取進程內共享的帶寬控制器
+    
+    Returns:
+        BandwidthGovernor: 帶寬控制器
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = BandwidthGovernor()
+        return _governor
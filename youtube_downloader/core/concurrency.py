@@ -0,0 +1,318 @@
+"""
+並發控制模塊 - 按吞吐量及錯誤率以 AIMD (加性增、乘性減) 調整同時下載的任務數及連接數
+"""
+import time
+import threading
+from collections import deque
+
+from youtube_downloader.config import (
+    MAX_CONCURRENT_DOWNLOADS, CONCURRENCY_MIN_JOBS, CONCURRENCY_MAX_JOBS, CONCURRENCY_SAMPLE_INTERVAL,
+    CONCURRENCY_GAIN_THRESHOLD, CONCURRENCY_DECREASE_FACTOR, CONCURRENCY_ERROR_RATE, RANGE_MAX_CONNECTIONS
+)
+from .bandwidth import get_bandwidth_governor
+
+# 表示服務器限流或拒絕的錯誤信息
+THROTTLE_MARKERS = ('HTTP Error 429', 'HTTP Error 403', 'Too Many Requests')
+
+# 表示網絡或服務器暫時性故障的錯誤信息 (小寫)，影片不可用、私人影片等錯誤與並發數無關
+TRANSIENT_MARKERS = (
+    'http error 5', 'timed out', 'timeout', 'connection', 'temporary failure', 'name resolution',
+    'failed to resolve', 'network is unreachable', 'remote end closed', 'incompleteread',
+    'bytes read', 'ssl', 'urlopen error'
+)
+
+# 保留的最近調整記錄數
+DECISION_HISTORY = 50
+
+
+def is_throttle_error(error):
+    """
+    判斷錯誤信息是否為服務器限流 (429) 或拒絕 (403)
+    
+    Args:
+        error (str): 錯誤信息
+    
+    Returns:
+        bool: 是否為限流錯誤
+    """
+    return any(marker in (error or '') for marker in THROTTLE_MARKERS)
+
+
+def is_transient_error(error):
+    """
+    判斷錯誤信息是否為限流或網絡、服務器的暫時性故障 (可能因並發過高引起)
+    
+    Args:
+        error (str): 錯誤信息
+    
+    Returns:
+        bool: 是否為暫時性錯誤
+    """
+    lowered = (error or '').lower()
+    return is_throttle_error(error) or any(marker in lowered for marker in TRANSIENT_MARKERS)
+
+
+class AdjustableSemaphore:
+    """上限可在運行中調整的信號量，降低上限時已進入的任務不受影響，之後的任務等待名額"""
+    
+    def __init__(self, limit):
+        """
+        初始化信號量
+        
+        Args:
+            limit (int): 上限
+        """
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+    
+    def acquire(self, timeout=None):
+        """
+        獲取名額
+        
+        Args:
+            timeout (float): 最長等待時間 (秒)，None 表示一直等待
+        
+        Returns:
+            bool: 是否獲取到名額
+        """
+        with self._cond:
+            self.waiting += 1
+            try:
+                if not self._cond.wait_for(lambda: self.active < self.limit, timeout):
+                    return False
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+    
+    def release(self):
+        """釋放名額"""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+    
+    def set_limit(self, limit):
+        """
+        設置上限
+        
+        Args:
+            limit (int): 新的上限
+        """
+        with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+
+class ConcurrencyController:
+    """
+    自適應並發控制器 (AIMD)
+    
+    所有下載管理器的任務在開始傳輸前從控制器獲取名額，傳輸結束後歸還。
+    控制器每隔 interval 秒採樣一次總吞吐量 (帶寬控制器統計的傳輸字節數)、任務成敗及限流次數:
+    - 出現 429/403 限流或網絡等暫時性失敗的比例達到 error_rate 時，任務數及每任務連接數乘以 decrease_factor；
+    - 否則有任務在等待名額且吞吐量比上次增加任務前上升了 gain_threshold 以上時，任務數加一；
+      增加任務後吞吐量沒有上升 (如已達帶寬上限) 則保持當前任務數，直到下一次縮減後重新探測；
+    - 沒有錯誤時每任務連接數逐步恢復。
+    """
+    
+    def __init__(self, initial=MAX_CONCURRENT_DOWNLOADS, min_jobs=CONCURRENCY_MIN_JOBS,
+                 max_jobs=CONCURRENCY_MAX_JOBS, interval=CONCURRENCY_SAMPLE_INTERVAL,
+                 gain_threshold=CONCURRENCY_GAIN_THRESHOLD, decrease_factor=CONCURRENCY_DECREASE_FACTOR,
+                 error_rate=CONCURRENCY_ERROR_RATE, max_connections=RANGE_MAX_CONNECTIONS, bandwidth=None):
+        """
+        初始化並發控制器
+        
+        Args:
+            initial (int): 初始任務數
+            min_jobs (int): 最少任務數
+            max_jobs (int): 最多任務數
+            interval (float): 採樣及調整間隔 (秒)
+            gain_threshold (float): 增加任務數所需的最低吞吐量增幅
+            decrease_factor (float): 錯誤或限流時的縮減比例
+            error_rate (float): 觸發縮減的失敗任務比例
+            max_connections (int): 每個任務的最大連接數
+            bandwidth (BandwidthGovernor): 提供吞吐量統計的帶寬控制器，為 None 時使用共享實例
+        """
+        self.min_jobs = min_jobs
+        self.max_jobs = max_jobs
+        self.interval = interval
+        self.gain_threshold = gain_threshold
+        self.decrease_factor = decrease_factor
+        self.error_rate = error_rate
+        self.max_connections = max_connections
+        self.connection_limit = max_connections
+        self.bandwidth = bandwidth or get_bandwidth_governor()
+        self.slots = AdjustableSemaphore(max(min_jobs, min(initial, max_jobs)))
+        
+        self._lock = threading.Lock()
+        self._successes = 0
+        self._errors = 0
+        self._throttled = 0
+        self._throughput = 0.0
+        self._baseline = None
+        self._probing = True
+        self._decisions = deque(maxlen=DECISION_HISTORY)
+        self._last_bytes = self.bandwidth.get_metrics()['transferred_bytes']
+        self._last_time = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="concurrency-controller", daemon=True)
+        self._thread.start()
+    
+    @property
+    def level(self):
+        """當前允許同時進行的任務數"""
+        return self.slots.limit
+    
+    def acquire(self, timeout=None):
+        """
+        獲取下載名額 (下載任務開始傳輸前調用)
+        
+        Args:
+            timeout (float): 最長等待時間 (秒)，None 表示一直等待
+        
+        Returns:
+            bool: 是否獲取到名額
+        """
+        return self.slots.acquire(timeout)
+    
+    def release(self):
+        """歸還下載名額 (下載任務傳輸結束後調用)"""
+        self.slots.release()
+    
+    def record_result(self, success, error=None):
+        """
+        記錄任務結果
+        
+        Args:
+            success (bool): 是否成功
+            error (str): 失敗時的錯誤信息，429/403 計為限流；
+                只有暫時性錯誤計入錯誤率，影片不可用、私人影片等錯誤不影響並發數
+        """
+        if not success and not is_transient_error(error):
+            return
+        with self._lock:
+            if success:
+                self._successes += 1
+            else:
+                self._errors += 1
+                if is_throttle_error(error):
+                    self._throttled += 1
+    
+    def record_throttle(self):
+        """記錄一次連接級的限流 (如分段下載中某個連接收到 429/403)"""
+        with self._lock:
+            self._throttled += 1
+    
+    def _run(self):
+        """控制線程執行函數"""
+        while True:
+            time.sleep(self.interval)
+            try:
+                self._adjust()
+            except Exception as e:
+                print(f"並發控制調整失敗: {e}")
+    
+    def _adjust(self):
+        """採樣並調整任務數及連接數"""
+        now = time.monotonic()
+        transferred = self.bandwidth.get_metrics()['transferred_bytes']
+        with self._lock:
+            throughput = (transferred - self._last_bytes) / max(now - self._last_time, 1e-6)
+            self._last_bytes, self._last_time = transferred, now
+            self._throughput = throughput
+            successes, errors, throttled = self._successes, self._errors, self._throttled
+            self._successes = self._errors = self._throttled = 0
+            
+            level = self.slots.limit
+            finished = successes + errors
+            if throttled or (errors and errors / finished >= self.error_rate):
+                # 乘性減: 服務器限流或錯誤增多
+                new_level = max(self.min_jobs, int(level * self.decrease_factor))
+                self.connection_limit = max(1, int(self.connection_limit * self.decrease_factor))
+                self._baseline = None
+                self._probing = True
+                reason = f"限流 {throttled} 次，失敗 {errors}/{finished}"
+                self._record_decision('decrease', level, new_level, throughput, reason)
+            else:
+                new_level = level
+                self.connection_limit = min(self.max_connections, self.connection_limit + 1)
+                saturated = self.slots.waiting > 0 and self.slots.active >= level
+                if not saturated:
+                    # 沒有等待的任務，增加名額也不會提高吞吐量；需求恢復時重新探測
+                    self._baseline = None
+                    self._probing = True
+                elif self._baseline is None or throughput > self._baseline * (1 + self.gain_threshold):
+                    if self._probing and level < self.max_jobs:
+                        # 加性增: 吞吐量仍隨任務數上升
+                        new_level = level + 1
+                        self._baseline = throughput
+                        reason = f"吞吐量 {throughput / 1024 / 1024:.2f} MB/s"
+                        self._record_decision('increase', level, new_level, throughput, reason)
+                elif self._probing:
+                    # 增加任務後吞吐量沒有明顯上升，保持當前任務數
+                    self._probing = False
+                    reason = f"吞吐量 {throughput / 1024 / 1024:.2f} MB/s 未再上升"
+                    self._record_decision('hold', level, level, throughput, reason)
+        
+        if new_level != level:
+            self.slots.set_limit(new_level)
+    
+    def _record_decision(self, action, old_level, new_level, throughput, reason):
+        """
+        記錄調整決策 (在 _lock 內調用)
+        
+        Args:
+            action (str): increase、decrease 或 hold
+            old_level (int): 調整前的任務數
+            new_level (int): 調整後的任務數
+            throughput (float): 採樣吞吐量 (字節/秒)
+            reason (str): 調整原因
+        """
+        self._decisions.append({
+            'time': time.time(),
+            'action': action,
+            'from': old_level,
+            'to': new_level,
+            'connections': self.connection_limit,
+            'throughput': throughput,
+            'reason': reason,
+        })
+        print(f"並發控制: {action} 任務數 {old_level} -> {new_level}，每任務連接數 {self.connection_limit} ({reason})")
+    
+    def get_metrics(self):
+        """
+        獲取並發控制統計
+        
+        Returns:
+            dict: 當前任務數上限 level、進行中的任務數 active、等待名額的任務數 waiting、
+                每任務連接數上限 connection_limit、最近一次採樣的吞吐量 throughput (字節/秒)
+                及最近的調整記錄 decisions
+        """
+        with self._lock:
+            return {
+                'level': self.slots.limit,
+                'active': self.slots.active,
+                'waiting': self.slots.waiting,
+                'connection_limit': self.connection_limit,
+                'throughput': self._throughput,
+                'decisions': list(self._decisions),
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_concurrency_controller():
+    """
+    獲取進程內共享的並發控制器
+    
+    Returns:
+        ConcurrencyController: 並發控制器
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = ConcurrencyController()
+        return _controller
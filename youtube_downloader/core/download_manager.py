@@ -0,0 +1,448 @@
+"""
+下載管理模塊 - 以有界工作線程池並行處理多個下載任務
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from youtube_downloader.config import CONCURRENCY_MAX_JOBS
+from .concurrency import get_concurrency_controller
+from .downloader import YouTubeDownloader, remove_partial_files
+
+
+# 已結束的任務狀態
+FINISHED_STATUSES = ('complete', 'error', 'cancelled')
+
+
+class DownloadManager:
+    """下載任務管理器 - 每個任務擁有獨立的下載器實例與進度回調"""
+    
+    def __init__(self, callback=None, max_workers=CONCURRENCY_MAX_JOBS, journal=None, controller=None):
+        """
+        初始化下載管理器
+        
+        Args:
+            callback (function): 回調函數，用於更新 UI，事件中會附帶 job_id
+            max_workers (int): 本管理器同時進行的最大下載任務數
+            journal (DownloadJournal): 下載日誌，用於暫停續傳及重啟後恢復，為 None 時不記錄
+            controller (ConcurrencyController): 並發控制器，所有管理器實際同時傳輸的任務數由其調整，
+                為 None 時使用共享實例
+        """
+        self.callback = callback
+        self.max_workers = max_workers
+        self.journal = journal
+        self.controller = controller or get_concurrency_controller()
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="download-worker"
+        )
+    
+    def submit(self, url, options, job_id=None):
+        """
+        提交下載任務，立即返回任務 ID
+        
+        Args:
+            url (str): YouTube URL
+            options (dict): 下載選項 (output_path, format, quality, embed_thumbnail，
+                可選 info_dict 為已提取的影片信息，rate_limit 為下載速度上限，rate_group 為帶寬分組)
+            job_id (str): 指定任務 ID，恢復日誌中的任務時使用
+        
+        Returns:
+            str: 任務 ID
+        """
+        job = self._create_job(url, options, job_id)
+        job_id = job['id']
+        
+        if self.journal:
+            self.journal.update(
+                job_id,
+                url=url,
+                # 已提取的影片信息體積較大且流 URL 會過期，不寫入日誌
+                options={k: v for k, v in job['options'].items() if k != 'info_dict'},
+                status='queued',
+                started_at=int(time.time())
+            )
+        
+        self._notify(job_id, {
+            'status': 'queued',
+            'message': '已加入下載隊列',
+            'url': url
+        })
+        
+        job['future'] = self._executor.submit(self._run_job, job_id)
+        return job_id
+    
+    def _create_job(self, url, options, job_id=None, status='queued'):
+        """
+        創建任務狀態字典並登記
+        
+        Args:
+            url (str): YouTube URL
+            options (dict): 下載選項
+            job_id (str): 任務 ID，為 None 時自動生成
+            status (str): 初始狀態
+        
+        Returns:
+            dict: 任務狀態字典
+        """
+        job = {
+            'id': job_id or uuid.uuid4().hex[:12],
+            'url': url,
+            'options': dict(options),
+            'status': status,
+            'progress': {},
+            'result': None,
+            'error': None,
+            'format_id': options.get('format_id'),
+            'partial_files': [],
+            'downloader': None,
+            'future': None,
+        }
+        
+        with self._lock:
+            self.jobs[job['id']] = job
+        return job
+    
+    def _run_job(self, job_id):
+        """
+        工作線程執行函數
+        
+        Args:
+            job_id (str): 任務 ID
+        """
+        job = self.jobs.get(job_id)
+        if not job or job['status'] != 'queued':
+            return
+        
+        # 等待並發控制器的名額，等待期間任務可能被暫停或取消
+        while not self.controller.acquire(timeout=0.5):
+            if job['status'] != 'queued':
+                return
+        
+        options = job['options']
+        downloader = YouTubeDownloader(
+            callback=lambda info: self._on_job_update(job_id, info)
+        )
+        with self._lock:
+            if job['status'] != 'queued':
+                self.controller.release()
+                return
+            job['downloader'] = downloader
+        
+        result = None
+        try:
+            result = downloader.download(
+                url=job['url'],
+                output_path=options.get('output_path', ''),
+                format_option=options.get('format', 'mp4'),
+                quality_option=options.get('quality', ''),
+                embed_thumbnail=options.get('embed_thumbnail', False),
+                async_download=False,
+                format_id=job['format_id'],
+                info_dict=options.get('info_dict'),
+                rate_limit=options.get('rate_limit'),
+                rate_group=options.get('rate_group')
+            )
+        except Exception as e:
+            print(f"下載任務 {job_id} 發生錯誤: {str(e)}")
+            self._on_job_update(job_id, {
+                'status': 'error',
+                'error': f'下載失敗: {str(e)}',
+                'url': job['url']
+            })
+        finally:
+            # 網絡傳輸已結束 (後處理在後處理線程池中進行)，歸還名額
+            self.controller.release()
+            if isinstance(result, Future):
+                # 原始流已下載完成，後處理在後處理線程池中進行，本工作線程可處理下一個任務；
+                # 後處理結束前保留下載器，以便暫停或取消時終止 ffmpeg
+                result.add_done_callback(lambda f: job.update(downloader=None))
+            else:
+                job['downloader'] = None
+    
+    def _on_job_update(self, job_id, info):
+        """
+        處理單個任務的下載器回調，更新任務狀態與日誌後轉發
+        
+        Args:
+            job_id (str): 任務 ID
+            info (dict): 下載器回調信息
+        """
+        job = self.jobs.get(job_id)
+        if not job:
+            return
+        
+        status = info.get('status', '')
+        with self._lock:
+            if status in ('downloading', 'paused'):
+                if status == 'downloading':
+                    job['progress'] = info
+                if info.get('format_id'):
+                    job['format_id'] = info['format_id']
+                if info.get('partial_files'):
+                    job['partial_files'] = info['partial_files']
+            elif status == 'complete':
+                self.controller.record_result(True)
+                job['result'] = {
+                    'filename': info.get('filename', ''),
+                    'info': info.get('info')
+                }
+            elif status == 'error':
+                job['error'] = info.get('error', '未知錯誤')
+                self.controller.record_result(False, job['error'])
+            
+            # 已取消的任務不再被後續事件覆蓋狀態
+            if status and job['status'] != 'cancelled':
+                job['status'] = status
+        
+        self._update_journal(job, status, info)
+        self._notify(job_id, info)
+    
+    def _update_journal(self, job, status, info):
+        """
+        根據任務事件更新下載日誌
+        
+        Args:
+            job (dict): 任務狀態字典
+            status (str): 事件狀態
+            info (dict): 事件信息
+        """
+        if not self.journal:
+            return
+        
+        if status in ('downloading', 'paused', 'error'):
+            # 錯誤的任務保留在日誌中，之後仍可續傳
+            self.journal.update(
+                job['id'],
+                force=status != 'downloading',
+                status=status,
+                format_id=job['format_id'],
+                byte_offsets=info.get('byte_offsets', {}),
+                partial_files=job['partial_files']
+            )
+        elif status in ('complete', 'cancelled'):
+            self.journal.remove(job['id'])
+    
+    def _notify(self, job_id, info):
+        """
+        將任務事件轉發給回調函數
+        
+        Args:
+            job_id (str): 任務 ID
+            info (dict): 事件信息
+        """
+        if self.callback:
+            event = dict(info)
+            event['job_id'] = job_id
+            self.callback(event)
+    
+    def cancel(self, job_id):
+        """
+        取消指定任務
+        
+        Args:
+            job_id (str): 任務 ID
+        
+        Returns:
+            bool: 是否找到並取消了任務
+        """
+        job = self.jobs.get(job_id)
+        if not job or job['status'] in FINISHED_STATUSES:
+            return False
+        
+        with self._lock:
+            downloader = job['downloader']
+            previous_status = job['status']
+            if not downloader:
+                job['status'] = 'cancelled'
+        
+        if downloader:
+            # 任務正在執行，先設置取消令牌以覆蓋下載尚未開始的情況，
+            # 下載線程中止後會發出取消事件並釋放工作線程
+            downloader.cancel_event.set()
+            downloader.cancel()
+        else:
+            if job['future']:
+                job['future'].cancel()
+            if previous_status == 'paused':
+                # 已暫停的任務保留了 .part 文件，取消時一併清理
+                entry = self.journal.get(job_id) if self.journal else None
+                remove_partial_files(job['partial_files'], since=(entry or {}).get('started_at', 0))
+            if self.journal:
+                self.journal.remove(job_id)
+            self._notify(job_id, {
+                'status': 'cancelled',
+                'message': '下載已取消'
+            })
+        return True
+    
+    def cancel_all(self):
+        """取消所有未完成的任務"""
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+    
+    def pause(self, job_id):
+        """
+        暫停指定任務，保留已下載的部分以便續傳
+        
+        Args:
+            job_id (str): 任務 ID
+        
+        Returns:
+            bool: 是否找到並暫停了任務
+        """
+        job = self.jobs.get(job_id)
+        if not job or job['status'] in FINISHED_STATUSES + ('paused',):
+            return False
+        
+        with self._lock:
+            downloader = job['downloader']
+            if not downloader:
+                job['status'] = 'paused'
+        
+        if downloader:
+            # 下載線程中止後會發出 paused 事件
+            downloader.pause_requested = True
+            downloader.cancel_event.set()
+            downloader.pause()
+        else:
+            if job['future']:
+                job['future'].cancel()
+            if self.journal:
+                self.journal.update(job_id, status='paused')
+            self._notify(job_id, {
+                'status': 'paused',
+                'message': '下載已暫停',
+                'url': job['url']
+            })
+        return True
+    
+    def pause_all(self):
+        """暫停所有未完成的任務"""
+        for job_id in list(self.jobs):
+            self.pause(job_id)
+    
+    def resume(self, job_id):
+        """
+        續傳已暫停或失敗的任務
+        
+        沿用記錄的格式 ID 重新提取影片信息 (獲取未過期的流 URL)，
+        yt-dlp 會從 .part 文件的大小處以 Range 請求繼續下載。
+        
+        Args:
+            job_id (str): 任務 ID
+        
+        Returns:
+            bool: 是否成功重新排隊
+        """
+        job = self.jobs.get(job_id)
+        if not job:
+            return False
+        
+        with self._lock:
+            if job['status'] not in ('paused', 'error') or job['downloader']:
+                return False
+            job['status'] = 'queued'
+            job['error'] = None
+        
+        if self.journal:
+            self.journal.update(job_id, status='queued')
+        
+        self._notify(job_id, {
+            'status': 'queued',
+            'message': '已加入下載隊列 (續傳)',
+            'url': job['url']
+        })
+        
+        job['future'] = self._executor.submit(self._run_job, job_id)
+        return True
+    
+    def restore_unfinished(self):
+        """
+        從下載日誌恢復上次未完成的任務 (以暫停狀態登記，不會自動開始)
+        
+        Returns:
+            list: 恢復的任務 ID 列表
+        """
+        if not self.journal:
+            return []
+        
+        restored = []
+        for entry in self.journal.get_unfinished():
+            job_id = entry.get('job_id')
+            if not job_id or job_id in self.jobs or not entry.get('url'):
+                continue
+            
+            options = dict(entry.get('options') or {})
+            options['format_id'] = entry.get('format_id')
+            job = self._create_job(entry['url'], options, job_id, status='paused')
+            job['partial_files'] = entry.get('partial_files') or []
+            restored.append(job_id)
+        
+        return restored
+    
+    def get_job(self, job_id):
+        """
+        獲取任務狀態快照
+        
+        Args:
+            job_id (str): 任務 ID
+        
+        Returns:
+            dict: 任務狀態，找不到時返回 None
+        """
+        job = self.jobs.get(job_id)
+        if not job:
+            return None
+        
+        with self._lock:
+            return {
+                'id': job['id'],
+                'url': job['url'],
+                'options': {k: v for k, v in job['options'].items() if k != 'info_dict'},
+                'status': job['status'],
+                'progress': dict(job['progress']),
+                'result': job['result'],
+                'error': job['error'],
+                'format_id': job['format_id'],
+            }
+    
+    def get_jobs(self):
+        """
+        獲取所有任務的狀態快照
+        
+        Returns:
+            list: 任務狀態列表
+        """
+        return [self.get_job(job_id) for job_id in list(self.jobs)]
+    
+    def active_count(self):
+        """
+        獲取排隊中及進行中的任務數量
+        
+        Returns:
+            int: 未結束且未暫停的任務數量
+        """
+        return sum(
+            1 for job in list(self.jobs.values())
+            if job['status'] not in FINISHED_STATUSES + ('paused',)
+        )
+    
+    def shutdown(self, wait=False):
+        """
+        暫停所有任務並關閉工作線程池
+        
+        未完成的任務會保留在下載日誌中，下次啟動時可以續傳。
+        
+        Args:
+            wait (bool): 是否等待工作線程結束
+        """
+        self.callback = None
+        if self.journal:
+            self.pause_all()
+        else:
+            self.cancel_all()
+        self._executor.shutdown(wait=wait)
@@ -2,8 +2,12 @@
 下載核心模塊 - 處理 YouTube 影片下載功能
 """
 import os
+import copy
+import glob
+import time
 import threading
 import tempfile
+import contextlib
 import re
 import subprocess
 import json
@@ -11,27 +15,142 @@ import platform
 from typing import Dict, Optional, Any, List, Tuple
 from pathlib import Path
 import yt_dlp
+from yt_dlp.utils import DownloadCancelled, Popen as YtdlpPopen, prepend_extension, replace_extension
 import mutagen
 from mutagen.id3 import ID3, APIC
 from PIL import Image
 import io
 
-from .utils import ensure_dir_exists, sanitize_filename
+from youtube_downloader.config import (
+    DOWNLOAD_SOCKET_TIMEOUT, PROGRESS_UPDATE_HZ, NATIVE_AUDIO_QUALITY, FRAGMENT_CONCURRENCY
+)
+from .archive import get_download_archive
+from .bandwidth import get_bandwidth_governor
+from .postprocess import DeferredPostProcessYoutubeDL, get_postprocess_pool
+from .range_downloader import RangeDownloadYoutubeDL
+from .utils import ensure_dir_exists, sanitize_filename, is_stream_info_expired, extract_video_id
+
+
+# 記錄各下載線程啟動的子進程 (ffmpeg)，以便取消時終止
+_process_registry = threading.local()
+# yt-dlp Popen 包裝的使用計數，最後一個使用者退出時恢復原始實現
+_tracker_lock = threading.Lock()
+_tracker_users = 0
+_original_popen_init = None
+
+
+def _tracked_popen_init(self, *args, **kwargs):
+    """yt-dlp Popen 的包裝，將子進程記錄到當前線程正在追蹤的列表"""
+    _original_popen_init(self, *args, **kwargs)
+    processes = getattr(_process_registry, 'processes', None)
+    if processes is not None:
+        processes.append(self)
+
+
+@contextlib.contextmanager
+def track_child_processes(processes):
+    """
+    在當前線程內將 yt-dlp 啟動的子進程 (ffmpeg) 記錄到指定列表，以便取消時終止
+    
+    進入時包裝 yt-dlp 的 Popen，所有線程都退出後恢復原始實現，
+    不在追蹤範圍內的線程啟動的子進程不會被記錄。
+    
+    Args:
+        processes (list): 記錄子進程的列表
+    """
+    global _tracker_users, _original_popen_init
+    with _tracker_lock:
+        if _tracker_users == 0:
+            _original_popen_init = YtdlpPopen.__init__
+            YtdlpPopen.__init__ = _tracked_popen_init
+        _tracker_users += 1
+    previous = getattr(_process_registry, 'processes', None)
+    _process_registry.processes = processes
+    try:
+        yield processes
+    finally:
+        _process_registry.processes = previous
+        with _tracker_lock:
+            _tracker_users -= 1
+            if _tracker_users == 0:
+                YtdlpPopen.__init__ = _original_popen_init
+                _original_popen_init = None
+
+
+def remove_partial_files(filenames, since=0):
+    """
+    刪除未完成下載留下的 .part、.ytdl 及中間音視頻文件
+    
+    Args:
+        filenames (iterable): 下載過程中寫入的文件路徑
+        since (float): 只刪除此時間戳之後修改過的文件，避免誤刪已存在的成品
+    """
+    candidates = set()
+    for filename in filenames:
+        candidates.update((filename, filename + '.part', filename + '.ytdl'))
+        candidates.update(glob.glob(glob.escape(filename) + '.part-Frag*'))
+    
+    for path in candidates:
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) >= since - 1:
+                os.remove(path)
+                print(f"已刪除未完成的文件: {path}")
+        except OSError as e:
+            print(f"刪除文件失敗: {path}, {e}")
+
+
+class DownloaderYoutubeDL(RangeDownloadYoutubeDL, DeferredPostProcessYoutubeDL):
+    """下載器使用的 YoutubeDL: 單文件流多連接分段下載，後處理延遲到後處理線程池執行"""
+    
+    def __init__(self, params=None, auto_init=True):
+        super().__init__(params, auto_init)
+        # 各文件開始下載時 .part 文件已有的字節數 (續傳起點)
+        self.resume_offsets = {}
+    
+    def dl(self, name, info, subtitle=False, test=False):
+        """記錄續傳起點後下載單個格式"""
+        tmpfilename = f'{name}.part'
+        if self.params.get('continuedl', True) and os.path.isfile(tmpfilename):
+            self.resume_offsets[name] = os.path.getsize(tmpfilename)
+        return super().dl(name, info, subtitle, test)
 
 
 class YouTubeDownloader:
     """YouTube 下載器核心類"""
     
-    def __init__(self, callback=None):
+    def __init__(self, callback=None, progress_rate=PROGRESS_UPDATE_HZ, archive=None, bandwidth=None):
         """
         初始化下載器
         
         Args:
             callback (function): 回調函數，用於更新 UI
+            progress_rate (float): 每秒最多發送的下載進度事件數，完成及錯誤事件不受限制
+            archive (DownloadArchive): 下載存檔，為 None 時使用共享實例
+            bandwidth (BandwidthGovernor): 帶寬控制器，為 None 時使用共享實例
         """
         self.callback = callback
+        self.archive = archive or get_download_archive()
+        self._archive_key = None
+        self.bandwidth = bandwidth or get_bandwidth_governor()
+        # 各文件已報告給帶寬控制器的字節數 (分段下載的多個連接會並行調用進度回調)
+        self._transferred = {}
+        self._transferred_lock = threading.Lock()
+        self._resume_offsets = {}
+        self.progress_interval = 1.0 / progress_rate if progress_rate else 0
+        self._last_progress_time = 0
         self.is_downloading = False
         self.current_task = None
+        
+        # 取消令牌，由進度回調與後處理回調檢查
+        self.cancel_event = threading.Event()
+        self._child_processes = []
+        self._partial_files = set()
+        self._started_at = 0
+        
+        # 暫停與續傳狀態
+        self.pause_requested = False
+        self.format_id = None
+        self.byte_offsets = {}
     
     def _progress_hook(self, d):
         """
@@ -40,30 +159,65 @@ class YouTubeDownloader:
         Args:
             d (dict): yt-dlp 回調資訊字典
         """
+        if d['status'] == 'downloading':
+            # 記錄正在寫入的文件，取消時需要清理
+            for key in ('filename', 'tmpfilename'):
+                if d.get(key):
+                    self._partial_files.add(d[key])
+            
+            # 記錄實際選擇的格式 ID 及各文件的已下載字節數，用於續傳
+            if self.format_id is None:
+                info_dict = d.get('info_dict') or {}
+                requested_formats = info_dict.get('requested_formats')
+                if requested_formats:
+                    self.format_id = '+'.join(f['format_id'] for f in requested_formats)
+                else:
+                    self.format_id = info_dict.get('format_id')
+            if d.get('filename'):
+                self.byte_offsets[d['filename']] = d.get('downloaded_bytes') or 0
+            
+            # 向帶寬控制器報告新傳輸的字節數，超出上限時在此等待 (只阻塞調用回調的連接)
+            # 每個文件從續傳起點開始計算 (分段下載器報告其已完成分段的字節數)，首次報告也計入；
+            # 並行連接的報告可能亂序，只計算超出已報告字節數的部分
+            filename = d.get('filename')
+            downloaded = d.get('downloaded_bytes') or 0
+            with self._transferred_lock:
+                previous = self._transferred.get(filename)
+                if previous is None:
+                    previous = d.get('resumed_bytes', self._resume_offsets.get(filename, 0))
+                self._transferred[filename] = max(previous, downloaded)
+            self.bandwidth.consume(self, downloaded - previous, self.cancel_event)
+        
+        # 在 yt-dlp 的下載循環中拋出異常以中止傳輸
+        if self.cancel_event.is_set():
+            raise DownloadCancelled()
+        
         if self.callback is None:
             return
             
         if d['status'] == 'downloading':
-            percent = d.get('_percent_str', '0%').strip()
-            speed = d.get('_speed_str', '0 KiB/s').strip()
-            downloaded = d.get('_downloaded_bytes_str', '0 B').strip()
-            total = d.get('_total_bytes_str', 'Unknown').strip()
-            eta = d.get('_eta_str', 'Unknown').strip()
+            # 按設定頻率合併進度事件，避免快速連接下每個數據塊都觸發 UI 更新
+            now = time.monotonic()
+            if now - self._last_progress_time < self.progress_interval:
+                return
+            self._last_progress_time = now
+            
+            # 直接使用 yt-dlp 提供的數值欄位，格式化交由顯示層處理
+            downloaded_bytes = d.get('downloaded_bytes') or 0
+            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
+            percent = min(downloaded_bytes / total_bytes, 1.0) if total_bytes else 0
             
-            # 將百分比字符串轉換為浮點數
-            try:
-                percent_float = float(percent.replace('%', '')) / 100
-            except ValueError:
-                percent_float = 0
-                
             status_info = {
                 'status': 'downloading',
-                'percent': percent_float,
-                'speed': speed,
-                'downloaded': downloaded,
-                'total': total,
-                'eta': eta,
-                'filename': d.get('filename', '')
+                'percent': percent,
+                'downloaded_bytes': downloaded_bytes,
+                'total_bytes': total_bytes,
+                'speed': d.get('speed'),
+                'eta': d.get('eta'),
+                'filename': d.get('filename', ''),
+                'format_id': self.format_id,
+                'byte_offsets': dict(self.byte_offsets),
+                'partial_files': sorted(self._partial_files)
             }
             
             self.callback(status_info)
@@ -86,7 +240,28 @@ class YouTubeDownloader:
             
             self.callback(status_info)
     
-    def download(self, url, output_path, format_option, quality_option, embed_thumbnail=False):
+    def _postprocessor_hook(self, d):
+        """
+        後處理回調處理函數
+        
+        Args:
+            d (dict): yt-dlp 後處理回調資訊字典
+        """
+        if d['status'] == 'started':
+            # 記錄後處理可能產生的臨時文件
+            info_dict = d.get('info_dict', {})
+            filepath = info_dict.get('filepath')
+            if filepath:
+                self._partial_files.add(prepend_extension(filepath, 'temp'))
+                if d.get('postprocessor') == 'ExtractAudio':
+                    for ext in ('mp3', 'opus', 'ogg'):
+                        self._partial_files.add(replace_extension(filepath, ext))
+        
+        if self.cancel_event.is_set():
+            raise DownloadCancelled()
+    
+    def download(self, url, output_path, format_option, quality_option, embed_thumbnail=False, async_download=True,
+                 format_id=None, info_dict=None, rate_limit=None, rate_group=None):
         """
         下載 YouTube 影片
         
@@ -96,9 +271,15 @@ class YouTubeDownloader:
             format_option (str): 格式選項 (mp4/mp3)
             quality_option (str): 品質選項
             embed_thumbnail (bool): 是否嵌入縮圖
+            async_download (bool): 是否異步下載，為 False 時在調用線程中直接下載
+            format_id (str): 續傳時使用的格式 ID (如 "137+140")，確保沿用 .part 文件對應的流
+            info_dict (dict): 已提取的 yt-dlp 影片信息，流 URL 未過期時直接用於下載，省去再次提取
+            rate_limit (int): 本任務的下載速度上限 (字節/秒)，為 None 時只受全局上限限制
+            rate_group (str): 帶寬分組，同一分組的任務共用分組上限 (見 BandwidthGovernor.set_group_limit)
             
         Returns:
-            threading.Thread: 下載線程
+            threading.Thread、dict 或 Future: 下載線程 (如果異步) 或影片信息 (如果同步)；
+                同步下載且需要後處理時，返回後處理線程池中的 Future，其結果為影片信息
         """
         if self.is_downloading:
             if self.callback:
@@ -107,8 +288,24 @@ class YouTubeDownloader:
                     'error': '已有下載任務正在進行'
                 })
             return None
+        
+        # 下載前先查詢存檔 (不需要網絡請求)，已下載過則直接使用現有文件
+        video_id = extract_video_id(url)
+        self._archive_key = (video_id, format_option, quality_option) if video_id else None
+        if self._archive_key:
+            existing = self._complete_from_archive(url, output_path)
+            if existing:
+                return existing
             
         self.is_downloading = True
+        self._partial_files = set()
+        self._child_processes = []
+        self._started_at = time.time()
+        self._last_progress_time = 0
+        self.format_id = format_id
+        self.byte_offsets = {}
+        self._transferred = {}
+        self._resume_offsets = {}
         
         if self.callback:
             self.callback({
@@ -121,11 +318,20 @@ class YouTubeDownloader:
         
         # 根據選擇的格式和品質設置 yt-dlp 選項
         ydl_opts = self._get_ydl_options(output_path, format_option, quality_option, embed_thumbnail)
+        if format_id:
+            # 續傳: 固定使用之前選擇的格式，yt-dlp 會重新解析流 URL 並以 Range 請求從 .part 文件續傳
+            ydl_opts['format'] = format_id
+        # 由帶寬控制器限速 (全局、分組及本任務上限)，傳輸結束時移除
+        self.bandwidth.register(self, rate_limit, rate_group)
+        
+        if not async_download:
+            # 同步下載 (由 DownloadManager 的工作線程調用)
+            return self._download_thread(url, ydl_opts, embed_thumbnail, info_dict)
         
         # 創建下載線程
         download_thread = threading.Thread(
             target=self._download_thread,
-            args=(url, ydl_opts, embed_thumbnail)
+            args=(url, ydl_opts, embed_thumbnail, info_dict)
         )
         
         # 啟動線程
@@ -135,15 +341,24 @@ class YouTubeDownloader:
         
         return download_thread
     
-    def _download_thread(self, url, ydl_opts, embed_thumbnail=False):
+    def _download_thread(self, url, ydl_opts, embed_thumbnail=False, info_dict=None):
         """
         下載線程執行函數
         
+        只負責下載原始流，合併、音頻轉碼及嵌入縮圖交給後處理線程池，
+        下載線程 (網絡工作線程) 不必等待 ffmpeg 即可處理下一個任務。
+        
         Args:
             url (str): YouTube URL
             ydl_opts (dict): yt-dlp 選項
             embed_thumbnail (bool): 是否嵌入縮圖
+            info_dict (dict): 已提取的 yt-dlp 影片信息
+            
+        Returns:
+            dict 或 Future: 影片信息 (下載失敗時為 None)；需要後處理時返回後處理任務的 Future
         """
+        info = None
+        deferred = False
         try:
             print(f"開始下載視頻: {url}")
             # 更新狀態
@@ -163,61 +378,248 @@ class YouTubeDownloader:
                 except Exception as e:
                     print(f"創建輸出目錄失敗: {str(e)}")
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # 下載視頁
+            ydl = DownloaderYoutubeDL(ydl_opts)
+            self._resume_offsets = ydl.resume_offsets
+            try:
+                # 下載視頁，期間啟動的 ffmpeg 子進程可被取消操作終止
                 print("調用yt-dlp開始下載")
-                info = ydl.extract_info(url, download=True)
+                with track_child_processes(self._child_processes):
+                    if info_dict and not is_stream_info_expired(info_dict):
+                        # 使用已提取的信息直接進行格式選擇和下載，跳過頁面與播放器的再次請求
+                        print("使用已提取的影片信息直接下載")
+                        info = ydl.process_ie_result(copy.deepcopy(info_dict), download=True)
+                    else:
+                        info = ydl.extract_info(url, download=True)
                 if info:
                     print(f"成功獲取視頻信息: {info.get('title', '')}")
                 else:
                     print("無法獲取視頻信息")
+            except Exception:
+                ydl.close()
+                raise
             
-            # 處理嵌入縮圖
-            if embed_thumbnail and 'mp3' in ydl_opts.get('format', ''):
-                # MP3 格式需要手動嵌入縮圖
-                thumbnail_url = info.get('thumbnail')
-                if thumbnail_url and os.path.exists(ydl_opts.get('outtmpl', '')):
-                    self._embed_thumbnail_to_mp3(ydl_opts.get('outtmpl', ''), thumbnail_url)
+            if ydl.deferred:
+                # 原始流已下載完成，後處理排隊執行，本線程立即返回
+                deferred = True
+                if self.callback:
+                    self.callback({
+                        'status': 'processing',
+                        'percent': 1.0,
+                        'message': '等待後處理...',
+                        'url': url,
+                        'postprocessing': True  # 傳輸已結束，進入後處理階段
+                    })
+                future = get_postprocess_pool().submit(
+                    self._postprocess_thread, url, ydl, info, ydl_opts, embed_thumbnail,
+                    cancel_event=self.cancel_event
+                )
+                future.add_done_callback(lambda f: self._on_postprocess_skipped(f, url, ydl))
+                return future
             
-            # 更新狀態
-            print("\33[1;36m下載完成\33[0m")
-            if self.callback:
-                # 獲取實際下載的文件路徑
-                filename = info.get('requested_downloads', [{}])[0].get('filepath', '') \
-                    if info and 'requested_downloads' in info else ''
-                
-                if not filename and info and 'title' in info:
-                    # 如果沒有得到文件路徑，嘗試根據設置的模板構建
-                    ext = 'mp3' if 'mp3' in ydl_opts.get('format', '') else 'mp4'
-                    base_name = sanitize_filename(info.get('title', 'download'))
-                    filename = ydl_opts.get('outtmpl', '').replace('%(title)s', base_name).replace('%(ext)s', ext)
-                
-                print(f"\033[1;36m已下載文件: {filename}\33[0m")
+            ydl.close()
+            return self._finish_download(url, ydl_opts, embed_thumbnail, info)
                 
+        except Exception as e:
+            return self._handle_download_error(url, e)
+        finally:
+            # 網絡傳輸已結束，空出的帶寬由其他任務分享
+            self.bandwidth.unregister(self)
+            if not deferred:
+                self._reset_download_state()
+    
+    def _postprocess_thread(self, url, ydl, info, ydl_opts, embed_thumbnail):
+        """
+        後處理線程執行函數
+        
+        Args:
+            url (str): YouTube URL
+            ydl (DownloaderYoutubeDL): 記錄了延遲後處理的 YoutubeDL 實例
+            info (dict): 影片信息
+            ydl_opts (dict): yt-dlp 選項
+            embed_thumbnail (bool): 是否嵌入縮圖
+            
+        Returns:
+            dict: 影片信息，後處理失敗時返回 None
+        """
+        try:
+            if self.callback:
                 self.callback({
-                    'status': 'complete',
-                    'message': '下載完成',
+                    'status': 'processing',
+                    'percent': 1.0,
+                    'message': '正在後處理...',
                     'url': url,
-                    'filename': filename,
-                    'info': info  # 傳遞完整視頁信息以便在歷史記錄中使用
+                    'postprocessing': True  # 傳輸已結束，進入後處理階段
                 })
-                
+            with track_child_processes(self._child_processes):
+                ydl.run_deferred_postprocessing()
+            return self._finish_download(url, ydl_opts, embed_thumbnail, info)
         except Exception as e:
-            # 輸出完整的异常訊息
-            import traceback
-            print(f"下載失敗: {str(e)}")
-            traceback.print_exc()
+            return self._handle_download_error(url, e)
+        finally:
+            ydl.close()
+            self._reset_download_state()
+    
+    def _on_postprocess_skipped(self, future, url, ydl):
+        """
+        後處理任務在排隊中被取消 (未執行 _postprocess_thread) 時清理狀態
+        
+        Args:
+            future (Future): 後處理任務
+            url (str): YouTube URL
+            ydl (DownloaderYoutubeDL): YoutubeDL 實例
+        """
+        if future.cancelled():
+            error = DownloadCancelled()
+        else:
+            # _postprocess_thread 自行處理錯誤，只有排隊時被取消才會在此拋出 DownloadCancelled
+            error = future.exception()
+            if not isinstance(error, DownloadCancelled):
+                return
+        
+        ydl.close()
+        self._handle_download_error(url, error)
+        self._reset_download_state()
+    
+    def _finish_download(self, url, ydl_opts, embed_thumbnail, info):
+        """
+        下載及後處理完成後記錄存檔並發送完成事件
+        
+        Args:
+            url (str): YouTube URL
+            ydl_opts (dict): yt-dlp 選項
+            embed_thumbnail (bool): 是否嵌入縮圖
+            info (dict): 影片信息
             
-            # 更新狀態
+        Returns:
+            dict: 影片信息
+        """
+        # 處理嵌入縮圖
+        if embed_thumbnail and 'mp3' in ydl_opts.get('format', ''):
+            # MP3 格式需要手動嵌入縮圖
+            thumbnail_url = info.get('thumbnail')
+            if thumbnail_url and os.path.exists(ydl_opts.get('outtmpl', '')):
+                self._embed_thumbnail_to_mp3(ydl_opts.get('outtmpl', ''), thumbnail_url)
+        
+        # 更新狀態
+        print("\33[1;36m下載完成\33[0m")
+        
+        # 獲取實際下載的文件路徑
+        filename = info.get('requested_downloads', [{}])[0].get('filepath', '') \
+            if info and 'requested_downloads' in info else ''
+        
+        if not filename and info and 'title' in info:
+            # 如果沒有得到文件路徑，嘗試根據設置的模板構建
+            ext = 'mp3' if 'mp3' in ydl_opts.get('format', '') else 'mp4'
+            base_name = sanitize_filename(info.get('title', 'download'))
+            filename = ydl_opts.get('outtmpl', '').replace('%(title)s', base_name).replace('%(ext)s', ext)
+        
+        print(f"\033[1;36m已下載文件: {filename}\33[0m")
+        
+        # 記錄到下載存檔
+        if self._archive_key and filename and os.path.exists(filename):
+            self.archive.add(*self._archive_key, filename, info.get('title', '') if info else '')
+        
+        if self.callback:
+            self.callback({
+                'status': 'complete',
+                'message': '下載完成',
+                'url': url,
+                'filename': filename,
+                'info': info  # 傳遞完整視頁信息以便在歷史記錄中使用
+            })
+        
+        return info
+    
+    def _handle_download_error(self, url, e):
+        """
+        處理下載或後處理中斷 (暫停、取消或錯誤)
+        
+        Args:
+            url (str): YouTube URL
+            e (Exception): 異常
+            
+        Returns:
+            None
+        """
+        if self.cancel_event.is_set() and self.pause_requested:
+            # 暫停: 保留 .part 文件以便之後續傳
+            print(f"下載已暫停: {url}")
             if self.callback:
                 self.callback({
-                    'status': 'error',
-                    'error': f'下載失敗: {str(e)}',
+                    'status': 'paused',
+                    'message': '下載已暫停',
+                    'url': url,
+                    'format_id': self.format_id,
+                    'byte_offsets': dict(self.byte_offsets),
+                    'partial_files': sorted(self._partial_files)
+                })
+            return None
+        
+        if self.cancel_event.is_set():
+            # 取消操作導致的中斷，清理未完成的文件
+            print(f"下載已取消: {url}")
+            self._cleanup_partial_files()
+            if self.callback:
+                self.callback({
+                    'status': 'cancelled',
+                    'message': '下載已取消',
                     'url': url
                 })
-        finally:
-            print("重置下載器狀態: is_downloading = False")
-            self.is_downloading = False
+            return None
+        
+        # 輸出完整的异常訊息
+        import traceback
+        print(f"下載失敗: {str(e)}")
+        traceback.print_exception(type(e), e, e.__traceback__)
+        
+        # 更新狀態
+        if self.callback:
+            self.callback({
+                'status': 'error',
+                'error': f'下載失敗: {str(e)}',
+                'url': url
+            })
+        return None
+    
+    def _reset_download_state(self):
+        """下載及後處理結束後重置下載器狀態"""
+        self.cancel_event.clear()
+        self.pause_requested = False
+        print("重置下載器狀態: is_downloading = False")
+        self.is_downloading = False
+    
+    def _complete_from_archive(self, url, output_path):
+        """
+        影片已以相同格式與品質下載過時，將現有文件連結到輸出目錄並發送完成事件
+        
+        Args:
+            url (str): YouTube URL
+            output_path (str): 輸出路徑
+            
+        Returns:
+            dict: 簡要影片信息，存檔中沒有可用文件時返回 None
+        """
+        record = self.archive.link_existing(*self._archive_key, output_path)
+        if not record:
+            return None
+        
+        video_id = self._archive_key[0]
+        print(f"\033[1;36m影片已下載過，使用現有文件: {record['file_path']}\33[0m")
+        info = {
+            'id': video_id,
+            'title': record.get('title') or video_id,
+            'webpage_url': url
+        }
+        if self.callback:
+            self.callback({
+                'status': 'complete',
+                'message': '影片已下載過',
+                'url': url,
+                'filename': record['file_path'],
+                'info': info,
+                'skipped': True
+            })
+        return info
     
     def _get_ydl_options(self, output_path, format_option, quality_option, embed_thumbnail):
         """
@@ -239,12 +641,37 @@ class YouTubeDownloader:
         ydl_opts = {
             'outtmpl': outtmpl,
             'progress_hooks': [self._progress_hook],
+            'postprocessor_hooks': [self._postprocessor_hook],
+            'socket_timeout': DOWNLOAD_SOCKET_TIMEOUT,
+            # DASH/HLS 分片流並行下載多個分片 (單文件流由 RangeFD 分段並行下載)
+            'concurrent_fragment_downloads': FRAGMENT_CONCURRENCY,
             'ignoreerrors': False,
             'verbose': False,
         }
         
         # 根據格式和品質設置下載選項
-        if format_option == 'mp3':
+        if format_option == 'mp3' and quality_option == NATIVE_AUDIO_QUALITY:
+            # 原始音質: 保留原始音頻流，AAC 直接保存為 m4a，Opus 從 webm 重新封裝為 opus，
+            # 只複製流不重新編碼，之後寫入標籤
+            ydl_opts.update({
+                'format': 'bestaudio/best',
+                'postprocessors': [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'best',
+                }, {
+                    'key': 'FFmpegMetadata',
+                    'add_chapters': False,
+                }],
+            })
+            
+            # 如果需要嵌入縮圖 (m4a、opus 及 ogg 均支持封面)
+            if embed_thumbnail:
+                ydl_opts['writethumbnail'] = True
+                ydl_opts['postprocessors'].append({
+                    'key': 'EmbedThumbnail',
+                })
+                
+        elif format_option == 'mp3':
             # MP3 音頻下載選項
             ydl_opts.update({
                 'format': 'bestaudio/best',
@@ -343,13 +770,44 @@ class YouTubeDownloader:
         except Exception as e:
             print(f"嵌入縮圖錯誤: {e}")
     
+    def _cleanup_partial_files(self):
+        """清理被取消任務留下的 .part、.ytdl 及中間音視頻文件"""
+        remove_partial_files(self._partial_files, since=self._started_at)
+        self._partial_files = set()
+    
     def cancel(self):
         """
         取消當前下載任務
+        
+        設置取消令牌，下載線程會在下一次進度回調時中止傳輸，
+        並終止正在運行的 ffmpeg 後處理進程。
         """
-        self.is_downloading = False
-        if self.callback:
-            self.callback({
-                'status': 'cancelled',
-                'message': '下載已取消'
-            })
+        if not self.is_downloading and not self.cancel_event.is_set():
+            if self.callback:
+                self.callback({
+                    'status': 'cancelled',
+                    'message': '下載已取消'
+                })
+            return
+        
+        self.cancel_event.set()
+        
+        # 終止正在運行的 ffmpeg 子進程
+        for process in list(self._child_processes):
+            try:
+                if process.poll() is None:
+                    process.terminate()
+            except Exception as e:
+                print(f"終止子進程失敗: {e}")
+    
+    def pause(self):
+        """
+        暫停當前下載任務
+        
+        與取消相同地中止傳輸，但保留 .part 文件，之後可以相同的格式 ID 續傳。
+        """
+        if not self.is_downloading and not self.cancel_event.is_set():
+            return
+        
+        self.pause_requested = True
+        self.cancel()
@@ -0,0 +1,188 @@
+"""
+事件總線模塊 - 後台線程發布事件，由界面線程按固定幀率統一分發
+"""
+import threading
+from collections import deque
+
+from youtube_downloader.config import UI_FRAME_INTERVAL_MS, UI_MAX_EVENTS_PER_FRAME
+
+# 默認可合併的事件狀態 (同一任務只需顯示最新的一條)
+COALESCE_STATUSES = ('downloading', 'extracting')
+
+
+class EventBus:
+    """
+    界面事件總線
+    
+    後台線程調用 publish() 把事件放入隊列 (deque 的 append/popleft 是線程安全的)，
+    界面線程上的 after() 輪詢每幀取出隊列中的事件，同一任務連續的進度事件只保留最新一條，
+    每幀最多分發 max_events 個事件，其餘留到下一幀，避免大量並行下載時界面卡頓。
+    訂閱者的處理函數總是在界面線程中執行，可以直接更新組件。
+    """
+    
+    def __init__(self, frame_interval=UI_FRAME_INTERVAL_MS, max_events=UI_MAX_EVENTS_PER_FRAME):
+        """
+        初始化事件總線
+        
+        Args:
+            frame_interval (int): 輪詢間隔 (毫秒)
+            max_events (int): 每幀最多分發的事件數
+        """
+        self.frame_interval = frame_interval
+        self.max_events = max_events
+        self._queue = deque()
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._root = None
+        self._after_id = None
+    
+    def start(self, root):
+        """
+        在界面線程中開始輪詢
+        
+        Args:
+            root: Tk 根窗口
+        """
+        self._root = root
+        if self._after_id is None:
+            self._after_id = root.after(self.frame_interval, self._poll)
+    
+    def stop(self):
+        """停止輪詢"""
+        if self._root is not None and self._after_id is not None:
+            try:
+                self._root.after_cancel(self._after_id)
+            except Exception:
+                pass
+        self._after_id = None
+        self._root = None
+    
+    def subscribe(self, topic, handler):
+        """
+        訂閱主題
+        
+        Args:
+            topic (str): 主題名稱
+            handler (function): 處理函數 handler(event)，在界面線程中執行
+        """
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(handler)
+    
+    def unsubscribe(self, topic, handler=None):
+        """
+        取消訂閱
+        
+        Args:
+            topic (str): 主題名稱
+            handler (function): 處理函數，為 None 時移除該主題的所有訂閱者
+        """
+        with self._lock:
+            handlers = self._subscribers.get(topic)
+            if handler is None or not handlers:
+                self._subscribers.pop(topic, None)
+            elif handler in handlers:
+                handlers.remove(handler)
+                if not handlers:
+                    self._subscribers.pop(topic, None)
+    
+    def publish(self, topic, event, key=None, coalesce=False):
+        """
+        發布事件 (任何線程均可調用，立即返回)
+        
+        Args:
+            topic (str): 主題名稱
+            event (dict): 事件信息
+            key: 合併鍵 (如任務 ID)
+            coalesce (bool): 是否可與同一鍵、同一狀態的後續事件合併
+        """
+        self._queue.append((topic, key, coalesce, event))
+    
+    def publisher(self, topic, key_field=None, coalesce_statuses=COALESCE_STATUSES):
+        """
+        創建發布到指定主題的回調函數，可直接作為後台組件的 callback
+        
+        Args:
+            topic (str): 主題名稱
+            key_field (str): 事件中作為合併鍵的欄位 (如 job_id)，為 None 時整個主題共用一個鍵
+            coalesce_statuses (tuple): 可合併的事件狀態
+        
+        Returns:
+            function: 回調函數 callback(event)
+        """
+        def callback(event):
+            key = event.get(key_field) if key_field else None
+            self.publish(topic, event, key, event.get('status') in coalesce_statuses)
+        return callback
+    
+    def _poll(self):
+        """界面線程的輪詢函數，取出並分發一幀的事件"""
+        self._after_id = None
+        try:
+            self._dispatch(self._drain())
+        finally:
+            if self._root is not None:
+                self._after_id = self._root.after(self.frame_interval, self._poll)
+    
+    def _drain(self):
+        """
+        取出隊列中的事件並合併進度事件
+        
+        Returns:
+            list: 本幀要分發的 (主題, 事件) 列表
+        """
+        batch = []
+        # (主題, 鍵) -> {狀態: 在 batch 中的位置}
+        slots = {}
+        # 合併的事件也計入取出數量，避免進度事件源源不斷時本幀無法結束
+        remaining = self.max_events * 20
+        while self._queue and len(batch) < self.max_events and remaining > 0:
+            remaining -= 1
+            topic, key, coalesce, event = self._queue.popleft()
+            slot_key = (topic, key)
+            if coalesce:
+                status = event.get('status')
+                position = slots.get(slot_key, {}).get(status)
+                if position is not None:
+                    # 以最新的進度覆蓋尚未分發的舊進度
+                    batch[position] = (topic, event)
+                    continue
+                slots.setdefault(slot_key, {})[status] = len(batch)
+            else:
+                # 狀態變更之後的進度不能再合併到之前的進度中，否則會打亂順序
+                slots.pop(slot_key, None)
+            batch.append((topic, event))
+        return batch
+    
+    def _dispatch(self, batch):
+        """
+        將事件分發給訂閱者
+        
+        Args:
+            batch (list): (主題, 事件) 列表
+        """
+        for topic, event in batch:
+            with self._lock:
+                handlers = list(self._subscribers.get(topic, ()))
+            for handler in handlers:
+                try:
+                    handler(event)
+                except Exception as e:
+                    print(f"事件處理出錯 ({topic}): {str(e)}")
+
+
+_event_bus = None
+_event_bus_lock = threading.Lock()
+
+
+def get_event_bus():
+    """
+    獲取進程內共享的事件總線
+    
+    Returns:
+        EventBus: 事件總線
+    """
+    global _event_bus
+    with _event_bus_lock:
+        if _event_bus is None:
+            _event_bus = EventBus()
+        return _event_bus
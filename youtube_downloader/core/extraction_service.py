@@ -0,0 +1,148 @@
+"""
+影片信息提取服務 - 在各組件之間共享 yt-dlp 信息提取
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import yt_dlp
+
+from .metadata_cache import MetadataCache
+from .utils import extract_video_id
+
+
+class ExtractionService:
+    """影片信息提取服務 - 同一影片的並發請求只進行一次提取 (single-flight)"""
+    
+    def __init__(self, max_workers=4, cache=None):
+        """
+        初始化提取服務
+        
+        Args:
+            max_workers (int): 同時進行的最大提取數
+            cache (MetadataCache): 持久化影片信息緩存，為 None 時不使用緩存
+        """
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._in_flight = {}  # 影片 ID -> Future
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="extract-worker"
+        )
+    
+    def submit(self, url):
+        """
+        提交提取請求，若同一影片已在提取中則共享該次提取
+        
+        Args:
+            url (str): YouTube URL
+        
+        Returns:
+            concurrent.futures.Future: 結果為 yt-dlp 原始影片信息字典 (已清理私有欄位)
+        """
+        video_id = extract_video_id(url)
+        
+        if video_id and self.cache:
+            info, state = self.cache.get(video_id)
+            if info is not None:
+                if state == 'stale':
+                    # 流 URL 已過期: 立即返回緩存內容，同時在後台重新提取
+                    self._start_extraction(video_id, url)
+                future = Future()
+                future.set_result(info)
+                return future
+        
+        return self._start_extraction(video_id or url, url)
+    
+    def _start_extraction(self, key, url):
+        """
+        開始提取，若同一影片已在提取中則返回進行中的 Future
+        
+        Args:
+            key (str): 影片 ID (無法識別時為 URL)
+            url (str): YouTube URL
+            
+        Returns:
+            concurrent.futures.Future: 提取結果
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            
+            future = self._executor.submit(self._extract, url)
+            self._in_flight[key] = future
+        
+        future.add_done_callback(lambda f: self._release(key, f))
+        return future
+    
+    def extract(self, url, timeout=None):
+        """
+        同步提取影片信息
+        
+        Args:
+            url (str): YouTube URL
+            timeout (float): 最長等待秒數
+        
+        Returns:
+            dict: yt-dlp 原始影片信息字典
+        """
+        return self.submit(url).result(timeout)
+    
+    def _release(self, key, future):
+        """
+        提取結束後移除進行中的記錄
+        
+        Args:
+            key (str): 影片 ID
+            future (Future): 已完成的提取
+        """
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+    
+    def _extract(self, url):
+        """
+        使用 yt-dlp 提取影片信息
+        
+        Args:
+            url (str): YouTube URL
+        
+        Returns:
+            dict: yt-dlp 原始影片信息字典
+        """
+        ydl_opts = {
+            'format': 'best',
+            'skip_download': True,
+            'quiet': True,
+            'no_warnings': True,
+            'ignoreerrors': True,  # 避免格式不可用錯誤
+        }
+        
+        print(f"提取影片信息: {url}")
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info_dict = ydl.extract_info(url, download=False)
+            if not info_dict:
+                raise ValueError('無法獲取影片信息')
+            info_dict = ydl.sanitize_info(info_dict, remove_private_keys=True)
+        
+        if self.cache and info_dict.get('id'):
+            self.cache.put(info_dict['id'], info_dict)
+        return info_dict
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_extraction_service():
+    """
+    獲取進程內共享的提取服務實例
+    
+    Returns:
+        ExtractionService: 提取服務
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ExtractionService(cache=MetadataCache())
+        return _service
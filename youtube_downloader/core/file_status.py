@@ -0,0 +1,221 @@
+"""
+文件狀態模塊 - 在後台線程中檢查文件是否存在，避免網絡磁盤阻塞界面
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from youtube_downloader.config import (
+    FILE_STATUS_WORKERS, FILE_STATUS_CACHE_TTL, FILE_STATUS_PER_MOUNT
+)
+
+
+def get_mount_key(path):
+    """
+    獲取路徑所在的磁盤或網絡共享 (只做字符串處理，不訪問文件系統)
+    
+    Args:
+        path (str): 文件路徑
+    
+    Returns:
+        str: Windows 上為盤符或 UNC 共享 (\\\\server\\share)，其他系統為前兩級目錄
+    """
+    drive, rest = os.path.splitdrive(os.path.abspath(path))
+    if drive:
+        return drive.lower()
+    parts = [part for part in rest.split(os.sep) if part]
+    return os.sep + os.sep.join(parts[:2])
+
+
+class FileStatusScanner:
+    """
+    文件狀態掃描器
+    
+    以線程池並行 stat 文件，結果 (是否存在、大小、修改時間) 緩存 cache_ttl 秒；
+    同一磁盤或網絡共享上同時進行的 stat 不超過 per_mount 個，避免拖慢慢速 NAS。
+    待檢查的文件按所在磁盤排隊，每個磁盤最多佔用 per_mount 個檢查線程，
+    慢速磁盤的檢查只在自己的隊列中等待，不會佔滿線程池而阻塞其他磁盤的檢查。
+    """
+    
+    def __init__(self, max_workers=FILE_STATUS_WORKERS, cache_ttl=FILE_STATUS_CACHE_TTL,
+                 per_mount=FILE_STATUS_PER_MOUNT):
+        """
+        初始化文件狀態掃描器
+        
+        Args:
+            max_workers (int): 檢查線程數
+            cache_ttl (float): 檢查結果的有效期 (秒)
+            per_mount (int): 每個磁盤或網絡共享同時進行的最大檢查數
+        """
+        self.cache_ttl = cache_ttl
+        self.per_mount = per_mount
+        self._cache = {}
+        self._pending = {}
+        self._mount_queues = {}
+        self._mount_active = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="file-status"
+        )
+    
+    def get_cached(self, path):
+        """
+        獲取未過期的檢查結果
+        
+        Args:
+            path (str): 文件路徑
+        
+        Returns:
+            dict: 文件狀態 (path, exists, size, mtime, checked_at, changed)，沒有緩存時返回 None
+        """
+        with self._lock:
+            status = self._cache.get(path)
+        if status and time.time() - status['checked_at'] < self.cache_ttl:
+            return status
+        return None
+    
+    def is_missing(self, path):
+        """
+        根據最近一次檢查結果判斷文件是否缺失 (不訪問文件系統)
+        
+        Args:
+            path (str): 文件路徑
+        
+        Returns:
+            bool: 缺失時為 True，存在時為 False，尚未檢查過時返回 None
+        """
+        with self._lock:
+            status = self._cache.get(path)
+        return None if status is None else not status['exists']
+    
+    def check(self, paths, callback):
+        """
+        在後台檢查多個文件，立即返回
+        
+        已緩存的結果直接通過回調返回；同一路徑正在檢查時不會重複檢查，
+        檢查完成後通知所有等待的回調。
+        
+        Args:
+            paths (iterable): 文件路徑
+            callback (function): 回調函數 callback(status)，在調用線程或檢查線程中執行
+        """
+        for path in dict.fromkeys(paths):
+            if not path:
+                continue
+            
+            status = self.get_cached(path)
+            if status:
+                callback(status)
+                continue
+            
+            with self._lock:
+                waiters = self._pending.get(path)
+                if waiters is not None:
+                    waiters.append(callback)
+                    continue
+                self._pending[path] = [callback]
+            self._schedule(path)
+    
+    def invalidate(self, path=None):
+        """
+        清除檢查結果緩存
+        
+        Args:
+            path (str): 文件路徑，為 None 時清除全部
+        """
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(path, None)
+    
+    def _schedule(self, path):
+        """
+        把文件放入所在磁盤的隊列，該磁盤的檢查線程少於 per_mount 個時再提交一個
+        
+        Args:
+            path (str): 文件路徑
+        """
+        key = get_mount_key(path)
+        with self._lock:
+            self._mount_queues.setdefault(key, deque()).append(path)
+            active = self._mount_active.get(key, 0)
+            if active >= self.per_mount:
+                return
+            self._mount_active[key] = active + 1
+        self._executor.submit(self._drain_mount, key)
+    
+    def _drain_mount(self, key):
+        """
+        逐個檢查磁盤隊列中的文件，隊列清空後結束 (檢查線程執行函數)
+        
+        Args:
+            key (str): 磁盤或網絡共享 (見 get_mount_key)
+        """
+        while True:
+            with self._lock:
+                queue = self._mount_queues.get(key)
+                if not queue:
+                    self._mount_active[key] -= 1
+                    if not self._mount_active[key]:
+                        del self._mount_active[key]
+                        self._mount_queues.pop(key, None)
+                    return
+                path = queue.popleft()
+            self._check_path(path)
+    
+    def _check_path(self, path):
+        """
+        檢查單個文件 (在 _drain_mount 中調用)
+        
+        Args:
+            path (str): 文件路徑
+        """
+        try:
+            stat = os.stat(path)
+            exists, size, mtime = True, stat.st_size, stat.st_mtime
+        except OSError:
+            exists, size, mtime = False, 0, 0
+        
+        with self._lock:
+            previous = self._cache.get(path)
+            status = {
+                'path': path,
+                'exists': exists,
+                'size': size,
+                'mtime': mtime,
+                'checked_at': time.time(),
+                # 與上次檢查結果不同 (文件被刪除、替換或修改)
+                'changed': previous is not None and (
+                    previous['exists'], previous['size'], previous['mtime']
+                ) != (exists, size, mtime)
+            }
+            self._cache[path] = status
+            callbacks = self._pending.pop(path, [])
+        
+        for callback in callbacks:
+            try:
+                callback(status)
+            except Exception as e:
+                print(f"文件狀態回調出錯: {path}, {str(e)}")
+
+
+_scanner = None
+_scanner_lock = threading.Lock()
+
+
+def get_file_status_scanner():
+    """
+    獲取進程內共享的文件狀態掃描器
+    
+    Returns:
+        FileStatusScanner: 文件狀態掃描器
+    """
+    global _scanner
+    with _scanner_lock:
+        if _scanner is None:
+            _scanner = FileStatusScanner()
+        return _scanner
@@ -2,52 +2,257 @@
 歷史記錄模塊 - 管理下載歷史
 """
 import os
+import re
 import json
 import time
+import sqlite3
+import threading
 from datetime import datetime
 
+from .persistence import get_persistence_writer
+
+
+# 歷史記錄欄位 (與舊版 JSON 記錄的鍵一致)
+RECORD_FIELDS = (
+    "id", "title", "url", "thumbnail", "duration", "format",
+    "quality", "file_path", "download_time", "timestamp", "uploader"
+)
+
+# 查詢返回的欄位
+RECORD_COLUMNS = ', '.join(("record_id",) + RECORD_FIELDS)
+
+# 全文搜索的欄位
+SEARCH_FIELDS = ("title", "uploader", "url", "file_path")
+
+# 逐字符索引的欄位 (trigram 無法索引 1-2 個字符的搜索詞，這類短詞只在這些欄位中搜索)
+CHAR_SEARCH_FIELDS = ("title", "uploader")
+
+# 搜索詞按空白切分
+_SEARCH_TERM_RE = re.compile(r'\S+')
+
+
+def _split_chars(*values):
+    """
+    把文字拆成以空格分隔的單個字符 (只保留字母及數字)，供逐字符全文索引使用
+    
+    Args:
+        *values (str): 文字
+    
+    Returns:
+        str: 以空格分隔的字符
+    """
+    return ' '.join(char for value in values for char in (value or '') if char.isalnum())
+
 
 class DownloadHistory:
-    """下載歷史管理類"""
+    """
+    下載歷史管理類 - 以 SQLite (WAL 模式) 保存，新記錄由後台寫入線程批量插入
+    
+    尚未寫入數據庫的新記錄保存在內存中，查詢時與數據庫結果合併，讀取不需要等待寫入線程。
+    """
     
-    def __init__(self, history_file=None):
+    def __init__(self, history_file=None, db_file=None):
         """
         初始化下載歷史管理器
         
         Args:
-            history_file (str): 歷史記錄文件路徑
+            history_file (str): 舊版 JSON 歷史記錄文件路徑，存在時會一次性遷移到數據庫
+            db_file (str): 歷史記錄數據庫文件路徑
         """
+        # 默認文件位於用戶主目錄下
+        history_dir = os.path.join(os.path.expanduser("~"), ".youtube_downloader")
         if not history_file:
-            # 默認歷史記錄文件位於用戶主目錄下
-            history_dir = os.path.join(os.path.expanduser("~"), ".youtube_downloader")
             os.makedirs(history_dir, exist_ok=True)
             history_file = os.path.join(history_dir, "download_history.json")
-            
+        if not db_file:
+            os.makedirs(history_dir, exist_ok=True)
+            db_file = os.path.join(history_dir, "download_history.db")
+        
         self.history_file = history_file
-        self.history = self._load_history()
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        # 已提交給寫入線程、尚未寫入數據庫的記錄 (按提交順序)
+        self._pending = []
+        # 寫入失敗、等待與下一批一起重試的記錄數 (位於 _pending 最前面)
+        self._failed = 0
+        self._writer = get_persistence_writer()
+        self._conn = self._open_database()
+        self._migrate_json_history()
     
-    def _load_history(self):
+    def _open_database(self):
         """
-        加載歷史記錄
+        打開數據庫並創建表及索引
         
         Returns:
-            list: 歷史記錄列表
+            sqlite3.Connection: 數據庫連接
+        """
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "record_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "id TEXT, "
+            "title TEXT, "
+            "url TEXT, "
+            "thumbnail TEXT, "
+            "duration TEXT, "
+            "format TEXT, "
+            "quality TEXT, "
+            "file_path TEXT, "
+            "download_time TEXT, "
+            "timestamp INTEGER)"
+        )
+        # 舊版數據庫沒有上傳者欄位
+        columns = [row["name"] for row in conn.execute("PRAGMA table_info(history)")]
+        if "uploader" not in columns:
+            conn.execute("ALTER TABLE history ADD COLUMN uploader TEXT DEFAULT ''")
+        # 逐字符索引的內容 (插入記錄時由 _insert_rows 填寫)
+        if "search_chars" not in columns:
+            conn.execute("ALTER TABLE history ADD COLUMN search_chars TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_video ON history (id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_url ON history (url)")
+        self._fts_tokenizer = self._create_search_index(conn)
+        self._char_index = self._fts_tokenizer == 'trigram' and self._create_char_index(conn)
+        conn.commit()
+        return conn
+    
+    def _create_search_index(self, conn):
         """
-        if os.path.exists(self.history_file):
+        創建 FTS5 全文索引及同步觸發器
+        
+        優先使用 trigram 分詞器 (支持中文等無空格文字的子串搜索)，
+        不支持時改用 unicode61，SQLite 沒有 FTS5 時返回 None，搜索改用 LIKE。
+        
+        Args:
+            conn (sqlite3.Connection): 數據庫連接
+        
+        Returns:
+            str: 使用的分詞器名稱，無法創建全文索引時返回 None
+        """
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'"
+        ).fetchone()
+        if row:
+            return 'trigram' if 'trigram' in row["sql"] else 'unicode61'
+        
+        columns = ', '.join(SEARCH_FIELDS)
+        for tokenizer in ('trigram', 'unicode61'):
             try:
-                with open(self.history_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return []
-        return []
+                conn.execute(
+                    f"CREATE VIRTUAL TABLE history_fts USING fts5("
+                    f"{columns}, content='history', content_rowid='record_id', tokenize='{tokenizer}')"
+                )
+                break
+            except sqlite3.OperationalError:
+                continue
+        else:
+            print("SQLite 不支持 FTS5，歷史記錄搜索將使用 LIKE 查詢")
+            return None
+        
+        new_values = ', '.join(f"new.{field}" for field in SEARCH_FIELDS)
+        old_values = ', '.join(f"old.{field}" for field in SEARCH_FIELDS)
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN "
+            f"INSERT INTO history_fts (rowid, {columns}) VALUES (new.record_id, {new_values}); END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN "
+            f"INSERT INTO history_fts (history_fts, rowid, {columns}) "
+            f"VALUES ('delete', old.record_id, {old_values}); END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS history_fts_update AFTER UPDATE ON history BEGIN "
+            f"INSERT INTO history_fts (history_fts, rowid, {columns}) "
+            f"VALUES ('delete', old.record_id, {old_values}); "
+            f"INSERT INTO history_fts (rowid, {columns}) VALUES (new.record_id, {new_values}); END"
+        )
+        # 為已有的記錄建立索引
+        conn.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+        return tokenizer
     
-    def _save_history(self):
-        """保存歷史記錄"""
+    def _create_char_index(self, conn):
+        """
+        創建逐字符 FTS5 索引 (history_chars)，用於 trigram 無法索引的 1-2 個字符的搜索詞
+        
+        索引內容為 CHAR_SEARCH_FIELDS 拆成單個字符後的 search_chars 欄位，
+        短詞以字符短語查詢 (如 "測 試") 篩選出候選記錄，再由 LIKE 確認原文中連續出現。
+        
+        Args:
+            conn (sqlite3.Connection): 數據庫連接
+        
+        Returns:
+            bool: 是否可以使用逐字符索引
+        """
+        # 填寫新增欄位前的記錄及舊版程序插入的記錄 (索引已存在時由觸發器同步)
+        conn.create_function("split_chars", len(CHAR_SEARCH_FIELDS), _split_chars, deterministic=True)
+        conn.execute(
+            f"UPDATE history SET search_chars = split_chars({', '.join(CHAR_SEARCH_FIELDS)}) "
+            f"WHERE search_chars IS NULL"
+        )
+        
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_chars'"
+        ).fetchone()
+        if row:
+            return True
+        
         try:
-            with open(self.history_file, "w", encoding="utf-8") as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
+            conn.execute(
+                "CREATE VIRTUAL TABLE history_chars USING fts5("
+                "search_chars, content='history', content_rowid='record_id', "
+                "tokenize='unicode61 remove_diacritics 0')"
+            )
+        except sqlite3.OperationalError as e:
+            print(f"無法創建逐字符索引，短搜索詞將使用 LIKE 查詢: {e}")
+            return False
+        
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS history_chars_insert AFTER INSERT ON history BEGIN "
+            "INSERT INTO history_chars (rowid, search_chars) VALUES (new.record_id, new.search_chars); END"
+        )
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS history_chars_delete AFTER DELETE ON history BEGIN "
+            "INSERT INTO history_chars (history_chars, rowid, search_chars) "
+            "VALUES ('delete', old.record_id, old.search_chars); END"
+        )
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS history_chars_update AFTER UPDATE ON history BEGIN "
+            "INSERT INTO history_chars (history_chars, rowid, search_chars) "
+            "VALUES ('delete', old.record_id, old.search_chars); "
+            "INSERT INTO history_chars (rowid, search_chars) VALUES (new.record_id, new.search_chars); END"
+        )
+        conn.execute("INSERT INTO history_chars (history_chars) VALUES ('rebuild')")
+        return True
+    
+    def _migrate_json_history(self):
+        """將舊版 JSON 歷史記錄遷移到數據庫 (遷移後重命名原文件，只執行一次)"""
+        if not os.path.exists(self.history_file):
+            return
+        
+        try:
+            with open(self.history_file, "r", encoding="utf-8") as f:
+                records = json.load(f)
         except Exception as e:
-            print(f"無法保存歷史記錄: {e}")
+            print(f"無法讀取舊版歷史記錄: {e}")
+            return
+        
+        # JSON 中最新的記錄在最前面，按時間順序插入
+        rows = [
+            tuple(record.get(field, "") for field in RECORD_FIELDS)
+            for record in reversed(records) if isinstance(record, dict)
+        ]
+        with self._lock:
+            self._insert_rows(rows)
+            self._conn.commit()
+        
+        try:
+            os.replace(self.history_file, self.history_file + ".migrated")
+        except OSError as e:
+            print(f"無法重命名舊版歷史記錄文件: {e}")
+        print(f"已將 {len(rows)} 條歷史記錄遷移到數據庫")
     
     def add_record(self, video_info, download_options, file_path):
         """
@@ -68,52 +273,267 @@ class DownloadHistory:
             "format": download_options.get("format", ""),
             "quality": download_options.get("quality", ""),
             "file_path": file_path,
+            "uploader": video_info.get("uploader", ""),
             "download_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "timestamp": int(time.time())
         }
         
-        # 添加到歷史記錄
-        self.history.insert(0, record)  # 新記錄插入到最前面
+        # 交給後台寫入線程批量插入，不在調用線程中等待磁盤
+        with self._lock:
+            self._pending.append(record)
+        self._writer.submit(self, tuple(record[field] for field in RECORD_FIELDS))
         
-        # 限制歷史記錄數量
-        if len(self.history) > 100:
-            self.history = self.history[:100]
+        return record
+    
+    def write_batch(self, rows):
+        """
+        批量插入歷史記錄 (由持久化寫入線程調用，一批記錄一個事務)
         
-        # 保存歷史記錄
-        self._save_history()
+        寫入失敗時回滾事務，記錄保留在內存中並與下一批一起重試。
         
-        return record
+        Args:
+            rows (list): 按 RECORD_FIELDS 排列的記錄元組列表
+        """
+        with self._lock:
+            retry = [tuple(record[field] for field in RECORD_FIELDS) for record in self._pending[:self._failed]]
+            try:
+                self._insert_rows(retry + list(rows))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self._failed += len(rows)
+                raise
+            
+            # 寫入線程按提交順序寫入，已寫入的記錄位於隊列最前面
+            del self._pending[:self._failed + len(rows)]
+            self._failed = 0
     
-    def get_records(self, limit=10):
+    def _insert_rows(self, rows):
         """
-        獲取歷史記錄
+        插入記錄並填寫逐字符索引的內容 (調用方需持有鎖)
+        
+        Args:
+            rows (list): 按 RECORD_FIELDS 排列的記錄元組列表
+        """
+        char_fields = [RECORD_FIELDS.index(field) for field in CHAR_SEARCH_FIELDS]
+        self._conn.executemany(
+            f"INSERT INTO history ({', '.join(RECORD_FIELDS)}, search_chars) "
+            f"VALUES ({', '.join('?' * (len(RECORD_FIELDS) + 1))})",
+            [tuple(row) + (_split_chars(*(row[index] for index in char_fields)),) for row in rows]
+        )
+    
+    def sync(self):
+        """將 WAL 日誌寫回數據庫文件並落盤 (關閉應用程序時調用)"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+    
+    def get_records(self, limit=10, offset=0):
+        """
+        獲取歷史記錄 (最新的在前)
         
         Args:
             limit (int): 限制返回的記錄數量
-            
+            offset (int): 跳過的記錄數量，用於分頁
+        
         Returns:
             list: 歷史記錄列表
         """
-        return self.history[:limit]
+        with self._lock:
+            pending, limit, offset = self._page_pending(self._pending_records(), limit, offset)
+            rows = self._conn.execute(
+                f"SELECT {RECORD_COLUMNS} FROM history "
+                f"ORDER BY timestamp DESC, record_id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return pending + [dict(row) for row in rows]
+    
+    def count(self):
+        """
+        獲取歷史記錄總數
+        
+        Returns:
+            int: 記錄數量
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0] + len(self._pending)
+    
+    def find_by_video_id(self, video_id):
+        """
+        查找指定影片的下載記錄
+        
+        Args:
+            video_id (str): 影片 ID
+        
+        Returns:
+            list: 歷史記錄列表 (最新的在前)
+        """
+        with self._lock:
+            pending = self._pending_records(lambda record: record["id"] == video_id)
+            rows = self._conn.execute(
+                f"SELECT {RECORD_COLUMNS} FROM history WHERE id = ? ORDER BY timestamp DESC, record_id DESC",
+                (video_id,)
+            ).fetchall()
+        return pending + [dict(row) for row in rows]
+    
+    def search(self, query, limit=50, offset=0):
+        """
+        按標題、上傳者、URL 及文件路徑搜索歷史記錄 (最新的在前)
+        
+        Args:
+            query (str): 搜索詞，以空白分隔的多個詞需全部匹配
+            limit (int): 限制返回的記錄數量
+            offset (int): 跳過的記錄數量，用於分頁
+        
+        Returns:
+            list: 歷史記錄列表
+        """
+        terms = _SEARCH_TERM_RE.findall(query or "")
+        if not terms:
+            return self.get_records(limit=limit, offset=offset)
+        
+        match, conditions, params = self._build_search_query(terms)
+        lowered = [(term.lower(), self._search_fields(term)) for term in terms]
+        with self._lock:
+            pending, limit, offset = self._page_pending(
+                self._pending_records(lambda record: all(
+                    any(term in str(record[field]).lower() for field in fields) for term, fields in lowered
+                )),
+                limit, offset
+            )
+            if not conditions:
+                # 記錄按時間順序插入，直接按 rowid 倒序分頁，無需對全部匹配結果排序
+                rows = self._conn.execute(
+                    f"SELECT {RECORD_COLUMNS} FROM history JOIN ("
+                    f"SELECT rowid FROM history_fts WHERE history_fts MATCH ? "
+                    f"ORDER BY rowid DESC LIMIT ? OFFSET ?) AS matched "
+                    f"ON history.record_id = matched.rowid "
+                    f"ORDER BY history.record_id DESC",
+                    (match, limit, offset)
+                ).fetchall()
+            else:
+                if match is not None:
+                    conditions.insert(0, "record_id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+                    params.insert(0, match)
+                rows = self._conn.execute(
+                    f"SELECT {RECORD_COLUMNS} FROM history WHERE {' AND '.join(conditions)} "
+                    f"ORDER BY record_id DESC LIMIT ? OFFSET ?",
+                    params + [limit, offset]
+                ).fetchall()
+        return pending + [dict(row) for row in rows]
+    
+    def _pending_records(self, predicate=None):
+        """
+        獲取尚未寫入數據庫的記錄 (調用方需持有鎖)
+        
+        Args:
+            predicate (function): 篩選條件，None 表示全部
+        
+        Returns:
+            list: 歷史記錄列表 (最新的在前)
+        """
+        return [
+            dict(record, record_id=None) for record in reversed(self._pending)
+            if predicate is None or predicate(record)
+        ]
+    
+    @staticmethod
+    def _page_pending(pending, limit, offset):
+        """
+        分頁時先取尚未寫入數據庫的記錄 (均比數據庫中的記錄新)，再計算數據庫查詢的分頁參數
+        
+        Args:
+            pending (list): 尚未寫入數據庫的記錄 (最新的在前)
+            limit (int): 限制返回的記錄數量
+            offset (int): 跳過的記錄數量
+        
+        Returns:
+            tuple: (本頁的排隊記錄, 數據庫查詢的 limit, 數據庫查詢的 offset)
+        """
+        page = pending[offset:offset + limit]
+        return page, limit - len(page), max(0, offset - len(pending))
+    
+    def _search_fields(self, term):
+        """
+        獲取搜索詞匹配的欄位
+        
+        Args:
+            term (str): 搜索詞
+        
+        Returns:
+            tuple: 欄位名稱
+        """
+        if self._char_index and len(term) < 3 and _split_chars(term):
+            return CHAR_SEARCH_FIELDS
+        return SEARCH_FIELDS
+    
+    def _build_search_query(self, terms):
+        """
+        構建搜索條件
+        
+        3 個字符以上的詞使用全文索引 (history_fts) 匹配所有搜索欄位；
+        trigram 無法索引的 1-2 個字符的詞 (如中文的單字或雙字詞) 先以逐字符索引 (history_chars)
+        篩選出包含這些字符的記錄，再以 LIKE 確認在標題或上傳者中連續出現；
+        沒有全文索引或詞中沒有字母及數字時逐行以 LIKE 匹配所有搜索欄位。
+        
+        Args:
+            terms (list): 搜索詞列表
+        
+        Returns:
+            tuple: (history_fts 的 MATCH 查詢, 其他 WHERE 條件列表, 參數列表)，
+                MATCH 查詢為 None 表示不使用 history_fts，條件列表為空表示只使用 history_fts
+        """
+        match_terms = []
+        char_phrases = []
+        conditions = []
+        params = []
+        for term in terms:
+            if self._fts_tokenizer and (len(term) >= 3 or self._fts_tokenizer != 'trigram'):
+                match_terms.append(term)
+                continue
+            
+            fields = self._search_fields(term)
+            if fields is CHAR_SEARCH_FIELDS:
+                char_phrases.append('"' + _split_chars(term) + '"')
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append("(" + " OR ".join(f"{field} LIKE ? ESCAPE '\\'" for field in fields) + ")")
+            params.extend([pattern] * len(fields))
+        
+        if char_phrases:
+            conditions.insert(0, "record_id IN (SELECT rowid FROM history_chars WHERE history_chars MATCH ?)")
+            params.insert(0, ' '.join(char_phrases))
+        
+        if not match_terms:
+            return None, conditions, params
+        quoted = ['"' + term.replace('"', '""') + '"' for term in match_terms]
+        if self._fts_tokenizer != 'trigram':
+            # unicode61 按詞切分，使用前綴匹配
+            quoted = [term + '*' for term in quoted]
+        return ' '.join(quoted), conditions, params
     
     def clear_history(self):
         """清除所有歷史記錄"""
-        self.history = []
-        self._save_history()
+        self._writer.flush()
+        with self._lock:
+            self._conn.execute("DELETE FROM history")
+            self._conn.commit()
     
     def delete_record(self, record_id):
         """
         刪除指定記錄
         
         Args:
-            record_id (str): 記錄 ID
-            
+            record_id (str): 記錄 ID (影片 ID，刪除該影片最新的一條記錄)
+        
         Returns:
             bool: 是否成功刪除
         """
-        for i, record in enumerate(self.history):
-            if record.get("id") == record_id:
-                del self.history[i]
-                self._save_history()
-                return True
-        return False
+        self._writer.flush()
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM history WHERE record_id = ("
+                "SELECT record_id FROM history WHERE id = ? "
+                "ORDER BY timestamp DESC, record_id DESC LIMIT 1)",
+                (record_id,)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
@@ -0,0 +1,142 @@
+"""
+下載日誌模塊 - 記錄未完成的下載任務，以便暫停後或重啟應用程序後續傳
+"""
+import os
+import json
+import time
+import threading
+
+from .persistence import get_persistence_writer
+
+
+class DownloadJournal:
+    """
+    下載任務日誌類 - 保存任務的下載選項、格式 ID 及已下載字節數
+    
+    日誌文件由後台持久化寫入線程保存，多次更新只寫入最新的快照；
+    進度更新按寫入間隔合併，狀態變更會盡快寫入。
+    """
+    
+    def __init__(self, journal_file=None):
+        """
+        初始化下載日誌
+        
+        Args:
+            journal_file (str): 日誌文件路徑
+        """
+        if not journal_file:
+            # 默認日誌文件位於用戶主目錄下
+            journal_dir = os.path.join(os.path.expanduser("~"), ".youtube_downloader")
+            os.makedirs(journal_dir, exist_ok=True)
+            journal_file = os.path.join(journal_dir, "download_journal.json")
+        
+        self.journal_file = journal_file
+        self._lock = threading.Lock()
+        self._writer = get_persistence_writer()
+        self.entries = self._load_journal()
+    
+    def _load_journal(self):
+        """
+        加載日誌
+        
+        Returns:
+            dict: 任務 ID 到日誌條目的字典
+        """
+        if os.path.exists(self.journal_file):
+            try:
+                with open(self.journal_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+        return {}
+    
+    def _save_journal(self, durable=False):
+        """
+        保存日誌 (先寫入臨時文件再替換，避免崩潰時損壞)
+        
+        Args:
+            durable (bool): 是否在替換前將臨時文件落盤
+        """
+        with self._lock:
+            data = json.dumps(self.entries, ensure_ascii=False)
+        try:
+            temp_file = self.journal_file + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_file, self.journal_file)
+        except Exception as e:
+            print(f"無法保存下載日誌: {e}")
+    
+    def write_batch(self, items):
+        """
+        寫入日誌快照 (由持久化寫入線程調用，同一批的多次更新只寫一次)
+        
+        Args:
+            items (list): 寫入請求 (不使用，總是寫入當前快照)
+        """
+        self._save_journal()
+    
+    def sync(self):
+        """將日誌寫入並落盤 (關閉應用程序時調用)"""
+        self._save_journal(durable=True)
+    
+    def update(self, job_id, force=True, **fields):
+        """
+        更新任務日誌條目
+        
+        Args:
+            job_id (str): 任務 ID
+            force (bool): 是否盡快保存，為 False 時等待下一次定時寫入
+            **fields: 要更新的欄位
+        """
+        with self._lock:
+            entry = self.entries.setdefault(job_id, {'job_id': job_id})
+            entry.update(fields)
+            entry['updated'] = int(time.time())
+        self._writer.submit(self, urgent=force)
+    
+    def remove(self, job_id):
+        """
+        移除任務日誌條目
+        
+        Args:
+            job_id (str): 任務 ID
+        """
+        with self._lock:
+            removed = self.entries.pop(job_id, None) is not None
+        if removed:
+            self._writer.submit(self, urgent=True)
+    
+    def get(self, job_id):
+        """
+        獲取任務日誌條目
+        
+        Args:
+            job_id (str): 任務 ID
+        
+        Returns:
+            dict: 日誌條目，找不到時返回 None
+        """
+        with self._lock:
+            entry = self.entries.get(job_id)
+            return dict(entry) if entry else None
+    
+    def get_unfinished(self):
+        """
+        獲取所有未完成的任務
+        
+        Returns:
+            list: 日誌條目列表，按創建時間排序
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in self.entries.values()]
+        return sorted(entries, key=lambda entry: entry.get('started_at', 0))
+    
+    def clear(self):
+        """清除所有日誌條目"""
+        with self._lock:
+            self.entries = {}
+        self._writer.submit(self, urgent=True)
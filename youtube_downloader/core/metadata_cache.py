@@ -0,0 +1,170 @@
+"""
+影片信息緩存模塊 - 以 SQLite 持久化保存已提取的影片信息
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+from youtube_downloader.config import (
+    METADATA_CACHE_MAX_ENTRIES, METADATA_STATIC_TTL, STREAM_EXPIRY_MARGIN
+)
+from .persistence import get_persistence_writer
+from .utils import get_stream_expiry
+
+
+class MetadataCache:
+    """
+    影片信息緩存類
+    
+    以影片 ID 為鍵，按欄位類型使用不同的有效期：
+    標題、時長等靜態欄位在 METADATA_STATIC_TTL 內有效，
+    流 URL 則在其 expire 參數到期後視為過期 (stale)，
+    過期的條目仍會返回，由調用方在後台重新提取。
+    寫入與訪問時間更新由後台持久化寫入線程批量提交。
+    """
+    
+    def __init__(self, db_file=None, max_entries=METADATA_CACHE_MAX_ENTRIES, static_ttl=METADATA_STATIC_TTL):
+        """
+        初始化影片信息緩存
+        
+        Args:
+            db_file (str): 數據庫文件路徑
+            max_entries (int): 最大條目數，超出時淘汰最久未訪問的條目
+            static_ttl (int): 靜態欄位的有效期 (秒)
+        """
+        if not db_file:
+            # 默認緩存文件位於用戶主目錄下
+            cache_dir = os.path.join(os.path.expanduser("~"), ".youtube_downloader")
+            os.makedirs(cache_dir, exist_ok=True)
+            db_file = os.path.join(cache_dir, "metadata_cache.db")
+        
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.static_ttl = static_ttl
+        self._lock = threading.Lock()
+        self._writer = get_persistence_writer()
+        # 尚未寫入數據庫的條目: 影片 ID -> (info_blob, fetched_at, streams_expire_at)
+        self._pending = {}
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            "video_id TEXT PRIMARY KEY, "
+            "info BLOB NOT NULL, "
+            "fetched_at REAL NOT NULL, "
+            "streams_expire_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_metadata_accessed ON metadata (accessed_at)"
+        )
+        self._conn.commit()
+    
+    def get(self, video_id):
+        """
+        讀取緩存的影片信息
+        
+        Args:
+            video_id (str): 影片 ID
+        
+        Returns:
+            tuple: (影片信息字典, 狀態)，狀態為 'fresh'、'stale' 或 'miss'
+        """
+        now = time.time()
+        with self._lock:
+            row = self._pending.get(video_id)
+            if row is None:
+                row = self._conn.execute(
+                    "SELECT info, fetched_at, streams_expire_at FROM metadata WHERE video_id = ?",
+                    (video_id,)
+                ).fetchone()
+        if row is None:
+            return None, 'miss'
+        
+        info_blob, fetched_at, streams_expire_at = row
+        if now - fetched_at > self.static_ttl:
+            # 靜態欄位也已過期，視為未命中
+            self._writer.submit(self, ('delete', video_id, None))
+            return None, 'miss'
+        
+        self._writer.submit(self, ('touch', video_id, now))
+        
+        try:
+            info = json.loads(zlib.decompress(info_blob).decode("utf-8"))
+        except Exception as e:
+            print(f"讀取影片信息緩存失敗: {e}")
+            return None, 'miss'
+        
+        state = 'fresh' if now < streams_expire_at else 'stale'
+        return info, state
+    
+    def put(self, video_id, info):
+        """
+        寫入影片信息
+        
+        Args:
+            video_id (str): 影片 ID
+            info (dict): yt-dlp 原始影片信息字典 (已清理私有欄位)
+        """
+        now = time.time()
+        streams_expire_at = get_stream_expiry(info) - STREAM_EXPIRY_MARGIN
+        info_blob = zlib.compress(json.dumps(info, ensure_ascii=False).encode("utf-8"))
+        
+        row = (info_blob, now, streams_expire_at)
+        with self._lock:
+            self._pending[video_id] = row
+        self._writer.submit(self, ('put', video_id, row))
+    
+    def write_batch(self, items):
+        """
+        批量寫入緩存變更 (由持久化寫入線程調用，一批變更一個事務)
+        
+        Args:
+            items (list): (操作, 影片 ID, 參數) 列表，操作為 put、touch 或 delete
+        """
+        with self._lock:
+            try:
+                for action, video_id, value in items:
+                    if action == 'put':
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO metadata "
+                            "(video_id, info, fetched_at, streams_expire_at, accessed_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (video_id,) + value + (value[1],)
+                        )
+                    elif action == 'touch':
+                        self._conn.execute(
+                            "UPDATE metadata SET accessed_at = ? WHERE video_id = ?",
+                            (value, video_id)
+                        )
+                    else:
+                        self._conn.execute("DELETE FROM metadata WHERE video_id = ?", (video_id,))
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"寫入影片信息緩存失敗: {e}")
+            
+            # 已寫入的條目不再需要保存在內存中 (期間又被更新的條目保留)
+            for action, video_id, value in items:
+                if action == 'put' and self._pending.get(video_id) is value:
+                    del self._pending[video_id]
+    
+    def _evict(self):
+        """淘汰超出容量上限、最久未訪問的條目 (調用方需持有鎖)"""
+        count = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM metadata WHERE video_id IN ("
+                "SELECT video_id FROM metadata ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+    
+    def clear(self):
+        """清除所有緩存"""
+        self._writer.flush()
+        with self._lock:
+            self._pending.clear()
+            self._conn.execute("DELETE FROM metadata")
+            self._conn.commit()
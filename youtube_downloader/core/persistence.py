@@ -0,0 +1,173 @@
+"""
+持久化寫入模塊 - 在後台線程中批量寫入歷史記錄、緩存及任務日誌
+"""
+import threading
+
+from youtube_downloader.config import PERSIST_FLUSH_INTERVAL, PERSIST_MAX_PENDING
+
+
+class PersistenceWriter:
+    """
+    後台持久化寫入器
+    
+    調用方只需把寫入請求放入隊列即可返回，不會在界面線程或下載線程中等待磁盤。
+    寫入線程每隔 flush_interval 秒，或排隊的請求達到 max_pending 條時，
+    按存儲對象分組調用其 write_batch(items)，每個存儲一次寫入一個事務。
+    
+    存儲對象需實現 write_batch(items)，可選實現 sync() 用於關閉時的持久化落盤。
+    """
+    
+    def __init__(self, flush_interval=PERSIST_FLUSH_INTERVAL, max_pending=PERSIST_MAX_PENDING):
+        """
+        初始化持久化寫入器
+        
+        Args:
+            flush_interval (float): 定時寫入的間隔 (秒)
+            max_pending (int): 排隊請求達到此數量時立即寫入
+        """
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue = []
+        self._sinks = {}
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._written = 0
+        self._flush_requested = False
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, sink, item=None, urgent=False):
+        """
+        提交寫入請求，立即返回
+        
+        Args:
+            sink: 存儲對象 (實現 write_batch)
+            item: 交給 write_batch 的寫入內容，快照式存儲可傳 None
+            urgent (bool): 是否盡快寫入，不等待定時間隔
+        """
+        with self._cond:
+            if self._stopping:
+                # 已關閉時直接同步寫入，避免丟失數據
+                self._write_batch(sink, [item])
+                return
+            self._queue.append((sink, item))
+            self._sinks[id(sink)] = sink
+            self._submitted += 1
+            if urgent:
+                self._flush_requested = True
+            if urgent or len(self._queue) >= self.max_pending:
+                self._cond.notify_all()
+    
+    def flush(self, timeout=None):
+        """
+        等待此前提交的寫入請求全部完成 (讀取前調用以保證讀到最新數據)
+        
+        Args:
+            timeout (float): 最長等待時間 (秒)，None 表示一直等待
+        
+        Returns:
+            bool: 是否已全部寫入
+        """
+        if threading.current_thread() is self._thread:
+            return False
+        
+        with self._cond:
+            target = self._submitted
+            if self._written >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: self._written >= target or not self._thread.is_alive(),
+                timeout
+            ) and self._written >= target
+    
+    def shutdown(self, timeout=10):
+        """
+        寫入所有排隊的請求並停止寫入線程，之後調用各存儲的 sync() 持久化落盤
+        
+        Args:
+            timeout (float): 等待寫入線程結束的最長時間 (秒)
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        
+        for sink in list(self._sinks.values()):
+            sync = getattr(sink, 'sync', None)
+            if sync:
+                try:
+                    sync()
+                except Exception as e:
+                    print(f"持久化落盤失敗: {e}")
+    
+    def _run(self):
+        """寫入線程執行函數"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or self._flush_requested
+                    or len(self._queue) >= self.max_pending,
+                    self.flush_interval
+                )
+                batch, self._queue = self._queue, []
+                target = self._submitted
+                self._flush_requested = False
+                stopping = self._stopping
+            
+            self._write(batch)
+            
+            with self._cond:
+                self._written = target
+                self._cond.notify_all()
+            
+            if stopping:
+                break
+    
+    def _write(self, batch):
+        """
+        按存儲對象分組寫入 (保持每個存儲內的提交順序)
+        
+        Args:
+            batch (list): (存儲對象, 寫入內容) 列表
+        """
+        groups = {}
+        for sink, item in batch:
+            groups.setdefault(id(sink), (sink, []))[1].append(item)
+        
+        for sink, items in groups.values():
+            self._write_batch(sink, items)
+    
+    @staticmethod
+    def _write_batch(sink, items):
+        """
+        調用存儲對象的批量寫入，錯誤不影響其他存儲
+        
+        Args:
+            sink: 存儲對象
+            items (list): 寫入內容列表
+        """
+        try:
+            sink.write_batch(items)
+        except Exception as e:
+            print(f"批量寫入失敗 ({type(sink).__name__}): {e}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_persistence_writer():
+    """
+    獲取進程內共享的持久化寫入器
+    
+    Returns:
+        PersistenceWriter: 持久化寫入器
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = PersistenceWriter()
+        return _writer
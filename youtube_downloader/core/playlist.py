@@ -2,24 +2,55 @@
 播放列表處理模組 - 處理 YouTube 播放列表的獲取和下載
 """
 import threading
+import time
+import queue
 import yt_dlp
-import re
 import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from youtube_downloader.config import (
+    PLAYLIST_DETAIL_WORKERS, PLAYLIST_DETAIL_TIMEOUT, PLAYLIST_FAST_LISTING, PLAYLIST_STREAM_QUEUE_SIZE,
+    CONCURRENCY_MAX_JOBS, PLAYLIST_RATE_LIMIT
+)
+from .archive import get_download_archive
+from .bandwidth import get_bandwidth_governor, new_group_name
+from .download_manager import DownloadManager
+from .extraction_service import get_extraction_service
+
+from .url_parser import parse_youtube_url, KIND_CHANNEL
 
 
 class PlaylistProcessor:
     """播放列表處理器類"""
     
-    def __init__(self, callback=None):
+    def __init__(self, callback=None, detail_workers=PLAYLIST_DETAIL_WORKERS, detail_timeout=PLAYLIST_DETAIL_TIMEOUT,
+                 fast_listing=PLAYLIST_FAST_LISTING, max_concurrent=CONCURRENCY_MAX_JOBS,
+                 rate_limit=PLAYLIST_RATE_LIMIT):
         """
         初始化播放列表處理器
         
         Args:
             callback (function): 回調函數，用於更新 UI
+            detail_workers (int): 並行提取影片詳細信息的線程數
+            detail_timeout (float): 提取單個影片詳細信息的超時時間 (秒)
+            fast_listing (bool): 是否只使用平面提取結果列出影片，詳細信息在需要時才獲取
+            max_concurrent (int): 批量下載時同時下載的影片數上限 (實際數量由並發控制器在此範圍內調整)
+            rate_limit (int): 批量下載的總帶寬上限 (字節/秒)，None 表示不限速
         """
         self.callback = callback
+        self.detail_workers = detail_workers
+        self.detail_timeout = detail_timeout
+        self.fast_listing = fast_listing
+        self.max_concurrent = max(1, max_concurrent)
+        self.rate_limit = rate_limit
+        # 批量下載的任務共用帶寬分組上限，任務結束後其帶寬由同一播放列表的其他任務分享
+        self.rate_group = new_group_name("playlist")
+        get_bandwidth_governor().set_group_limit(self.rate_group, rate_limit)
+        # 每次開始新的列出操作時遞增，用於讓過時的列出線程自行結束
+        self._listing_generation = 0
         self.is_processing = False
         self.current_task = None
+        self._batch_manager = None
         
     def extract_playlist_info(self, url, async_extract=True):
         """
@@ -49,10 +80,11 @@ class PlaylistProcessor:
             })
         
         if async_extract:
-            # 啟動異步提取線程
+            # 啟動異步提取線程，快速列表模式下邊列出邊發送 entry 事件
+            self._listing_generation += 1
             extract_thread = threading.Thread(
-                target=self._extract_thread,
-                args=(url,)
+                target=self._stream_extract_thread if self.fast_listing else self._extract_thread,
+                args=(url, self._listing_generation) if self.fast_listing else (url,)
             )
             extract_thread.daemon = True
             extract_thread.start()
@@ -83,6 +115,120 @@ class PlaylistProcessor:
                     'error': str(e)
                 })
     
+    def iter_playlist_entries(self, url, playlist_info=None):
+        """
+        逐頁列出播放列表中的影片 (生成器)
+        
+        條目在 yt-dlp 取得每一頁後即產出，不需要等待整個播放列表列出。
+        
+        Args:
+            url (str): YouTube 播放列表 URL
+            playlist_info (dict): 若提供，會在產出第一個條目前填入播放列表的基本信息
+            
+        Yields:
+            dict: 播放列表影片信息 (與快速列表模式的條目格式相同)
+        """
+        url = self._clean_playlist_url(url)
+        print(f"正在列出播放列表：{url}")
+        
+        opts = {
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'quiet': True,
+            'no_warnings': True,
+            'ignoreerrors': True,
+        }
+        
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            # process=False 時 entries 為按頁懶加載的生成器
+            ie_result = ydl.extract_info(url, download=False, process=False)
+            
+            # 影片附帶的播放列表等 URL 會先被解析為指向播放列表的 url 結果
+            for _ in range(3):
+                if not ie_result or ie_result.get('_type') not in ('url', 'url_transparent'):
+                    break
+                ie_result = ydl.extract_info(ie_result['url'], download=False, process=False)
+            
+            if not ie_result or ie_result.get('_type') != 'playlist':
+                raise ValueError('播放列表中沒有視頁或此URL不是播放列表')
+            
+            if playlist_info is not None:
+                playlist_info.update({
+                    'id': ie_result.get('id', ''),
+                    'title': ie_result.get('title', '未知播放列表'),
+                    'uploader': ie_result.get('uploader') or ie_result.get('channel') or '未知上傳者',
+                    'webpage_url': ie_result.get('webpage_url', url),
+                    'video_count': ie_result.get('playlist_count') or 0,
+                })
+            
+            index = 0
+            for entry in ie_result.get('entries') or []:
+                if not entry:
+                    continue
+                yield self._build_flat_entry(index, entry)
+                index += 1
+    
+    def _stream_extract_thread(self, url, generation):
+        """
+        異步列出線程執行函數，每列出一個條目即發送 entry 事件
+        
+        Args:
+            url (str): YouTube 播放列表 URL
+            generation (int): 本次列出操作的編號
+        """
+        playlist_info = {'entries': [], 'failed_entries': []}
+        try:
+            for entry in self.iter_playlist_entries(url, playlist_info):
+                if generation != self._listing_generation:
+                    # 已開始新的列出操作，放棄本次結果
+                    return
+                self._add_streamed_entry(playlist_info, entry)
+            
+            if generation != self._listing_generation:
+                return
+            playlist_info['video_count'] = len(playlist_info['entries'])
+            print(f"\033[1;36m成功列出播放列表中的 {playlist_info['video_count']} 個視頻\033[0m")
+            if self.callback:
+                self.callback({
+                    'status': 'complete',
+                    'playlist_info': playlist_info
+                })
+        except Exception as e:
+            print(f"列出播放列表失敗：{str(e)}")
+            if self.callback and generation == self._listing_generation:
+                self.callback({
+                    'status': 'error',
+                    'error': f'無法獲取播放列表信息: {str(e)}'
+                })
+    
+    def _add_streamed_entry(self, playlist_info, entry):
+        """
+        登記新列出的條目並通知界面
+        
+        Args:
+            playlist_info (dict): 正在構建的播放列表信息
+            entry (dict): 新列出的影片信息
+        """
+        entries = playlist_info['entries']
+        if not entries and self.callback:
+            # 第一個條目到達時播放列表的基本信息已就緒
+            self.callback({
+                'status': 'listing',
+                'playlist_info': {k: v for k, v in playlist_info.items() if k != 'entries'}
+            })
+        
+        entries.append(entry)
+        if self.callback:
+            self.callback({
+                'status': 'entry',
+                'index': len(entries) - 1,
+                'entry': entry
+            })
+    
+    def cancel_listing(self):
+        """放棄正在進行的異步列出操作"""
+        self._listing_generation += 1
+    
     def _extract_info(self, url):
         """
         提取播放列表信息的核心方法
@@ -130,57 +276,28 @@ class PlaylistProcessor:
                     'entries': []
                 }
                 
-                # 第二步：逐個提取視頻詳細信息以確保有URL
-                print(f"提取播放列表中的視頻詳細信息...")
                 entries = basic_info.get('entries', [])
-                total_entries = len(entries)
+                failed_entries = []
                 
-                # 設置用於提取視頻詳細信息的選項
-                detail_opts = {
-                    'skip_download': True,
-                    'quiet': True,
-                    'no_warnings': True,
-                }
-                
-                # 用於提取詳細信息的YoutubeDL實例
-                with yt_dlp.YoutubeDL(detail_opts) as detail_ydl:
-                    for i, entry in enumerate(entries):
-                        try:
-                            # 如果條目中已經有URL，則直接使用
-                            video_url = entry.get('url') or entry.get('webpage_url')
-                            if not video_url and 'id' in entry:
-                                # 如果沒有URL但有ID，則使用ID建構完整URL
-                                video_id = entry.get('id')
-                                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                            
-                            if video_url:
-                                print(f"[視頻 {i+1}/{total_entries}] 提取詳細信息: {video_url}")
-                                # 提取視頻詳細信息
-                                video_info = detail_ydl.extract_info(video_url, download=False, process=False)
-                                
-                                # 確保有必要的信息
-                                if video_info:
-                                    # 移除較大的欄位以節省內存
-                                    if 'formats' in video_info:
-                                        del video_info['formats']
-                                    
-                                    # 添加視頻信息到播放列表項目中
-                                    playlist_info['entries'].append({
-                                        'id': video_info.get('id', ''),
-                                        'title': video_info.get('title', f'未知標題 {i+1}'),
-                                        'webpage_url': video_info.get('webpage_url', video_url),
-                                        'url': video_info.get('url', video_url),
-                                        'duration': video_info.get('duration', 0),
-                                        'thumbnail': video_info.get('thumbnail', '')
-                                    })
-                                    print(f"[視頻 {i+1}/{total_entries}] 成功提取: {video_info.get('title', '')}")
-                        except Exception as video_e:
-                            print(f"[視頻 {i+1}/{total_entries}] 提取失敗: {str(video_e)}")
-                            # 繼續處理下一個視頻，而不是中斷整個播放列表的提取
+                if self.fast_listing:
+                    # 快速列表模式：平面提取已包含 ID、標題、時長及 URL，缺少的信息之後再按需獲取
+                    playlist_info['entries'] = [
+                        self._build_flat_entry(i, entry) for i, entry in enumerate(entries) if entry
+                    ]
+                else:
+                    # 第二步：提取視頻詳細信息以確保有URL
+                    print(f"提取播放列表中的視頻詳細信息...")
+                    
+                    # 以有界線程池並行提取，結果按原順序組裝，單個影片失敗不影響整個播放列表
+                    details, failed_entries = self._extract_entry_details(entries)
+                    playlist_info['entries'] = [detail for detail in details if detail]
+                playlist_info['failed_entries'] = failed_entries
                 
                 # 計算播放列表總數和總時長
                 playlist_info['video_count'] = len(playlist_info['entries'])
                 
+                if failed_entries:
+                    print(f"有 {len(failed_entries)} 個視頻提取失敗")
                 print(f"\033[1;36m成功提取播放列表中的 {playlist_info['video_count']} 個視頻，可以開始下載Youtube播放列表了音樂了~\033[0m")
                 return playlist_info
                 
@@ -195,6 +312,245 @@ class PlaylistProcessor:
                 })
             raise
     
+    def _extract_entry_details(self, entries):
+        """
+        並行提取播放列表中各影片的詳細信息
+        
+        Args:
+            entries (list): 平面提取得到的播放列表條目
+            
+        Returns:
+            tuple: (與 entries 順序一致的詳細信息列表，失敗的條目為 None, 失敗條目列表)
+        """
+        total_entries = len(entries)
+        results = [None] * total_entries
+        failed_entries = []
+        if not total_entries:
+            return results, failed_entries
+        
+        # 每個工作線程使用獨立的 YoutubeDL 實例，所有提取任務 (包括已放棄等待的超時任務) 結束後才關閉
+        thread_data = threading.local()
+        instances = []
+        instances_lock = threading.Lock()
+        running = 0
+        started_at = {}
+        
+        def get_ydl():
+            ydl = getattr(thread_data, 'ydl', None)
+            if ydl is None:
+                ydl = yt_dlp.YoutubeDL({
+                    'skip_download': True,
+                    'quiet': True,
+                    'no_warnings': True,
+                    'socket_timeout': self.detail_timeout,
+                })
+                thread_data.ydl = ydl
+                with instances_lock:
+                    instances.append(ydl)
+            return ydl
+        
+        def extract(index, entry):
+            started_at[index] = time.time()
+            return self._extract_entry_detail(get_ydl(), index, entry, total_entries)
+        
+        def on_extract_done(future):
+            nonlocal running
+            with instances_lock:
+                running -= 1
+                if running:
+                    return
+                closing = list(instances)
+                instances.clear()
+            for ydl in closing:
+                try:
+                    ydl.close()
+                except Exception:
+                    pass
+        
+        def record_failure(index, error):
+            entry = entries[index] or {}
+            print(f"[視頻 {index+1}/{total_entries}] 提取失敗: {error}")
+            failed_entries.append({
+                'index': index,
+                'id': entry.get('id', ''),
+                'title': entry.get('title', ''),
+                'url': entry.get('url') or entry.get('webpage_url', ''),
+                'error': error
+            })
+        
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.detail_workers, total_entries)),
+            thread_name_prefix="playlist-detail"
+        )
+        try:
+            futures = {
+                executor.submit(extract, index, entry): index
+                for index, entry in enumerate(entries) if entry
+            }
+            with instances_lock:
+                running = len(futures)
+            for future in futures:
+                future.add_done_callback(on_extract_done)
+            pending = set(futures)
+            completed = total_entries - len(futures)
+            
+            while pending:
+                done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                        if results[index] is None:
+                            record_failure(index, '無法獲取視頻信息')
+                    except Exception as e:
+                        record_failure(index, str(e))
+                
+                # 已運行超過超時時間的條目記為失敗，不再等待；
+                # 運行中的線程無法中止，由 socket_timeout 限制其網絡等待，結束後才關閉其 YoutubeDL 實例
+                now = time.time()
+                timed_out = {
+                    future for future in pending
+                    if futures[future] in started_at and now - started_at[futures[future]] > self.detail_timeout
+                }
+                for future in timed_out:
+                    record_failure(futures[future], '提取超時')
+                pending -= timed_out
+                
+                completed += len(done) + len(timed_out)
+                if (done or timed_out) and self.callback:
+                    self.callback({
+                        'status': 'extracting',
+                        'message': f'正在獲取影片信息 ({completed}/{total_entries})...',
+                        'completed': completed,
+                        'total': total_entries
+                    })
+        finally:
+            # 不等待超時的任務，尚未開始的任務直接取消
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        failed_entries.sort(key=lambda failed: failed['index'])
+        return results, failed_entries
+    
+    def _extract_entry_detail(self, ydl, index, entry, total_entries):
+        """
+        提取單個播放列表影片的詳細信息
+        
+        Args:
+            ydl (YoutubeDL): 當前線程的 YoutubeDL 實例
+            index (int): 條目在播放列表中的位置
+            entry (dict): 平面提取得到的條目
+            total_entries (int): 播放列表條目總數
+            
+        Returns:
+            dict: 影片信息字典，無法獲取時返回 None
+        """
+        # 如果條目中已經有URL，則直接使用
+        video_url = entry.get('url') or entry.get('webpage_url')
+        if not video_url and 'id' in entry:
+            # 如果沒有URL但有ID，則使用ID建構完整URL
+            video_url = f"https://www.youtube.com/watch?v={entry.get('id')}"
+        
+        if not video_url:
+            return None
+        
+        print(f"[視頻 {index+1}/{total_entries}] 提取詳細信息: {video_url}")
+        video_info = ydl.extract_info(video_url, download=False, process=False)
+        if not video_info:
+            return None
+        
+        print(f"[視頻 {index+1}/{total_entries}] 成功提取: {video_info.get('title', '')}")
+        return {
+            'id': video_info.get('id', ''),
+            'title': video_info.get('title', f'未知標題 {index+1}'),
+            'webpage_url': video_info.get('webpage_url', video_url),
+            'url': video_info.get('url', video_url),
+            'duration': video_info.get('duration', 0),
+            'thumbnail': video_info.get('thumbnail', '')
+        }
+    
+    def _build_flat_entry(self, index, entry):
+        """
+        將平面提取得到的條目轉換為播放列表影片信息
+        
+        Args:
+            index (int): 條目在播放列表中的位置
+            entry (dict): 平面提取得到的條目
+            
+        Returns:
+            dict: 影片信息字典，缺少標題、時長或縮圖時 needs_detail 為 True
+        """
+        video_id = entry.get('id', '')
+        video_url = entry.get('url') or entry.get('webpage_url') or ''
+        if video_id and not video_url.startswith('http'):
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
+        
+        thumbnail = entry.get('thumbnail', '')
+        if not thumbnail and entry.get('thumbnails'):
+            thumbnail = entry['thumbnails'][-1].get('url', '')
+        
+        return {
+            'id': video_id,
+            'title': entry.get('title') or f'未知標題 {index+1}',
+            'webpage_url': entry.get('webpage_url') or video_url,
+            'url': video_url,
+            'duration': entry.get('duration') or 0,
+            'thumbnail': thumbnail,
+            'needs_detail': not (entry.get('title') and entry.get('duration') and thumbnail)
+        }
+    
+    def fetch_entry_details_async(self, items):
+        """
+        在後台獲取指定條目的詳細信息，每完成一個發送 entry_detail 事件
+        
+        Args:
+            items (list): 需要獲取詳細信息的 (條目位置, 播放列表影片信息) 對
+        """
+        service = get_extraction_service()
+        for index, entry in items:
+            video_url = entry.get('webpage_url') or entry.get('url')
+            if not video_url:
+                continue
+            service.submit(video_url).add_done_callback(
+                lambda future, index=index, entry=entry: self._on_entry_detail(index, entry, future)
+            )
+    
+    def _on_entry_detail(self, index, entry, future):
+        """
+        後台詳細信息獲取完成的回調
+        
+        Args:
+            index (int): 條目位置
+            entry (dict): 播放列表影片信息
+            future (Future): 提取結果
+        """
+        try:
+            info = future.result()
+        except Exception as e:
+            print(f"[視頻 {index+1}] 獲取詳細信息失敗: {str(e)}")
+            return
+        
+        self._apply_entry_detail(entry, info)
+        if self.callback:
+            self.callback({
+                'status': 'entry_detail',
+                'index': index,
+                'entry': entry
+            })
+    
+    def _apply_entry_detail(self, entry, info):
+        """
+        以詳細信息補全播放列表影片信息
+        
+        Args:
+            entry (dict): 播放列表影片信息
+            info (dict): yt-dlp 影片信息字典
+        """
+        entry['title'] = info.get('title') or entry.get('title', '')
+        entry['duration'] = info.get('duration') or entry.get('duration', 0)
+        entry['thumbnail'] = info.get('thumbnail') or entry.get('thumbnail', '')
+        entry['needs_detail'] = False
+    
     def _process_playlist_info(self, info_dict):
         """
         處理播放列表信息字典
@@ -295,14 +651,9 @@ class PlaylistProcessor:
         Returns:
             bool: 是否是播放列表 URL
         """
-        # YouTube 播放列表 URL 通常包含 "list=" 參數
-        # 並且不是單個視頻 (不包含 "watch?v=" 或包含 "&index=")
-        if 'list=' not in url:
-            return False
-            
-        # 如果URL含有 "watch?v=" 且沒有 "&index="，可能是影片附帶的推薦播放列表而非完整播放列表
-        # 我們將其視為有效播放列表，讓 yt-dlp 進一步處理
-        return True
+        # 影片附帶的播放列表 (watch?v=...&list=...) 也視為有效播放列表，讓 yt-dlp 進一步處理
+        parsed = parse_youtube_url(url)
+        return parsed is not None and (parsed.playlist_id is not None or parsed.kind == KIND_CHANNEL)
         
     def _clean_playlist_url(self, url):
         """
@@ -314,26 +665,15 @@ class PlaylistProcessor:
         Returns:
             str: 清理後的 URL
         """
-        # 移除URL中的多餘參數，只保留必要的部分
-        if 'list=' in url:
-            # 提取播放列表ID
-            match = re.search(r'list=([^&]+)', url)
-            if match:
-                playlist_id = match.group(1)
-                # 構建乾淨的播放列表URL
-                if 'youtube.com/playlist' in url:
-                    return f'https://www.youtube.com/playlist?list={playlist_id}'
-                else:
-                    # 如果是視頻中的播放列表，保留視頻ID
-                    video_match = re.search(r'v=([^&]+)', url)
-                    if video_match:
-                        video_id = video_match.group(1)
-                        return f'https://www.youtube.com/watch?v={video_id}&list={playlist_id}'
-                    else:
-                        return f'https://www.youtube.com/playlist?list={playlist_id}'
-        return url
+        parsed = parse_youtube_url(url)
+        if parsed is None:
+            return url
+        if parsed.kind == KIND_CHANNEL:
+            # 頻道首頁列出的是各個分頁，改為獲取影片分頁
+            return parsed.canonical_url + '/videos'
+        return parsed.canonical_url
     
-    def batch_download(self, playlist_info, output_path, format_option, quality_option, embed_thumbnail=False, downloader=None):
+    def batch_download(self, playlist_info, output_path, format_option, quality_option, embed_thumbnail=False):
         """
         批量下載播放列表
         
@@ -343,7 +683,6 @@ class PlaylistProcessor:
             format_option (str): 格式選項 (mp4/mp3)
             quality_option (str): 品質選項
             embed_thumbnail (bool): 是否嵌入縮圖
-            downloader (YouTubeDownloader): 下載器實例
             
         Returns:
             threading.Thread: 下載線程
@@ -387,7 +726,7 @@ class PlaylistProcessor:
             print("創建下載線程")
             download_thread = threading.Thread(
                 target=self._batch_download_thread,
-                args=(playlist_info, output_path, format_option, quality_option, embed_thumbnail, downloader)
+                args=(playlist_info, output_path, format_option, quality_option, embed_thumbnail)
             )
             
             # 啟動線程
@@ -407,18 +746,142 @@ class PlaylistProcessor:
                 })
             return None
     
-    def _batch_download_thread(self, playlist_info, output_path, format_option, quality_option, embed_thumbnail, downloader):
+    def stream_download(self, url, output_path, format_option, quality_option, embed_thumbnail=False):
+        """
+        邊列出邊下載播放列表
+        
+        列出線程將條目放入有界隊列，下載線程從隊列取出條目下載；隊列已滿時列出線程會等待，
+        因此第一個影片在列出第一頁後即可開始下載，不必等待整個播放列表列出。
+        
+        Args:
+            url (str): YouTube 播放列表 URL
+            output_path (str): 輸出路徑
+            format_option (str): 格式選項 (mp4/mp3)
+            quality_option (str): 品質選項
+            embed_thumbnail (bool): 是否嵌入縮圖
+            
+        Returns:
+            threading.Thread: 下載線程
+        """
+        if self.is_processing:
+            if self.callback:
+                self.callback({
+                    'status': 'error',
+                    'error': '已有批量下載任務正在進行'
+                })
+            return None
+        
+        self.is_processing = True
+        self.cancel_listing()
+        
+        if self.callback:
+            self.callback({
+                'status': 'starting',
+                'message': '正在列出播放列表並開始下載...'
+            })
+        
+        playlist_info = {'entries': [], 'failed_entries': []}
+        entry_queue = queue.Queue(maxsize=PLAYLIST_STREAM_QUEUE_SIZE)
+        
+        producer = threading.Thread(
+            target=self._stream_producer,
+            args=(url, playlist_info, entry_queue)
+        )
+        producer.daemon = True
+        producer.start()
+        
+        download_thread = threading.Thread(
+            target=self._batch_download_thread,
+            args=(playlist_info, output_path, format_option, quality_option, embed_thumbnail),
+            kwargs={'entry_source': self._iter_entry_queue(entry_queue)}
+        )
+        download_thread.daemon = True
+        download_thread.start()
+        self.current_task = download_thread
+        return download_thread
+    
+    def _stream_producer(self, url, playlist_info, entry_queue):
+        """
+        列出線程執行函數，將條目放入隊列供下載線程消費
+        
+        Args:
+            url (str): YouTube 播放列表 URL
+            playlist_info (dict): 正在構建的播放列表信息
+            entry_queue (queue.Queue): 有界條目隊列
+        """
+        try:
+            for entry in self.iter_playlist_entries(url, playlist_info):
+                if not self.is_processing:
+                    return
+                self._add_streamed_entry(playlist_info, entry)
+                
+                # 隊列已滿時等待下載線程消費 (背壓)，期間仍響應取消
+                while self.is_processing:
+                    try:
+                        entry_queue.put(entry, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+            
+            playlist_info['video_count'] = len(playlist_info['entries'])
+            if self.callback:
+                self.callback({
+                    'status': 'listed',
+                    'playlist_info': playlist_info
+                })
+        except Exception as e:
+            print(f"列出播放列表失敗：{str(e)}")
+            if self.callback:
+                self.callback({
+                    'status': 'error',
+                    'error': f'無法獲取播放列表信息: {str(e)}'
+                })
+        finally:
+            # 結束標記
+            while True:
+                try:
+                    entry_queue.put(None, timeout=0.5)
+                    break
+                except queue.Full:
+                    if not self.is_processing:
+                        break
+    
+    def _iter_entry_queue(self, entry_queue):
+        """
+        從條目隊列中依次取出條目 (生成器)，收到結束標記或任務被取消時結束
+        
+        Args:
+            entry_queue (queue.Queue): 有界條目隊列
+            
+        Yields:
+            dict: 播放列表影片信息
+        """
+        while self.is_processing:
+            try:
+                entry = entry_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if entry is None:
+                return
+            yield entry
+    
+    def _batch_download_thread(self, playlist_info, output_path, format_option, quality_option, embed_thumbnail,
+                               entry_source=None):
         """
         批量下載線程執行函數
         
+        每個影片作為一個任務提交給 DownloadManager，由多個工作線程並行下載，
+        每個任務擁有獨立的下載器，進度經由帶 job_id 的任務事件匯總。
+        
         Args:
             playlist_info (dict): 播放列表信息字典
             output_path (str): 輸出路徑
             format_option (str): 格式選項 (mp4/mp3)
             quality_option (str): 品質選項
             embed_thumbnail (bool): 是否嵌入縮圖
-            downloader (YouTubeDownloader): 下載器實例
+            entry_source (iterable): 邊列出邊下載時的條目來源，為 None 時下載 playlist_info 中的條目
         """
+        manager = None
         try:
             print(f"批量下載線程開始: 格式={format_option}, 品質={quality_option}, 輸出路徑={output_path}")
             print(f"播放列表信息: 標題={playlist_info.get('title', '')}, ID={playlist_info.get('id', '')}")
@@ -437,8 +900,8 @@ class PlaylistProcessor:
                 return
             
             # 確保有視頻條目
-            entries = playlist_info.get('entries', [])
-            if not entries:
+            entries = playlist_info.get('entries', []) if entry_source is None else entry_source
+            if entry_source is None and not entries:
                 print("沒有視頻條目可下載")
                 if self.callback:
                     self.callback({
@@ -446,125 +909,198 @@ class PlaylistProcessor:
                         'error': '沒有視頻條目可下載'
                     })
                 return
-                
-            total_videos = len(entries)
+            
+            # 以下狀態會被多個工作線程的回調同時訪問，均在 state_lock 內讀寫
+            state_lock = threading.Lock()
+            # 邊列出邊下載時總數隨列出進度增長
+            total_videos = len(entries) if entry_source is None else 0
             completed_videos = 0
-            print(f"播放列表共有 {total_videos} 個視頻待下載")
+            job_entries = {}
+            job_progress = {}
+            finished_jobs = set()
+            transferred_jobs = set()
+            jobs_finished = threading.Condition(state_lock)
+            print(f"播放列表共有 {total_videos or '未知數量'} 個視頻待下載")
             
-            # 檢查下載器
-            if not downloader:
-                print("下載器實例為空")
-                if self.callback:
-                    self.callback({
-                        'status': 'error',
-                        'error': '下載器初始化失敗'
-                    })
-                return
-                
-            # 創建下載完成的回調函數
-            def download_callback(info):
+            # 提交中及傳輸中的任務數不超過並行數上限，邊列出邊下載時可對列出隊列形成背壓；
+            # 任務進入後處理 (合併、轉碼) 後即歸還名額，後處理在後處理線程池中進行
+            slots = threading.Semaphore(self.max_concurrent)
+            
+            def release_slot(job_id):
+                with state_lock:
+                    if job_id in transferred_jobs:
+                        return
+                    transferred_jobs.add(job_id)
+                    job_progress.pop(job_id, None)
+                slots.release()
+            
+            def release(job_id):
+                release_slot(job_id)
+                with state_lock:
+                    finished_jobs.add(job_id)
+                    jobs_finished.notify_all()
+            
+            # 任務事件回調 (在各工作線程中調用)
+            def on_job_update(info):
                 nonlocal completed_videos
+                job_id = info.get('job_id')
                 status = info.get('status', '')
-                print(f"接收到下載回調: {status}")
+                with state_lock:
+                    index, video = job_entries.get(job_id, (None, {}))
                 
-                if status == 'complete':
-                    completed_videos += 1
-                    print(f"完成一個視頻下載: {completed_videos}/{total_videos}")
+                if status == 'downloading':
+                    with state_lock:
+                        job_progress[job_id] = (info.get('percent') or 0, info.get('speed') or 0)
+                        active_progress = sum(percent for percent, _ in job_progress.values())
+                        speed = sum(job_speed for _, job_speed in job_progress.values())
+                        done, total = completed_videos, total_videos
                     
-                    # 添加到歷史記錄的信息
-                    filename = info.get('filename', '')
-                    video_info = info.get('info', {})
+                    if self.callback:
+                        self.callback({
+                            'status': 'downloading',
+                            'message': f'正在下載播放列表... ({done}/{total})',
+                            'progress': min(1.0, (done + active_progress) / total) if total else 0,
+                            'speed': speed or None,
+                            'completed_videos': done,
+                            'total_videos': total,
+                            'job_id': job_id,
+                            'index': index
+                        })
+                
+                elif status == 'complete':
+                    with state_lock:
+                        completed_videos += 1
+                        done, total = completed_videos, total_videos
+                    print(f"完成一個視頻下載: {done}/{total}")
                     
-                    # 更新進度
                     if self.callback:
                         self.callback({
                             'status': 'downloading',
-                            'message': f'正在下載播放列表... ({completed_videos}/{total_videos})',
-                            'progress': completed_videos / total_videos,
-                            'completed_videos': completed_videos,
-                            'total_videos': total_videos,
-                            'filename': filename,  # 文件名
-                            'video_info': video_info,  # 視頻信息
+                            'message': f'正在下載播放列表... ({done}/{total})',
+                            'progress': done / total if total else 0,
+                            'completed_videos': done,
+                            'total_videos': total,
+                            'filename': info.get('filename', ''),  # 文件名
+                            'video_info': info.get('info', {}),  # 視頻信息
                             'format': format_option,  # 格式
                             'quality': quality_option,  # 品質
-                            'add_to_history': True  # 標記為需要添加到歷史記錄
+                            'add_to_history': True,  # 標記為需要添加到歷史記錄
+                            'job_id': job_id,
+                            'index': index
                         })
+                    release(job_id)
+                
+                elif status == 'processing':
+                    if info.get('postprocessing'):
+                        release_slot(job_id)
+                
                 elif status == 'error':
                     error_msg = info.get('error', '未知錯誤')
-                    print(f"視頻下載錯誤: {error_msg}")
+                    print(f"視頻下載錯誤: {video.get('title', '')} {error_msg}")
+                    if self.callback:
+                        self.callback(dict(info, index=index))
+                    release(job_id)
                 
-                # 將下載器的回調信息傳遞給我們的回調
-                if self.callback:
-                    self.callback(info)
+                elif status == 'cancelled':
+                    release(job_id)
+            
+            # 實際並行數由並發控制器決定，這裡只給出上限
+            manager = DownloadManager(callback=on_job_update, max_workers=self.max_concurrent)
+            self._batch_manager = manager
+            service = get_extraction_service()
+            archive = get_download_archive()
+            
+            def submit_job(job_id, video_url, options, detail_future=None):
+                if not self.is_processing:
+                    release(job_id)
+                    return
+                if detail_future is not None:
+                    try:
+                        info_dict = detail_future.result()
+                        self._apply_entry_detail(job_entries[job_id][1], info_dict)
+                        options['info_dict'] = info_dict
+                    except Exception as e:
+                        # 詳細信息獲取失敗時由下載器自行提取
+                        print(f"獲取影片詳細信息失敗: {video_url}, {str(e)}")
+                manager.submit(video_url, options, job_id=job_id)
             
-            # 依次下載每個視頻
             for i, video in enumerate(entries):
                 if not self.is_processing:
                     # 如果任務被取消，則退出
                     print("批量下載任務被取消")
                     break
                 
+                if entry_source is not None:
+                    with state_lock:
+                        total_videos = max(i + 1, len(playlist_info['entries']), playlist_info.get('video_count') or 0)
+                
                 # 獲取視頻 URL
                 video_url = video.get('webpage_url', '')
-                video_title = video.get('title', f'未知標題 {i+1}')
-                
                 if not video_url:
                     print(f"視頻 {i+1} 沒有可用的URL，跳過")
                     continue
                 
-                print(f"開始下載視頻 {i+1}/{total_videos}: {video_title}")
-                print(f"視頻URL: {video_url}")
-                
-                # 更新狀態
-                if self.callback:
-                    self.callback({
-                        'status': 'downloading',
-                        'message': f'正在下載: {video_title} ({i+1}/{total_videos})',
-                        'progress': i / total_videos if total_videos > 0 else 0,
-                        'current_video': i+1,
-                        'total_videos': total_videos
-                    })
-                
-                # 確保下載器就緒
-                if downloader.is_downloading:
-                    print("下載器已經在下載中，重置它")
-                    downloader.is_downloading = False
-                    if downloader.current_task and downloader.current_task.is_alive():
-                        print("嘗試等待上一個下載任務結束")
-                        try:
-                            downloader.current_task.join(timeout=1.0)
-                        except:
-                            print("等待上一個下載任務失敗，繼續")
-                
-                # 設置臨時回調
-                original_callback = downloader.callback
-                downloader.callback = download_callback
+                # 已以相同格式下載過的影片在提交任務前即跳過 (不需要網絡請求)
+                record = archive.link_existing(video.get('id'), format_option, quality_option, output_path)
+                if record:
+                    with state_lock:
+                        completed_videos += 1
+                        done, total = completed_videos, total_videos
+                    print(f"視頻 {i+1} 已下載過，使用現有文件: {record['file_path']}")
+                    if self.callback:
+                        self.callback({
+                            'status': 'downloading',
+                            'message': f'正在下載播放列表... ({done}/{total})',
+                            'progress': done / total if total else 0,
+                            'completed_videos': done,
+                            'total_videos': total,
+                            'index': i
+                        })
+                    continue
                 
-                try:
-                    # 下載視頻
-                    print(f"調用下載器下載視頻: {video_url}")
-                    downloader.download(
-                        url=video_url,
-                        output_path=output_path,
-                        format_option=format_option,
-                        quality_option=quality_option,
-                        embed_thumbnail=embed_thumbnail
-                    )
+                # 等待空閒的下載名額
+                while not slots.acquire(timeout=0.5):
+                    if not self.is_processing:
+                        break
+                else:
+                    job_id = str(i)
+                    with state_lock:
+                        job_entries[job_id] = (i, video)
+                    print(f"提交視頻 {i+1}/{total_videos or '?'}: {video.get('title', '')}")
                     
-                    # 等待下載完成
-                    if downloader.current_task:
-                        print("等待下載完成...")
-                        downloader.current_task.join()
-                        print("視頻下載結束")
-                except Exception as e:
-                    print(f"視頻下載過程中發生錯誤: {str(e)}")
-                    # 如果是單個視頻下載失敗，我們可以繼續其他視頻
-                    pass
-                finally:
-                    # 恢復原始回調
-                    downloader.callback = original_callback
-                    # 重置下載器狀態以確保下一個視頻可以下載
-                    downloader.is_downloading = False
+                    options = {
+                        'output_path': output_path,
+                        'format': format_option,
+                        'quality': quality_option,
+                        'embed_thumbnail': embed_thumbnail,
+                        'rate_group': self.rate_group
+                    }
+                    
+                    if 'needs_detail' in video:
+                        # 快速列表模式的條目先經共享提取服務獲取詳細信息 (與其他任務並行)，
+                        # 完成後直接用於下載，避免重複提取
+                        service.submit(video_url).add_done_callback(
+                            lambda future, job_id=job_id, video_url=video_url, options=options:
+                                submit_job(job_id, video_url, options, future)
+                        )
+                    else:
+                        submit_job(job_id, video_url, options)
+                    continue
+                break
+            
+            # 等待所有任務 (包括後處理) 結束
+            with jobs_finished:
+                while len(finished_jobs) < len(job_entries) and self.is_processing:
+                    jobs_finished.wait(0.5)
+            
+            if entry_source is not None:
+                total_videos = len(playlist_info['entries'])
+                if not total_videos:
+                    # 列出失敗時錯誤已由列出線程通知
+                    return
+            
+            if not self.is_processing:
+                return
             
             # 通知完成
             print(f"批量下載完成，共 {completed_videos}/{total_videos} 個視頻")
@@ -589,11 +1125,23 @@ class PlaylistProcessor:
                 })
         finally:
             print("重置批量下載狀態: is_processing = False")
+            if manager:
+                manager.shutdown()
+            self._batch_manager = None
             self.is_processing = False
     
+    def shutdown(self):
+        """移除本處理器的帶寬分組 (不再使用處理器時調用，如關閉窗口)"""
+        get_bandwidth_governor().set_group_limit(self.rate_group, None)
+    
     def cancel(self):
-        """取消當前批量下載任務"""
+        """取消當前批量下載任務，並中止正在進行的影片下載"""
         self.is_processing = False
+        
+        manager = self._batch_manager
+        if manager:
+            manager.cancel_all()
+        
         if self.callback:
             self.callback({
                 'status': 'cancelled',
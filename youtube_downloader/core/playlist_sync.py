@@ -0,0 +1,347 @@
+"""
+播放列表同步模塊 - 只下載播放列表或頻道中尚未下載過的影片
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from youtube_downloader.config import (
+    CONCURRENCY_MAX_JOBS, PLAYLIST_RATE_LIMIT, SYNC_MAX_CONCURRENT_PLAYLISTS
+)
+from .bandwidth import get_bandwidth_governor, new_group_name
+from .download_manager import DownloadManager
+from .persistence import get_persistence_writer
+from .playlist import PlaylistProcessor
+from .url_parser import get_cache_key
+from .utils import sanitize_filename
+
+
+class SyncManifest:
+    """同步清單類 - 記錄某個播放列表已下載的影片 ID、格式及輸出文件"""
+    
+    def __init__(self, manifest_file):
+        """
+        初始化同步清單
+        
+        Args:
+            manifest_file (str): 清單文件路徑
+        """
+        self.manifest_file = manifest_file
+        self._lock = threading.Lock()
+        self._writer = get_persistence_writer()
+        self.data = self._load_manifest()
+        self.data.setdefault('entries', {})
+    
+    def _load_manifest(self):
+        """
+        加載清單
+        
+        Returns:
+            dict: 清單內容
+        """
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+        return {}
+    
+    def save(self):
+        """保存清單 (交給後台持久化寫入線程盡快寫入)"""
+        self._writer.submit(self, urgent=True)
+    
+    def write_batch(self, items):
+        """
+        寫入清單快照 (由持久化寫入線程調用，同一批的多次記錄只寫一次)
+        
+        Args:
+            items (list): 寫入請求 (不使用，總是寫入當前快照)
+        """
+        self._write_manifest()
+    
+    def sync(self):
+        """將清單寫入並落盤 (關閉應用程序時調用)"""
+        self._write_manifest(durable=True)
+    
+    def _write_manifest(self, durable=False):
+        """
+        寫入清單文件 (先寫入臨時文件再替換，避免崩潰時損壞)
+        
+        Args:
+            durable (bool): 是否在替換前將臨時文件落盤
+        """
+        with self._lock:
+            data = json.dumps(self.data, ensure_ascii=False)
+        try:
+            temp_file = self.manifest_file + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_file, self.manifest_file)
+        except Exception as e:
+            print(f"無法保存同步清單: {e}")
+    
+    def has(self, video_id, variant):
+        """
+        檢查影片是否已以指定格式下載
+        
+        Args:
+            video_id (str): 影片 ID
+            variant (str): 格式與品質 (如 "mp3:320kbps")
+        
+        Returns:
+            bool: 是否已下載
+        """
+        with self._lock:
+            return variant in self.data['entries'].get(video_id, {})
+    
+    def record(self, video_id, variant, filename, title=''):
+        """
+        記錄已下載的影片 (清單由後台寫入線程定時保存)
+        
+        Args:
+            video_id (str): 影片 ID
+            variant (str): 格式與品質
+            filename (str): 輸出文件路徑
+            title (str): 影片標題
+        """
+        with self._lock:
+            self.data['entries'].setdefault(video_id, {})[variant] = {
+                'filename': filename,
+                'title': title,
+                'synced_at': int(time.time())
+            }
+        self._writer.submit(self)
+    
+    def update_info(self, **fields):
+        """
+        更新清單的播放列表信息
+        
+        Args:
+            **fields: 要更新的欄位
+        """
+        with self._lock:
+            self.data.update(fields)
+
+
+class PlaylistSync:
+    """播放列表同步器 - 每次只做一次平面列出，與清單比對後僅下載新增的影片"""
+    
+    def __init__(self, callback=None, sync_dir=None, max_workers=CONCURRENCY_MAX_JOBS,
+                 rate_limit=PLAYLIST_RATE_LIMIT):
+        """
+        初始化播放列表同步器
+        
+        Args:
+            callback (function): 回調函數，用於更新 UI
+            sync_dir (str): 同步清單目錄
+            max_workers (int): 同時下載的影片數上限 (所有播放列表共用，實際數量由並發控制器調整)
+            rate_limit (int): 總帶寬上限 (字節/秒)，由進行中的任務共用，None 表示不限速
+        """
+        if not sync_dir:
+            # 默認清單目錄位於用戶主目錄下
+            sync_dir = os.path.join(os.path.expanduser("~"), ".youtube_downloader", "sync")
+        os.makedirs(sync_dir, exist_ok=True)
+        
+        self.callback = callback
+        self.sync_dir = sync_dir
+        self.rate_group = new_group_name("playlist_sync")
+        get_bandwidth_governor().set_group_limit(self.rate_group, rate_limit)
+        # 只用於列出播放列表，不需要帶寬分組
+        self.processor = PlaylistProcessor(rate_limit=None)
+        self.manager = DownloadManager(callback=self._on_job_update, max_workers=max_workers)
+        self.is_cancelled = False
+        self._runs = {}
+        self._lock = threading.Lock()
+    
+    def _get_manifest(self, url, playlist_meta):
+        """
+        獲取播放列表對應的同步清單
+        
+        Args:
+            url (str): 播放列表或頻道 URL
+            playlist_meta (dict): 列出時得到的播放列表基本信息
+        
+        Returns:
+            SyncManifest: 同步清單
+        """
+        key = playlist_meta.get('id') or get_cache_key(url)
+        manifest_file = os.path.join(self.sync_dir, f"{sanitize_filename(key)}.json")
+        return SyncManifest(manifest_file)
+    
+    def sync(self, url, output_path, format_option, quality_option, embed_thumbnail=False):
+        """
+        同步單個播放列表或頻道 (阻塞直到新影片全部下載完成)
+        
+        Args:
+            url (str): 播放列表或頻道 URL
+            output_path (str): 輸出路徑
+            format_option (str): 格式選項 (mp4/mp3)
+            quality_option (str): 品質選項
+            embed_thumbnail (bool): 是否嵌入縮圖
+        
+        Returns:
+            dict: 同步結果 (title, total, new, downloaded, failed)
+        """
+        playlist_meta = {}
+        try:
+            # 只需要一次平面列出即可得到全部影片 ID
+            entries = list(self.processor.iter_playlist_entries(url, playlist_meta))
+        except Exception as e:
+            print(f"列出播放列表失敗: {url}, {str(e)}")
+            self._notify({
+                'status': 'error',
+                'error': f'無法獲取播放列表信息: {str(e)}',
+                'sync_url': url
+            })
+            return {'url': url, 'title': '', 'total': 0, 'new': 0, 'downloaded': 0, 'failed': [], 'error': str(e)}
+        
+        manifest = self._get_manifest(url, playlist_meta)
+        variant = f"{format_option}:{quality_option}"
+        new_entries = [entry for entry in entries if entry['id'] and not manifest.has(entry['id'], variant)]
+        title = playlist_meta.get('title', '')
+        print(f"同步播放列表 {title}: 共 {len(entries)} 個影片，{len(new_entries)} 個新影片")
+        
+        self._notify({
+            'status': 'sync_listed',
+            'message': f'{title}: 發現 {len(new_entries)} 個新影片 (共 {len(entries)} 個)',
+            'sync_url': url,
+            'title': title,
+            'total': len(entries),
+            'new': len(new_entries)
+        })
+        
+        run = {
+            'url': url,
+            'manifest': manifest,
+            'variant': variant,
+            'pending': len(new_entries),
+            'downloaded': 0,
+            'failed': [],
+            'done': threading.Event()
+        }
+        if not new_entries:
+            run['done'].set()
+        
+        options = {
+            'output_path': output_path,
+            'format': format_option,
+            'quality': quality_option,
+            'embed_thumbnail': embed_thumbnail,
+            'rate_group': self.rate_group
+        }
+        for entry in new_entries:
+            job_id = f"{entry['id']}-{variant}-{id(run)}"
+            with self._lock:
+                self._runs[job_id] = (run, entry)
+            self.manager.submit(entry['webpage_url'], options, job_id=job_id)
+        
+        # 等待本播放列表的任務全部結束，期間響應取消
+        while not run['done'].wait(0.5):
+            if self.is_cancelled:
+                break
+        
+        manifest.update_info(url=url, title=title, last_synced=int(time.time()))
+        manifest.save()
+        
+        result = {
+            'url': url,
+            'title': title,
+            'total': len(entries),
+            'new': len(new_entries),
+            'downloaded': run['downloaded'],
+            'failed': run['failed']
+        }
+        self._notify(dict(result, status='sync_complete', sync_url=url,
+                          message=f"{title}: 同步完成，下載了 {run['downloaded']}/{len(new_entries)} 個新影片"))
+        return result
+    
+    def sync_many(self, urls, output_path, format_option, quality_option, embed_thumbnail=False,
+                  max_playlists=SYNC_MAX_CONCURRENT_PLAYLISTS):
+        """
+        同步多個播放列表或頻道
+        
+        最多同時列出並同步 max_playlists 個播放列表，影片下載共用同一個有界下載隊列。
+        
+        Args:
+            urls (list): 播放列表或頻道 URL 列表
+            output_path (str): 輸出路徑
+            format_option (str): 格式選項 (mp4/mp3)
+            quality_option (str): 品質選項
+            embed_thumbnail (bool): 是否嵌入縮圖
+            max_playlists (int): 同時同步的播放列表數
+        
+        Returns:
+            list: 各播放列表的同步結果，順序與 urls 一致
+        """
+        with ThreadPoolExecutor(max_workers=max(1, max_playlists), thread_name_prefix="playlist-sync") as executor:
+            futures = [
+                executor.submit(self.sync, url, output_path, format_option, quality_option, embed_thumbnail)
+                for url in urls
+            ]
+            return [future.result() for future in futures]
+    
+    def _on_job_update(self, info):
+        """
+        處理下載任務事件，記錄到對應的同步清單
+        
+        Args:
+            info (dict): 帶 job_id 的任務事件
+        """
+        with self._lock:
+            run, entry = self._runs.get(info.get('job_id'), (None, None))
+        if not run:
+            return
+        
+        status = info.get('status', '')
+        if status == 'complete':
+            run['manifest'].record(entry['id'], run['variant'], info.get('filename', ''), entry.get('title', ''))
+        
+        if status in ('complete', 'error', 'cancelled'):
+            with self._lock:
+                self._runs.pop(info['job_id'], None)
+                if status == 'complete':
+                    run['downloaded'] += 1
+                elif status == 'error':
+                    run['failed'].append({
+                        'id': entry['id'],
+                        'title': entry.get('title', ''),
+                        'error': info.get('error', '')
+                    })
+                run['pending'] -= 1
+                if run['pending'] <= 0:
+                    run['done'].set()
+        
+        event = dict(info, sync_url=run['url'], video_id=entry['id'])
+        if status == 'complete':
+            # 附帶任務實際使用的下載選項，供歷史記錄使用 (界面上的選項可能已被修改)
+            job = self.manager.get_job(info['job_id'])
+            event['options'] = job['options'] if job else {}
+        self._notify(event)
+    
+    def _notify(self, info):
+        """
+        將事件轉發給回調函數
+        
+        Args:
+            info (dict): 事件信息
+        """
+        if self.callback:
+            self.callback(info)
+    
+    def cancel(self):
+        """取消同步，中止所有下載任務"""
+        self.is_cancelled = True
+        self.manager.cancel_all()
+    
+    def shutdown(self):
+        """取消未完成的任務，關閉下載線程池並移除帶寬分組"""
+        self.is_cancelled = True
+        self.manager.shutdown()
+        self.processor.shutdown()
+        get_bandwidth_governor().set_group_limit(self.rate_group, None)
@@ -0,0 +1,157 @@
+"""
+後處理模塊 - 在獨立的線程池中執行合併、音頻轉碼及嵌入縮圖，下載線程不必等待 ffmpeg
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import yt_dlp
+from yt_dlp.utils import DownloadCancelled
+
+from youtube_downloader.config import POSTPROCESS_WORKERS
+
+
+class DeferredPostProcessYoutubeDL(yt_dlp.YoutubeDL):
+    """
+    延遲後處理的 YoutubeDL
+    
+    下載完成後不立即執行後處理 (合併音視頻、FFmpegExtractAudio、EmbedThumbnail 等)，
+    而是記錄下來，由 run_deferred_postprocessing() 在後處理線程池中執行。
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deferred = []
+    
+    def post_process(self, filename, info, files_to_move=None):
+        """記錄後處理參數，返回的信息字典在真正執行後處理後才會更新"""
+        self.deferred.append((filename, info, files_to_move))
+        info['filepath'] = filename
+        return info
+    
+    def run_deferred_postprocessing(self):
+        """執行所有延遲的後處理，並就地更新對應的影片信息 (如輸出文件路徑)"""
+        deferred, self.deferred = self.deferred, []
+        for filename, info, files_to_move in deferred:
+            result = yt_dlp.YoutubeDL.post_process(self, filename, info, files_to_move)
+            if result is not info:
+                info.clear()
+                info.update(result)
+
+
+class PostProcessPool:
+    """
+    後處理線程池
+    
+    ffmpeg 在子進程中執行，線程只負責等待，因此線程數按 CPU 核心數設置即可避免 CPU 過載；
+    排隊中的任務在開始前檢查取消令牌，已取消的任務不再執行。
+    """
+    
+    def __init__(self, max_workers=POSTPROCESS_WORKERS):
+        """
+        初始化後處理線程池
+        
+        Args:
+            max_workers (int): 同時執行的後處理任務數
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="postprocess"
+        )
+        self._lock = threading.Lock()
+        self._metrics = {
+            'queued': 0,
+            'running': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'wait_seconds': 0.0,
+            'busy_seconds': 0.0,
+        }
+    
+    def submit(self, func, *args, cancel_event=None):
+        """
+        提交後處理任務
+        
+        Args:
+            func (function): 後處理函數
+            *args: 函數參數
+            cancel_event (threading.Event): 取消令牌，任務開始前已設置時拋出 DownloadCancelled
+        
+        Returns:
+            Future: 任務結果
+        """
+        with self._lock:
+            self._metrics['queued'] += 1
+        return self._executor.submit(self._run, func, args, cancel_event, time.monotonic())
+    
+    def _run(self, func, args, cancel_event, submitted_at):
+        """
+        後處理線程執行函數，記錄等待及執行時間
+        
+        Args:
+            func (function): 後處理函數
+            args (tuple): 函數參數
+            cancel_event (threading.Event): 取消令牌
+            submitted_at (float): 提交時間
+        """
+        started_at = time.monotonic()
+        with self._lock:
+            self._metrics['queued'] -= 1
+            self._metrics['running'] += 1
+            self._metrics['wait_seconds'] += started_at - submitted_at
+        
+        outcome = 'failed'
+        try:
+            if cancel_event is not None and cancel_event.is_set():
+                raise DownloadCancelled()
+            result = func(*args)
+            outcome = 'completed'
+            return result
+        except DownloadCancelled:
+            outcome = 'cancelled'
+            raise
+        finally:
+            with self._lock:
+                self._metrics['running'] -= 1
+                self._metrics[outcome] += 1
+                self._metrics['busy_seconds'] += time.monotonic() - started_at
+    
+    def get_metrics(self):
+        """
+        獲取後處理統計
+        
+        Returns:
+            dict: queued、running、completed、failed、cancelled 任務數，
+                以及累計排隊時間 wait_seconds 與執行時間 busy_seconds (秒)
+        """
+        with self._lock:
+            return dict(self._metrics, workers=self.max_workers)
+    
+    def shutdown(self, wait=False):
+        """
+        關閉後處理線程池
+        
+        Args:
+            wait (bool): 是否等待執行中的任務結束
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_postprocess_pool = None
+_postprocess_pool_lock = threading.Lock()
+
+
+def get_postprocess_pool():
+    """
+    獲取進程內共享的後處理線程池
+    
+    Returns:
+        PostProcessPool: 後處理線程池
+    """
+    global _postprocess_pool
+    with _postprocess_pool_lock:
+        if _postprocess_pool is None:
+            _postprocess_pool = PostProcessPool()
+        return _postprocess_pool
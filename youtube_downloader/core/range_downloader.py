@@ -0,0 +1,488 @@
+"""
+分段下載模塊 - 以多個連接並行下載大文件的不同字節範圍，寫入預先分配大小的輸出文件
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+
+import yt_dlp
+from yt_dlp.downloader.common import FileDownloader
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, TransportError
+from yt_dlp.utils import ContentTooShortError, parse_http_range
+from yt_dlp.utils.networking import HTTPHeaderDict
+
+from youtube_downloader.config import (
+    RANGE_MIN_SIZE, RANGE_CHUNK_SIZE, RANGE_INITIAL_CONNECTIONS, RANGE_TUNE_INTERVAL, RANGE_GAIN_THRESHOLD
+)
+from .concurrency import get_concurrency_controller
+
+# 表示服務器按連接限流或拒絕的 HTTP 狀態碼，遇到時減少連接數
+THROTTLE_STATUSES = (403, 429)
+
+# 每次從響應讀取並寫入文件的數據塊大小 (字節)
+BLOCK_SIZE = 256 * 1024
+
+
+class _RangeContext:
+    """單個文件的分段下載狀態，由各連接線程共享 (除特別說明外均在 lock 內讀寫)"""
+    
+    def __init__(self, filename, tmpfilename, url, headers, total, chunk_size, done):
+        self.filename = filename
+        self.tmpfilename = tmpfilename
+        self.url = url
+        self.headers = headers
+        self.total = total
+        self.chunk_size = chunk_size
+        self.chunk_count = (total + chunk_size - 1) // chunk_size
+        self.done = set(done)
+        self.pending = deque(i for i in range(self.chunk_count) if i not in self.done)
+        self.downloaded = sum(self.chunk_length(i) for i in self.done)
+        self.resumed = self.downloaded
+        self.lock = threading.Lock()
+        # 寫文件的鎖 (各連接共用同一文件對象，seek 與 write 需成對執行)
+        self.write_lock = threading.Lock()
+        self.finished = threading.Event()
+        self.stream = None
+        self.error = None
+        self.active = 0
+        self.target = 1
+        self.throttled = 0
+        self.started_at = time.time()
+    
+    def chunk_range(self, index):
+        """
+        獲取分段的字節範圍
+        
+        Args:
+            index (int): 分段序號
+        
+        Returns:
+            tuple: (起始位置, 結束位置)，包含結束位置
+        """
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.total) - 1
+    
+    def chunk_length(self, index):
+        """
+        獲取分段的長度
+        
+        Args:
+            index (int): 分段序號
+        
+        Returns:
+            int: 字節數
+        """
+        start, end = self.chunk_range(index)
+        return end - start + 1
+
+
+class RangeFD(FileDownloader):
+    """
+    多連接分段下載器 (yt-dlp 文件下載器)
+    
+    先以 Range: bytes=0-0 探測文件大小及服務器是否支持 Range 請求，
+    再把文件切分為固定大小的分段，由多個連接線程領取並寫入預先分配大小的 .part 文件。
+    連接數從 RANGE_INITIAL_CONNECTIONS 開始，吞吐量隨連接數增加而上升時逐個增加，
+    吞吐量不再上升時停止增加，遇到 403/429 時減少，且不超過並發控制器的每任務連接數上限。
+    已完成的分段記錄在 .ytdl 文件中，暫停或中斷後可以續傳。
+    連接通過 YoutubeDL 的請求處理器發出，沿用其連接池、代理及 Cookie 設置。
+    """
+    
+    def real_download(self, filename, info_dict):
+        """
+        下載文件
+        
+        Args:
+            filename (str): 輸出文件路徑
+            info_dict (dict): 格式信息
+        
+        Returns:
+            bool: 是否成功
+        """
+        url = info_dict['url']
+        headers = HTTPHeaderDict({'Accept-Encoding': 'identity'}, info_dict.get('http_headers'))
+        tmpfilename = self.temp_name(filename)
+        
+        total = self._probe_size(url, headers)
+        if not total or total < RANGE_MIN_SIZE:
+            return self._fallback_download(filename, info_dict)
+        
+        state = self._load_state(tmpfilename, total)
+        if state is None:
+            return self._fallback_download(filename, info_dict)
+        
+        done, reuse = state
+        ctx = _RangeContext(filename, tmpfilename, url, headers, total, RANGE_CHUNK_SIZE, done)
+        # 先寫入分段記錄再擴展 .part 文件，避免中斷後把擴展出的空白部分當作已下載的數據
+        with ctx.lock:
+            self._save_state(ctx)
+        self._open_output(ctx, reuse)
+        self.report_destination(filename)
+        try:
+            self._run_workers(ctx)
+        finally:
+            ctx.stream.close()
+        
+        if ctx.error is not None:
+            raise ctx.error
+        
+        self.try_rename(tmpfilename, filename)
+        self.try_remove(self.ytdl_filename(filename))
+        self._hook_progress({
+            'status': 'finished',
+            'downloaded_bytes': total,
+            'total_bytes': total,
+            'filename': filename,
+            'elapsed': time.time() - ctx.started_at,
+            'ctx_id': info_dict.get('ctx_id'),
+        }, info_dict)
+        return True
+    
+    def _probe_size(self, url, headers):
+        """
+        探測文件大小及服務器是否支持 Range 請求
+        
+        Args:
+            url (str): 文件 URL
+            headers (HTTPHeaderDict): 請求頭
+        
+        Returns:
+            int: 文件大小，服務器不支持 Range 請求或大小未知時返回 None
+        """
+        try:
+            response = self.ydl.urlopen(Request(url, None, HTTPHeaderDict(headers, {'Range': 'bytes=0-0'})))
+        except (HTTPError, TransportError) as e:
+            self.write_debug(f'Range probe failed: {e}')
+            return None
+        try:
+            if response.status != 206:
+                return None
+            _, _, total = parse_http_range(response.headers.get('Content-Range'))
+            return total
+        finally:
+            response.close()
+    
+    def _fallback_download(self, filename, info_dict):
+        """
+        使用 yt-dlp 的單連接下載器下載 (文件較小或服務器不支持 Range 請求)
+        
+        Args:
+            filename (str): 輸出文件路徑
+            info_dict (dict): 格式信息
+        
+        Returns:
+            bool: 是否成功
+        """
+        # 分段下載留下的 .part 文件已預先分配為完整大小，單連接續傳會誤以為已下載完成
+        if os.path.exists(self.ytdl_filename(filename)):
+            self.try_remove(self.temp_name(filename))
+            self.try_remove(self.ytdl_filename(filename))
+        
+        fd = HttpFD(self.ydl, self.params)
+        fd._progress_hooks = self._progress_hooks
+        return fd.real_download(filename, info_dict)
+    
+    def _load_state(self, tmpfilename, total):
+        """
+        讀取上次中斷時已完成的分段
+        
+        有 .ytdl 分段記錄時沿用其中已完成的分段；沒有記錄但存在 .part 文件時，
+        該文件是單連接下載 (HttpFD) 留下的，其開頭的連續數據有效，按文件大小標記已完整覆蓋的分段。
+        
+        Args:
+            tmpfilename (str): .part 文件路徑
+            total (int): 文件大小
+        
+        Returns:
+            tuple: (已完成的分段序號, 是否沿用現有的 .part 文件)，
+                .part 文件比探測到的大小還大 (無法分段續傳) 時返回 None
+        """
+        if not self.params.get('continuedl', True) or not os.path.isfile(tmpfilename):
+            return [], False
+        
+        state_file = self.ytdl_filename(self.undo_temp_name(tmpfilename))
+        if not os.path.isfile(state_file):
+            size = os.path.getsize(tmpfilename)
+            if size > total:
+                return None
+            chunk_count = (total + RANGE_CHUNK_SIZE - 1) // RANGE_CHUNK_SIZE
+            covered = chunk_count if size == total else size // RANGE_CHUNK_SIZE
+            if size:
+                self.to_screen(f'[download] Resuming {covered} ranges covered by existing {size} bytes')
+            return list(range(covered)), True
+        
+        try:
+            with open(state_file, encoding='utf-8') as f:
+                state = json.load(f).get('range', {})
+        except (OSError, ValueError):
+            return [], False
+        if state.get('total') != total or state.get('chunk_size') != RANGE_CHUNK_SIZE:
+            return [], False
+        self.to_screen(f'[download] Resuming {len(state.get("done", []))} completed ranges')
+        return state.get('done', []), True
+    
+    def _save_state(self, ctx):
+        """
+        記錄已完成的分段 (在 ctx.lock 內調用)
+        
+        Args:
+            ctx (_RangeContext): 下載狀態
+        """
+        state = {'range': {'total': ctx.total, 'chunk_size': ctx.chunk_size, 'done': sorted(ctx.done)}}
+        try:
+            with open(self.ytdl_filename(ctx.filename), 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+        except OSError as e:
+            self.report_warning(f'Unable to save range state: {e}')
+    
+    def _open_output(self, ctx, reuse):
+        """
+        打開 .part 文件，新下載時預先分配完整大小
+        
+        Args:
+            ctx (_RangeContext): 下載狀態
+            reuse (bool): 是否沿用現有的 .part 文件 (只擴展到完整大小，不截斷已有數據)
+        """
+        # 各連接按位置寫入同一文件，需要可隨機寫入的 r+b 模式 (yt-dlp 的 sanitize_open 不支持)
+        if reuse:
+            ctx.stream = open(ctx.tmpfilename, 'r+b')
+            if os.path.getsize(ctx.tmpfilename) < ctx.total:
+                ctx.stream.truncate(ctx.total)
+        else:
+            ctx.stream = open(ctx.tmpfilename, 'wb')
+            ctx.stream.truncate(ctx.total)
+    
+    def _run_workers(self, ctx):
+        """
+        啟動連接線程，並按吞吐量調整連接數直到所有分段完成
+        
+        Args:
+            ctx (_RangeContext): 下載狀態
+        """
+        controller = get_concurrency_controller()
+        ctx.target = max(1, min(RANGE_INITIAL_CONNECTIONS, controller.connection_limit, len(ctx.pending)))
+        if not ctx.pending:
+            ctx.finished.set()
+        
+        threads = []
+        growing = True
+        best_rate = 0
+        sample_bytes, sample_time = ctx.downloaded, time.monotonic()
+        while not ctx.finished.is_set():
+            with ctx.lock:
+                spawn = max(0, min(ctx.target - ctx.active, len(ctx.pending)))
+                ctx.active += spawn
+            for _ in range(spawn):
+                thread = threading.Thread(target=self._worker, args=(ctx,), daemon=True)
+                thread.start()
+                threads.append(thread)
+            
+            if ctx.finished.wait(RANGE_TUNE_INTERVAL):
+                break
+            
+            now = time.monotonic()
+            max_connections = controller.connection_limit
+            with ctx.lock:
+                rate = (ctx.downloaded - sample_bytes) / (now - sample_time)
+                sample_bytes, sample_time = ctx.downloaded, now
+                if ctx.target > max_connections:
+                    # 並發控制器因全局限流或錯誤縮減了連接數
+                    ctx.target = max_connections
+                elif ctx.throttled:
+                    # 服務器開始限流，減少連接並不再增加
+                    ctx.target = max(1, ctx.target - 1)
+                    ctx.throttled = 0
+                    growing = False
+                elif growing and ctx.target < max_connections and ctx.pending:
+                    if rate > best_rate * (1 + RANGE_GAIN_THRESHOLD):
+                        # 上次增加連接後吞吐量仍在上升，繼續增加
+                        best_rate = rate
+                        ctx.target += 1
+                    else:
+                        growing = False
+                        self.write_debug(f'Range download settled at {ctx.target} connections')
+        
+        for thread in threads:
+            thread.join()
+    
+    def _worker(self, ctx):
+        """
+        連接線程執行函數，逐個領取並下載分段
+        
+        Args:
+            ctx (_RangeContext): 下載狀態
+        """
+        try:
+            while True:
+                with ctx.lock:
+                    if ctx.error is not None or ctx.active > ctx.target or not ctx.pending:
+                        return
+                    index = ctx.pending.popleft()
+                
+                try:
+                    self._download_chunk(ctx, index)
+                except BaseException as e:
+                    with ctx.lock:
+                        ctx.pending.appendleft(index)
+                        if ctx.error is None:
+                            ctx.error = e
+                    ctx.finished.set()
+                    return
+                
+                with ctx.lock:
+                    ctx.done.add(index)
+                    self._save_state(ctx)
+                    if len(ctx.done) == ctx.chunk_count:
+                        ctx.finished.set()
+        finally:
+            with ctx.lock:
+                ctx.active -= 1
+    
+    def _download_chunk(self, ctx, index):
+        """
+        下載單個分段，連接中斷時從已寫入的位置重試
+        
+        Args:
+            ctx (_RangeContext): 下載狀態
+            index (int): 分段序號
+        """
+        start, end = ctx.chunk_range(index)
+        # 已寫入到的位置，連接中斷時由 _fetch_range 更新到最後寫入的字節之後
+        position = {'offset': start}
+        retries = self.params.get('retries', 10)
+        attempt = 0
+        while True:
+            try:
+                self._fetch_range(ctx, position, end)
+                if position['offset'] > end:
+                    return
+                raise ContentTooShortError(position['offset'] - start, end - start + 1)
+            except (HTTPError, TransportError, ContentTooShortError) as e:
+                if isinstance(e, HTTPError):
+                    if e.status in THROTTLE_STATUSES:
+                        with ctx.lock:
+                            ctx.throttled += 1
+                        get_concurrency_controller().record_throttle()
+                    elif e.status < 500:
+                        raise
+                attempt += 1
+                if attempt > retries or ctx.error is not None:
+                    raise
+                self.report_retry(e, attempt, retries, frag_index=index + 1)
+                time.sleep(min(attempt, 5))
+    
+    def _fetch_range(self, ctx, position, end):
+        """
+        請求並寫入一段字節範圍
+        
+        Args:
+            ctx (_RangeContext): 下載狀態
+            position (dict): 起始位置 offset，每寫入一塊數據後更新 (請求失敗時保留已寫入的位置)
+            end (int): 結束位置 (包含)
+        """
+        offset = position['offset']
+        request = Request(ctx.url, None, HTTPHeaderDict(ctx.headers, {'Range': f'bytes={offset}-{end}'}))
+        response = self.ydl.urlopen(request)
+        try:
+            content_start, _, _ = parse_http_range(response.headers.get('Content-Range'))
+            if response.status != 206 or content_start != offset:
+                raise HTTPError(response)
+            
+            while offset <= end:
+                if ctx.error is not None:
+                    break
+                block = response.read(min(BLOCK_SIZE, end - offset + 1))
+                if not block:
+                    break
+                with ctx.write_lock:
+                    ctx.stream.seek(offset)
+                    ctx.stream.write(block)
+                with ctx.lock:
+                    ctx.downloaded += len(block)
+                    downloaded = ctx.downloaded
+                offset += len(block)
+                position['offset'] = offset
+                # 在鎖外調用回調，限速等待只阻塞當前連接
+                self._report_progress(ctx, downloaded)
+        finally:
+            response.close()
+    
+    def _report_progress(self, ctx, downloaded):
+        """
+        調用進度回調 (不持有任何鎖，各連接並行調用，報告的字節數可能亂序)
+        
+        Args:
+            ctx (_RangeContext): 下載狀態
+            downloaded (int): 已下載的字節數
+        """
+        now = time.time()
+        speed = self.calc_speed(ctx.started_at, now, downloaded - ctx.resumed)
+        self._hook_progress({
+            'status': 'downloading',
+            'downloaded_bytes': downloaded,
+            'total_bytes': ctx.total,
+            'tmpfilename': ctx.tmpfilename,
+            'filename': ctx.filename,
+            'eta': self.calc_eta(speed, ctx.total - downloaded) if speed else None,
+            'speed': speed,
+            'elapsed': now - ctx.started_at,
+            'connections': ctx.active,
+            'resumed_bytes': ctx.resumed,
+        }, self._info_dict)
+    
+    def download(self, filename, info_dict, subtitle=False):
+        """保存格式信息供連接線程的進度回調使用"""
+        self._info_dict = info_dict
+        return super().download(filename, info_dict, subtitle)
+    
+    @staticmethod
+    def can_download(info_dict, params):
+        """
+        判斷格式是否適合分段下載 (單文件 HTTP 流且預計大小不小於 RANGE_MIN_SIZE)
+        
+        Args:
+            info_dict (dict): 格式信息
+            params (dict): yt-dlp 選項
+        
+        Returns:
+            bool: 是否使用分段下載
+        """
+        if params.get('test') or params.get('nopart') or info_dict.get('impersonate'):
+            return False
+        if info_dict.get('protocol') not in ('http', 'https') or info_dict.get('fragments'):
+            return False
+        size = info_dict.get('filesize') or info_dict.get('filesize_approx')
+        return size is None or size >= RANGE_MIN_SIZE
+
+
+class RangeDownloadYoutubeDL(yt_dlp.YoutubeDL):
+    """對單文件 HTTP 流使用多連接分段下載的 YoutubeDL，其他協議沿用 yt-dlp 的下載器"""
+    
+    def dl(self, name, info, subtitle=False, test=False):
+        """
+        下載單個格式
+        
+        Args:
+            name (str): 輸出文件路徑
+            info (dict): 格式信息
+            subtitle (bool): 是否為字幕
+            test (bool): 是否為測試下載
+        
+        Returns:
+            tuple: (是否成功, 是否實際下載)
+        """
+        if subtitle or test or name == '-' or not info.get('url') \
+                or not RangeFD.can_download(info, self.params):
+            return super().dl(name, info, subtitle, test)
+        
+        fd = RangeFD(self, self.params)
+        for hook in self._progress_hooks:
+            fd.add_progress_hook(hook)
+        new_info = self._copy_infodict(info)
+        if new_info.get('http_headers') is None:
+            new_info['http_headers'] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
@@ -61,18 +61,21 @@ class UpdateChecker:
             return self._check_update()
     
     def _check_update_thread(self):
-        """異步檢查更新線程"""
-        result = self._check_update()
+        """異步檢查更新線程 (不在後台線程中顯示對話框，由回調在界面線程中處理)"""
+        result = self._check_update(show_dialogs=False)
         # 將靜默標誌添加到結果中
         if isinstance(result, dict):
             result['silent'] = self.silent
         if self.callback:
             self.callback(result)
     
-    def _check_update(self):
+    def _check_update(self, show_dialogs=True):
         """
         從 GitHub 檢查更新
         
+        Args:
+            show_dialogs (bool): 是否顯示結果對話框，只能在界面線程中為 True
+        
         Returns:
             dict: 更新信息字典
         """
@@ -124,16 +127,16 @@ class UpdateChecker:
                 self.update_info = result
                 
                 # 顯示更新提示
-                if has_update and self.parent and not self.silent:
-                    self._show_update_dialog(result)
-                elif not has_update and self.parent and not self.silent:
+                if has_update and self.parent and not self.silent and show_dialogs:
+                    self.show_update_dialog(result)
+                elif not has_update and self.parent and not self.silent and show_dialogs:
                     messagebox.showinfo(f"{APP_NAME} - 更新檢查", "您正在使用最新版本！")
                 
                 return result
                 
             except requests.RequestException as e:
                 # 如果無法從 GitHub API 獲取數據，提供模擬數據
-                if not self.silent:
+                if not self.silent and show_dialogs:
                     messagebox.showwarning(f"{APP_NAME} - 更新檢查", f"無法連接到更新伺服器：{str(e)}")
                 
                 return {
@@ -149,7 +152,7 @@ class UpdateChecker:
                 "has_update": False
             }
     
-    def _show_update_dialog(self, update_info):
+    def show_update_dialog(self, update_info):
         """
         顯示發現更新的對話框
         
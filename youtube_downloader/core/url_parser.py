@@ -0,0 +1,214 @@
+"""
+URL 解析模塊 - 識別 YouTube URL 的類型並提取規範化的 ID
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qs
+
+
+# URL 類型
+KIND_VIDEO = 'video'
+KIND_SHORT = 'short'
+KIND_PLAYLIST = 'playlist'
+KIND_VIDEO_IN_PLAYLIST = 'video_in_playlist'
+KIND_CHANNEL = 'channel'
+KIND_MUSIC = 'music'
+
+# 解析結果: kind 為 URL 類型，各 ID 不存在時為 None，canonical_url 為規範化後的 URL
+ParsedURL = namedtuple('ParsedURL', ['kind', 'video_id', 'playlist_id', 'channel_id', 'canonical_url'])
+
+# 主機名稱 -> 站點類型
+_HOSTS = {
+    'youtube.com': 'youtube',
+    'www.youtube.com': 'youtube',
+    'm.youtube.com': 'youtube',
+    'youtube-nocookie.com': 'youtube',
+    'www.youtube-nocookie.com': 'youtube',
+    'youtu.be': 'short_link',
+    'www.youtu.be': 'short_link',
+    'music.youtube.com': 'music',
+}
+
+_VIDEO_ID_RE = re.compile(r'^[0-9A-Za-z_-]{11}$')
+_PLAYLIST_ID_RE = re.compile(r'^[0-9A-Za-z_-]{2,}$')
+
+# 路徑中直接包含影片 ID 的形式: /shorts/ID、/embed/ID、/v/ID、/live/ID
+_PATH_VIDEO_RE = re.compile(r'^/(shorts|embed|v|live)/([0-9A-Za-z_-]{11})(?:[/?#]|$)')
+
+# 頻道路徑: /channel/UC...、/@handle、/c/name、/user/name
+_CHANNEL_RE = re.compile(r'^/(?:(channel)/(UC[0-9A-Za-z_-]{22})|(@[^/?#]+)|(c|user)/([^/?#]+))')
+
+# 批量解析時從文本中切分出的 URL 片段
+_URL_TOKEN_RE = re.compile(r'(?:https?://)?(?:[\w-]+\.)*(?:youtube(?:-nocookie)?\.com|youtu\.be)/\S*', re.IGNORECASE)
+
+
+def _valid_video_id(value):
+    """檢查是否為 11 位影片 ID"""
+    return value if value and _VIDEO_ID_RE.match(value) else None
+
+
+def _valid_playlist_id(value):
+    """檢查是否為播放列表 ID"""
+    return value if value and _PLAYLIST_ID_RE.match(value) else None
+
+
+@lru_cache(maxsize=4096)
+def parse_youtube_url(url):
+    """
+    解析 YouTube URL (一次解析即完成類型判斷與 ID 提取，結果有緩存)
+    
+    Args:
+        url (str): 要解析的 URL
+    
+    Returns:
+        ParsedURL: 解析結果，不是 YouTube URL 時返回 None
+    """
+    if not url:
+        return None
+    
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+    
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    
+    site = _HOSTS.get((parts.hostname or '').lower())
+    if site is None:
+        return None
+    
+    path = parts.path
+    query = parse_qs(parts.query) if parts.query else {}
+    playlist_id = _valid_playlist_id(query.get('list', [None])[0])
+    
+    if site == 'short_link':
+        # youtu.be/ID
+        video_id = _valid_video_id(path.lstrip('/').split('/')[0])
+        if not video_id:
+            return None
+        return _video_result(KIND_VIDEO, video_id, playlist_id)
+    
+    if site == 'music':
+        video_id = _valid_video_id(query.get('v', [None])[0]) if path == '/watch' else None
+        if video_id:
+            canonical = f'https://music.youtube.com/watch?v={video_id}'
+            if playlist_id:
+                canonical += f'&list={playlist_id}'
+            return ParsedURL(KIND_MUSIC, video_id, playlist_id, None, canonical)
+        if playlist_id:
+            return ParsedURL(KIND_MUSIC, None, playlist_id, None,
+                             f'https://music.youtube.com/playlist?list={playlist_id}')
+        return None
+    
+    if path == '/watch':
+        video_id = _valid_video_id(query.get('v', [None])[0])
+        if video_id:
+            return _video_result(KIND_VIDEO, video_id, playlist_id)
+        if playlist_id:
+            return _playlist_result(playlist_id)
+        return None
+    
+    if path == '/playlist':
+        return _playlist_result(playlist_id) if playlist_id else None
+    
+    match = _PATH_VIDEO_RE.match(path)
+    if match:
+        kind = KIND_SHORT if match.group(1) == 'shorts' else KIND_VIDEO
+        return _video_result(kind, match.group(2), playlist_id)
+    
+    match = _CHANNEL_RE.match(path)
+    if match:
+        if match.group(1):
+            channel_id = match.group(2)
+            canonical = f'https://www.youtube.com/channel/{channel_id}'
+        elif match.group(3):
+            channel_id = match.group(3)
+            canonical = f'https://www.youtube.com/{channel_id}'
+        else:
+            channel_id = match.group(5)
+            canonical = f'https://www.youtube.com/{match.group(4)}/{channel_id}'
+        return ParsedURL(KIND_CHANNEL, None, None, channel_id, canonical)
+    
+    return None
+
+
+def _video_result(kind, video_id, playlist_id):
+    """
+    構建影片類型的解析結果
+    
+    Args:
+        kind (str): 影片類型 (video/short)
+        video_id (str): 影片 ID
+        playlist_id (str): 播放列表 ID，可為 None
+    
+    Returns:
+        ParsedURL: 解析結果
+    """
+    if playlist_id:
+        return ParsedURL(KIND_VIDEO_IN_PLAYLIST, video_id, playlist_id, None,
+                         f'https://www.youtube.com/watch?v={video_id}&list={playlist_id}')
+    if kind == KIND_SHORT:
+        return ParsedURL(KIND_SHORT, video_id, None, None, f'https://www.youtube.com/shorts/{video_id}')
+    return ParsedURL(KIND_VIDEO, video_id, None, None, f'https://www.youtube.com/watch?v={video_id}')
+
+
+def _playlist_result(playlist_id):
+    """
+    構建播放列表類型的解析結果
+    
+    Args:
+        playlist_id (str): 播放列表 ID
+    
+    Returns:
+        ParsedURL: 解析結果
+    """
+    return ParsedURL(KIND_PLAYLIST, None, playlist_id, None,
+                     f'https://www.youtube.com/playlist?list={playlist_id}')
+
+
+def parse_urls(text, unique=True):
+    """
+    批量解析文本中的 YouTube URL (如一次貼上的數千行)
+    
+    Args:
+        text (str 或 iterable): 包含 URL 的文本或行列表
+        unique (bool): 是否按規範化 URL 去重 (保留首次出現的順序)
+    
+    Returns:
+        list: ParsedURL 列表，無法識別的片段會被忽略
+    """
+    if not isinstance(text, str):
+        text = '\n'.join(text)
+    
+    results = []
+    seen = set()
+    for token in _URL_TOKEN_RE.findall(text):
+        parsed = parse_youtube_url(token)
+        if parsed is None:
+            continue
+        if unique:
+            if parsed.canonical_url in seen:
+                continue
+            seen.add(parsed.canonical_url)
+        results.append(parsed)
+    
+    return results
+
+
+def get_cache_key(url):
+    """
+    獲取用於緩存與索引的規範化鍵
+    
+    Args:
+        url (str): YouTube URL
+    
+    Returns:
+        str: 影片 ID、播放列表 ID 或頻道 ID，無法識別時返回原始 URL
+    """
+    parsed = parse_youtube_url(url)
+    if parsed is None:
+        return url
+    return parsed.video_id or parsed.playlist_id or parsed.channel_id
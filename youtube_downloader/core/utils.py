@@ -3,13 +3,21 @@
 """
 import os
 import re
+import time
 import shutil
 from pathlib import Path
 
+from youtube_downloader.config import STREAM_URL_TTL, STREAM_EXPIRY_MARGIN
+from .url_parser import parse_youtube_url, KIND_CHANNEL
+
+
+# 流 URL 中的過期時間參數 (查詢參數 expire=... 或路徑 /expire/...)
+_EXPIRE_PARAM_RE = re.compile(r'[?&/]expire[=/](\d+)')
+
 
 def validate_youtube_url(url):
     """
-    驗證 YouTube URL 是否有效
+    驗證 YouTube URL 是否為有效的影片 URL
     
     Args:
         url (str): 要驗證的 URL
@@ -17,14 +25,36 @@ def validate_youtube_url(url):
     Returns:
         bool: URL 是否有效
     """
-    youtube_regex = (
-        r'(https?://)?(www\.)?'
-        r'(youtube|youtu|youtube-nocookie)\.(com|be)/'
-        r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-    )
+    parsed = parse_youtube_url(url)
+    return parsed is not None and parsed.video_id is not None
+
+
+def validate_playlist_url(url):
+    """
+    驗證 URL 是否為有效的播放列表或頻道 URL
     
-    match = re.match(youtube_regex, url)
-    return match is not None
+    Args:
+        url (str): 要驗證的 URL
+        
+    Returns:
+        bool: URL 是否有效
+    """
+    parsed = parse_youtube_url(url)
+    return parsed is not None and (parsed.playlist_id is not None or parsed.kind == KIND_CHANNEL)
+
+
+def extract_video_id(url):
+    """
+    從 YouTube URL 中提取影片 ID
+    
+    Args:
+        url (str): YouTube URL
+        
+    Returns:
+        str: 11 位影片 ID，無法識別時返回 None
+    """
+    parsed = parse_youtube_url(url)
+    return parsed.video_id if parsed else None
 
 
 def get_default_download_path():
@@ -124,3 +154,44 @@ def sanitize_filename(filename):
     # 替換 Windows 不允許的文件名字符
     invalid_chars = r'[\\/:*?"<>|]'
     return re.sub(invalid_chars, '_', filename)
+
+
+def get_stream_expiry(info_dict):
+    """
+    獲取影片信息中流 URL 的最早過期時間
+    
+    Args:
+        info_dict (dict): yt-dlp 提供的影片信息字典
+        
+    Returns:
+        float: 過期時間戳，無法判斷時按提取時間加上默認有效期估算
+    """
+    expiries = []
+    formats = info_dict.get('formats') or [info_dict]
+    for fmt in formats:
+        for key in ('url', 'manifest_url'):
+            match = _EXPIRE_PARAM_RE.search(fmt.get(key) or '')
+            if match:
+                expiries.append(int(match.group(1)))
+    
+    if expiries:
+        return min(expiries)
+    
+    # 沒有 expire 參數時，以提取時間 (epoch) 估算
+    return info_dict.get('epoch', 0) + STREAM_URL_TTL
+
+
+def is_stream_info_expired(info_dict, margin=STREAM_EXPIRY_MARGIN):
+    """
+    檢查影片信息中的流 URL 是否已過期 (或即將過期)
+    
+    Args:
+        info_dict (dict): yt-dlp 提供的影片信息字典
+        margin (int): 提前視為過期的秒數，預留下載所需時間
+        
+    Returns:
+        bool: 是否需要重新提取
+    """
+    if not info_dict:
+        return True
+    return get_stream_expiry(info_dict) - margin <= time.time()
@@ -4,14 +4,13 @@
 import os
 import re
 import tempfile
-import threading
 import time
-import yt_dlp
 import requests
 from PIL import Image
 import io
 
 from .utils import validate_youtube_url, format_time
+from .extraction_service import get_extraction_service
 
 
 class VideoInfoExtractor:
@@ -25,8 +24,6 @@ class VideoInfoExtractor:
             callback (function): 回調函數，用於更新 UI
         """
         self.callback = callback
-        self.cache = {}  # 緩存已獲取的影片信息
-        self._extraction_thread = None
     
     def extract_video_info(self, url, async_extract=True):
         """
@@ -48,15 +45,6 @@ class VideoInfoExtractor:
                 })
             return None
         
-        # 檢查是否有緩存
-        if url in self.cache:
-            if self.callback:
-                self.callback({
-                    'status': 'complete',
-                    'info': self.cache[url]
-                })
-            return self.cache[url]
-        
         # 通知開始提取
         if self.callback:
             self.callback({
@@ -65,27 +53,25 @@ class VideoInfoExtractor:
             })
         
         if async_extract:
-            # 啟動異步提取線程
-            self._extraction_thread = threading.Thread(
-                target=self._extract_thread,
-                args=(url,)
-            )
-            self._extraction_thread.daemon = True
-            self._extraction_thread.start()
+            # 通過共享提取服務異步提取，同一影片的其他請求 (如縮圖組件) 會共享此次提取，
+            # 持久化緩存命中時回調會立即執行
+            future = get_extraction_service().submit(url)
+            future.add_done_callback(lambda f: self._on_extracted(url, f))
             return None
         else:
             # 同步提取
             return self._extract_info(url)
     
-    def _extract_thread(self, url):
+    def _on_extracted(self, url, future):
         """
-        異步提取線程執行函數
+        異步提取完成的回調函數
         
         Args:
             url (str): YouTube URL
+            future (Future): 提取服務返回的 Future
         """
         try:
-            info = self._extract_info(url)
+            info = self._build_video_info(url, future.result())
             
             if self.callback:
                 self.callback({
@@ -96,7 +82,7 @@ class VideoInfoExtractor:
             if self.callback:
                 self.callback({
                     'status': 'error',
-                    'error': str(e)
+                    'error': f'無法獲取影片信息: {str(e)}'
                 })
     
     def _extract_info(self, url):
@@ -109,25 +95,9 @@ class VideoInfoExtractor:
         Returns:
             dict: 影片信息字典
         """
-        ydl_opts = {
-            'format': 'best',
-            'skip_download': True,
-            'quiet': True,
-            'no_warnings': True,
-            'ignoreerrors': True,  # 改為 True 以避免格式不可用錯誤
-        }
-        
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info_dict = ydl.extract_info(url, download=False)
-                
-                # 提取所需信息
-                video_info = self._process_info_dict(info_dict)
-                
-                # 緩存結果
-                self.cache[url] = video_info
-                
-                return video_info
+            info_dict = get_extraction_service().extract(url)
+            return self._build_video_info(url, info_dict)
                 
         except Exception as e:
             if self.callback:
@@ -137,6 +107,25 @@ class VideoInfoExtractor:
                 })
             raise
     
+    def _build_video_info(self, url, info_dict):
+        """
+        處理提取結果
+        
+        Args:
+            url (str): YouTube URL
+            info_dict (dict): yt-dlp 原始影片信息字典
+            
+        Returns:
+            dict: 影片信息字典
+        """
+        video_info = self._process_info_dict(info_dict)
+        if video_info:
+            # 保留原始信息，下載時可直接使用而無需再次提取
+            video_info['source_url'] = url
+            video_info['raw_info'] = info_dict
+        
+        return video_info
+    
     def _process_info_dict(self, info_dict):
         """
         處理 yt-dlp 提供的信息字典
@@ -304,11 +293,7 @@ class VideoInfoExtractor:
         Returns:
             dict: 可用格式字典
         """
-        # 檢查是否有緩存
-        if url in self.cache:
-            return self.cache[url].get('formats', {})
-            
-        # 否則提取信息
+        # 提取信息 (命中持久化緩存時無需網絡請求)
         info = self.extract_video_info(url, async_extract=False)
         if info:
             return info.get('formats', {})
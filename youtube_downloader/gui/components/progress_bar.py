@@ -3,7 +3,7 @@
 """
 import customtkinter as ctk
 
-from youtube_downloader.core.utils import format_filesize
+from youtube_downloader.core.utils import format_filesize, format_time
 
 
 class ProgressBar(ctk.CTkFrame):
@@ -74,22 +74,27 @@ class ProgressBar(ctk.CTkFrame):
             self.percent_label.configure(text="0%")
             
         elif status == 'downloading':
-            # 獲取進度信息
+            # 獲取進度信息 (數值欄位，在此格式化顯示)
             percent = info.get('percent', 0)
-            speed = info.get('speed', '0 KiB/s')
-            downloaded = info.get('downloaded', '0 B')
-            total = info.get('total', 'Unknown')
-            eta = info.get('eta', 'Unknown')
+            speed = info.get('speed')
+            downloaded_bytes = info.get('downloaded_bytes')
+            total_bytes = info.get('total_bytes')
+            eta = info.get('eta')
             
             # 更新進度條
             self.progress.set(percent)
             
             # 更新狀態文本
-            status_text = f"正在下載... {speed}"
-            if downloaded and total:
-                status_text += f" ({downloaded}/{total})"
-            if eta and eta != "Unknown":
-                status_text += f", 剩餘時間: {eta}"
+            status_text = "正在下載..."
+            if speed:
+                status_text += f" {format_filesize(speed)}/s"
+            if downloaded_bytes is not None and total_bytes:
+                status_text += f" ({format_filesize(downloaded_bytes)}/{format_filesize(total_bytes)})"
+            elif isinstance(info.get('downloaded'), str):
+                # 播放列表進度等預先組好的文本
+                status_text += f" ({info['downloaded']})"
+            if eta:
+                status_text += f", 剩餘時間: {format_time(int(eta))}"
                 
             self.status_label.configure(text=status_text)
             
@@ -121,6 +126,10 @@ class ProgressBar(ctk.CTkFrame):
                 text_color="#d33a56"  # 紅色
             )
             
+        elif status == 'paused':
+            message = info.get('message', '下載已暫停')
+            self.status_label.configure(text=message)
+            
         elif status == 'cancelled':
             self.reset()
             self.status_label.configure(text="下載已取消")
@@ -3,6 +3,8 @@
 """
 import customtkinter as ctk
 
+from youtube_downloader.config import NATIVE_AUDIO_QUALITY
+
 
 class QualitySelector(ctk.CTkFrame):
     """品質選擇組件"""
@@ -22,7 +24,7 @@ class QualitySelector(ctk.CTkFrame):
         
         # 品質選項
         self.mp4_options = ["360p", "480p", "720p", "1080p", "2K", "4K"]
-        self.mp3_options = ["128kbps", "192kbps", "256kbps", "320kbps"]
+        self.mp3_options = ["128kbps", "192kbps", "256kbps", "320kbps", NATIVE_AUDIO_QUALITY]
         
         self.current_format = "MP3"  # 默認格式
         self.current_quality = "320kbps"  # 默認品質
@@ -10,14 +10,13 @@ from PIL import Image, ImageTk
 import requests
 import io
 import traceback
-import yt_dlp
 
-from youtube_downloader.core.video_info import VideoInfoExtractor
+from youtube_downloader.core.extraction_service import get_extraction_service
 from youtube_downloader.core.utils import validate_youtube_url
 
 
 class ThumbnailViewer(ctk.CTkFrame):
-    """縮圖顯示組件 - 直接使用 yt-dlp 獲取縮圖"""
+    """縮圖顯示組件 - 從共享提取服務的結果中獲取縮圖"""
     
     def __init__(self, master, width=480, height=270, **kwargs):
         """
@@ -140,7 +139,7 @@ class ThumbnailViewer(ctk.CTkFrame):
     
     def _get_youtube_thumbnail(self, url):
         """
-        直接使用 yt-dlp 獲取 YouTube 縮圖
+        獲取 YouTube 縮圖，影片信息來自共享提取服務 (與主窗口的信息提取共用同一次請求)
         
         Args:
             url (str): YouTube URL
@@ -155,29 +154,19 @@ class ThumbnailViewer(ctk.CTkFrame):
                 print("URL 無效")
                 return None
                 
-            # 直接使用 yt-dlp 獲取信息
-            ydl_opts = {
-                'quiet': True, 
-                'no_warnings': True,
-                'skip_download': True,
-                'format': 'best',  # 添加格式選項以避免格式不可用錯誤
-                'ignoreerrors': True,  # 忽略錯誤以獲取基本信息
-            }
+            # 等待共享提取服務的結果
+            info = get_extraction_service().extract(url)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # 提取信息
-                info = ydl.extract_info(url, download=False)
+            # 取得縮圖 URL
+            if info.get('thumbnail'):
+                thumbnail_url = info['thumbnail']
+                print(f"找到縮圖 URL: {thumbnail_url}")
                 
-                # 取得縮圖 URL
-                if 'thumbnail' in info:
-                    thumbnail_url = info['thumbnail']
-                    print(f"找到縮圖 URL: {thumbnail_url}")
-                    
-                    # 下載縮圖
-                    response = requests.get(thumbnail_url, timeout=10)
-                    if response.status_code == 200:
-                        img = Image.open(io.BytesIO(response.content))
-                        return img
+                # 下載縮圖
+                response = requests.get(thumbnail_url, timeout=10)
+                if response.status_code == 200:
+                    img = Image.open(io.BytesIO(response.content))
+                    return img
             
             return None
         except Exception as e:
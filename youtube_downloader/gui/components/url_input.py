@@ -2,7 +2,6 @@
 URL 輸入組件 - 處理 YouTube URL 的輸入和驗證
 """
 import customtkinter as ctk
-import re
 
 from youtube_downloader.core.utils import validate_youtube_url
 
@@ -10,7 +9,7 @@ from youtube_downloader.core.utils import validate_youtube_url
 class URLInput(ctk.CTkFrame):
     """URL 輸入組件"""
     
-    def __init__(self, master, on_url_change=None, on_url_submit=None, **kwargs):
+    def __init__(self, master, on_url_change=None, on_url_submit=None, validator=validate_youtube_url, **kwargs):
         """
         初始化 URL 輸入組件
         
@@ -18,12 +17,14 @@ class URLInput(ctk.CTkFrame):
             master: 父組件
             on_url_change (function): URL 變更回調函數
             on_url_submit (function): URL 提交回調函數
+            validator (function): URL 驗證函數，默認只接受影片 URL
             **kwargs: 其他參數
         """
         super().__init__(master, **kwargs)
         
         self.on_url_change = on_url_change
         self.on_url_submit = on_url_submit
+        self.validator = validator
         
         # 配置網格
         self.grid_columnconfigure(0, weight=1)
@@ -73,7 +74,7 @@ class URLInput(ctk.CTkFrame):
             self._last_url = current_url
             
             # 檢查 URL 是否有效
-            is_valid = validate_youtube_url(current_url) if current_url else False
+            is_valid = self.validator(current_url) if current_url else False
             
             # 如果有回調函數，則調用
             if self.on_url_change:
@@ -89,7 +90,7 @@ class URLInput(ctk.CTkFrame):
         current_url = self.url_entry.get().strip()
         
         # 檢查 URL 是否有效
-        is_valid = validate_youtube_url(current_url) if current_url else False
+        is_valid = self.validator(current_url) if current_url else False
         
         if is_valid and self.on_url_submit:
             self.on_url_submit(current_url)
@@ -103,7 +104,7 @@ class URLInput(ctk.CTkFrame):
             clipboard_content = self.clipboard_get().strip()
             
             # 檢查是否是有效的 YouTube URL
-            if validate_youtube_url(clipboard_content):
+            if self.validator(clipboard_content):
                 self.url_entry.delete(0, "end")
                 self.url_entry.insert(0, clipboard_content)
                 
@@ -0,0 +1,234 @@
+"""
+虛擬列表組件 - 只為可見的行創建組件，滾動時重用行組件，適合數千條以上的列表
+"""
+import customtkinter as ctk
+
+
+class VirtualList(ctk.CTkFrame):
+    """虛擬列表組件"""
+    
+    def __init__(self, master, columns, formatter, visible_rows=15, row_height=28,
+                 empty_text="", on_visible_change=None, **kwargs):
+        """
+        初始化虛擬列表組件
+        
+        Args:
+            master: 父組件
+            columns (list): 欄位定義 [(標題, 權重, 對齊方式), ...]，對齊方式為 "w" 或 "e"
+            formatter (function): 將條目轉換為各欄文本的函數 formatter(index, item) -> tuple
+            visible_rows (int): 同時顯示的行數 (即創建的行組件數)
+            row_height (int): 每行的高度 (像素)
+            empty_text (str): 沒有條目時顯示的文本
+            on_visible_change (function): 可見範圍內容變化時的回調函數 on_visible_change(start, end)
+            **kwargs: 其他參數
+        """
+        super().__init__(master, **kwargs)
+        
+        self.columns = columns
+        self.formatter = formatter
+        self.visible_rows = visible_rows
+        self.row_height = row_height
+        self.empty_text = empty_text
+        self.on_visible_change = on_visible_change
+        self.items = []
+        self.first_index = 0
+        
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+        
+        # 標題行
+        self.header_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.header_frame.grid(row=0, column=0, columnspan=2, sticky="ew")
+        for column, (title, weight, anchor) in enumerate(columns):
+            self.header_frame.grid_columnconfigure(column, weight=weight)
+            header_label = ctk.CTkLabel(
+                self.header_frame,
+                text=title,
+                font=("Arial", 12, "bold"),
+                anchor=anchor
+            )
+            header_label.grid(row=0, column=column, sticky=anchor, padx=5, pady=(0, 10))
+        
+        # 分隔線
+        separator = ctk.CTkFrame(self, height=1, fg_color="gray")
+        separator.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(0, 10))
+        
+        # 行組件區域 (固定高度，行組件數量不隨條目數增加)
+        self.body_frame = ctk.CTkFrame(
+            self,
+            fg_color="transparent",
+            height=visible_rows * row_height
+        )
+        self.body_frame.grid(row=2, column=0, sticky="nsew")
+        self.body_frame.grid_propagate(False)
+        for column, (title, weight, anchor) in enumerate(columns):
+            self.body_frame.grid_columnconfigure(column, weight=weight)
+        
+        self.row_labels = []
+        for row in range(visible_rows):
+            labels = []
+            for column, (title, weight, anchor) in enumerate(columns):
+                label = ctk.CTkLabel(
+                    self.body_frame,
+                    text="",
+                    font=("Arial", 12),
+                    anchor=anchor,
+                    height=row_height
+                )
+                label.grid(row=row, column=column, sticky=anchor, padx=5)
+                self._bind_wheel(label)
+                labels.append(label)
+            self.row_labels.append(labels)
+        self._bind_wheel(self.body_frame)
+        
+        # 無條目提示
+        self.empty_label = ctk.CTkLabel(
+            self.body_frame,
+            text=empty_text,
+            font=("Arial", 12),
+            anchor="center"
+        )
+        
+        # 滾動條
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=2, column=1, sticky="ns")
+        
+        self._render()
+    
+    def _bind_wheel(self, widget):
+        """
+        綁定滑鼠滾輪事件
+        
+        Args:
+            widget: 要綁定的組件
+        """
+        widget.bind("<MouseWheel>", self._on_mouse_wheel, add="+")
+        widget.bind("<Button-4>", lambda event: self.scroll_by(-3), add="+")
+        widget.bind("<Button-5>", lambda event: self.scroll_by(3), add="+")
+    
+    def _on_mouse_wheel(self, event):
+        """
+        滑鼠滾輪事件處理函數
+        
+        Args:
+            event: 事件對象
+        """
+        self.scroll_by(-3 if event.delta > 0 else 3)
+        return "break"
+    
+    def _on_scrollbar(self, action, *args):
+        """
+        滾動條事件處理函數
+        
+        Args:
+            action (str): "moveto" 或 "scroll"
+            *args: 滾動位置或滾動量
+        """
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * len(self.items)))
+        elif action == "scroll":
+            amount = int(args[0])
+            if len(args) > 1 and args[1] == "pages":
+                amount *= self.visible_rows
+            self.scroll_by(amount)
+    
+    def scroll_by(self, rows):
+        """
+        滾動指定行數
+        
+        Args:
+            rows (int): 滾動的行數，負數向上
+        """
+        self.scroll_to(self.first_index + rows)
+    
+    def scroll_to(self, index):
+        """
+        滾動到指定條目 (作為第一個可見行)
+        
+        Args:
+            index (int): 條目位置
+        """
+        index = max(0, min(index, len(self.items) - self.visible_rows))
+        if index != self.first_index:
+            self.first_index = index
+            self._render()
+    
+    def set_items(self, items):
+        """
+        設置全部條目並回到頂部
+        
+        Args:
+            items (list): 條目列表 (只保存引用，不複製)
+        """
+        self.items = items
+        self.first_index = 0
+        self._render()
+    
+    def set_item(self, index, item):
+        """
+        設置單個條目，位置超出列表長度時自動擴展
+        
+        Args:
+            index (int): 條目位置
+            item: 條目
+        """
+        if index >= len(self.items):
+            self.items.extend([None] * (index + 1 - len(self.items)))
+        self.items[index] = item
+        self.refresh(index)
+    
+    def refresh(self, index=None):
+        """
+        重新繪製可見的行
+        
+        Args:
+            index (int): 只在該條目可見 (或列表未填滿) 時才重繪，為 None 時總是重繪
+        """
+        if index is None or index < self.first_index + self.visible_rows:
+            self._render()
+        else:
+            self._update_scrollbar()
+    
+    def clear(self):
+        """清除所有條目"""
+        self.set_items([])
+    
+    def get_visible_range(self):
+        """
+        獲取可見的條目範圍
+        
+        Returns:
+            tuple: (起始位置, 結束位置)，不含結束位置
+        """
+        return self.first_index, min(len(self.items), self.first_index + self.visible_rows)
+    
+    def _render(self):
+        """將可見範圍內的條目綁定到行組件"""
+        if not self.items and self.empty_text:
+            self.empty_label.place(relx=0.5, rely=0.5, anchor="center")
+        else:
+            self.empty_label.place_forget()
+        
+        for row, labels in enumerate(self.row_labels):
+            index = self.first_index + row
+            if index < len(self.items):
+                texts = self.formatter(index, self.items[index])
+            else:
+                texts = ("",) * len(labels)
+            for label, text in zip(labels, texts):
+                # 文本沒有變化時不重新配置，減少重繪
+                if label.cget("text") != text:
+                    label.configure(text=text)
+        
+        self._update_scrollbar()
+        
+        if self.on_visible_change and self.items:
+            self.on_visible_change(*self.get_visible_range())
+    
+    def _update_scrollbar(self):
+        """更新滾動條的位置與長度"""
+        total = len(self.items)
+        if total <= self.visible_rows:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first_index / total, (self.first_index + self.visible_rows) / total)
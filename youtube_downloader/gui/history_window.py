@@ -9,6 +9,10 @@ import webbrowser
 import subprocess
 
 from youtube_downloader.core.history import DownloadHistory
+from youtube_downloader.core.file_status import get_file_status_scanner
+from youtube_downloader.core.event_bus import get_event_bus
+from youtube_downloader.core.utils import format_filesize
+from youtube_downloader.config import HISTORY_PAGE_SIZE, HISTORY_SEARCH_DEBOUNCE_MS
 
 
 class HistoryWindow(ctk.CTkToplevel):
@@ -35,6 +39,20 @@ class HistoryWindow(ctk.CTkToplevel):
         # 初始化歷史記錄管理器
         self.history = DownloadHistory()
         
+        # 文件狀態在後台檢查，不在界面線程中訪問 (可能很慢的) 磁盤
+        self.file_scanner = get_file_status_scanner()
+        self.path_widgets = {}
+        
+        # 檢查結果經事件總線在界面線程中更新
+        self.event_bus = get_event_bus()
+        self.file_status_topic = f"file_status:{id(self)}"
+        self.event_bus.subscribe(self.file_status_topic, self._apply_file_status)
+        
+        # 搜索及分頁狀態
+        self.search_query = ""
+        self.loaded_count = 0
+        self._search_after_id = None
+        
         # 創建界面組件
         self._create_widgets()
         
@@ -58,6 +76,18 @@ class HistoryWindow(ctk.CTkToplevel):
         )
         self.title_label.pack(pady=(20, 10))
         
+        # 創建搜索框
+        self.search_var = tk.StringVar()
+        self.search_entry = ctk.CTkEntry(
+            self,
+            textvariable=self.search_var,
+            placeholder_text="搜索標題、上傳者、網址或文件路徑",
+            height=30,
+            font=("Arial", 12)
+        )
+        self.search_entry.pack(fill="x", padx=25, pady=(0, 5))
+        self.search_var.trace_add("write", self._on_search_changed)
+        
         # 創建滾動框架
         self.scroll_frame = ctk.CTkScrollableFrame(
             self,
@@ -93,34 +123,84 @@ class HistoryWindow(ctk.CTkToplevel):
         
         # 保存歷史記錄項目的引用
         self.history_items = []
+        self.more_button = None
+    
+    def _on_search_changed(self, *args):
+        """搜索詞變更時延遲搜索，連續輸入時只執行最後一次"""
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(HISTORY_SEARCH_DEBOUNCE_MS, self._apply_search)
+    
+    def _apply_search(self):
+        """執行搜索並重新加載第一頁"""
+        self._search_after_id = None
+        query = self.search_var.get().strip()
+        if query == self.search_query:
+            return
+        self.search_query = query
+        self._load_history_records()
     
     def _load_history_records(self):
-        """加載歷史記錄"""
+        """加載歷史記錄 (第一頁)"""
         # 清除現有項目
         for widget in self.history_items:
             widget.destroy()
         self.history_items = []
+        self.path_widgets = {}
+        self.loaded_count = 0
+        self.more_button = None
         
-        # 獲取歷史記錄
-        records = self.history.get_records(limit=50)
+        self._load_more_records()
         
-        if not records:
+        if not self.loaded_count:
             # 創建無記錄提示
             no_record_label = ctk.CTkLabel(
                 self.scroll_frame,
-                text="尚無下載記錄",
+                text="找不到符合的記錄" if self.search_query else "尚無下載記錄",
                 font=("Arial", 14, "bold"),
                 anchor="center"
             )
             no_record_label.pack(pady=50)
             self.history_items.append(no_record_label)
-            return
-            
+    
+    def _load_more_records(self):
+        """加載下一頁歷史記錄"""
+        if self.more_button:
+            self.more_button.destroy()
+            self.history_items.remove(self.more_button)
+            self.more_button = None
+        
+        # 多取一條用於判斷是否還有下一頁
+        records = self.history.search(
+            self.search_query,
+            limit=HISTORY_PAGE_SIZE + 1,
+            offset=self.loaded_count
+        )
+        has_more = len(records) > HISTORY_PAGE_SIZE
+        records = records[:HISTORY_PAGE_SIZE]
+        
         # 創建歷史記錄項目
         for record in records:
             item_frame = self._create_history_item(record)
             item_frame.pack(fill="x", padx=5, pady=5)
             self.history_items.append(item_frame)
+        self.loaded_count += len(records)
+        
+        # 後台檢查本頁記錄的文件是否存在
+        self.file_scanner.check(
+            [record.get("file_path", "") for record in records],
+            self.event_bus.publisher(self.file_status_topic)
+        )
+        
+        if has_more:
+            self.more_button = ctk.CTkButton(
+                self.scroll_frame,
+                text="載入更多",
+                command=self._load_more_records,
+                font=("Arial", 12, "bold")
+            )
+            self.more_button.pack(pady=10)
+            self.history_items.append(self.more_button)
     
     def _create_history_item(self, record):
         """
@@ -161,16 +241,11 @@ class HistoryWindow(ctk.CTkToplevel):
         )
         info_label.grid(row=1, column=0, columnspan=2, sticky="w", padx=10, pady=(0, 5))
         
-        # 文件路徑
+        # 文件路徑 (狀態由後台檢查後更新)
         path = record.get("file_path", "")
-        if path and os.path.exists(path):
-            path_state = "存在"
-        else:
-            path_state = "文件不存在"
-            
         path_label = ctk.CTkLabel(
             item_frame,
-            text=f"路徑: {path} ({path_state})",
+            text=f"路徑: {path} (檢查中...)" if path else "路徑:  (文件不存在)",
             font=("Arial", 10),
             anchor="w",
             text_color="gray"
@@ -192,17 +267,17 @@ class HistoryWindow(ctk.CTkToplevel):
         )
         redownload_button.pack(side="right", padx=5)
         
-        # 打開文件位置按鈕
-        if path and os.path.exists(path):
-            open_folder_button = ctk.CTkButton(
-                button_frame,
-                text="打開文件位置",
-                width=120,
-                height=25,
-                command=lambda p=path: self._open_file_location(p),
-                font=("Arial", 12, "bold")
-            )
-            open_folder_button.pack(side="right", padx=5)
+        # 打開文件位置按鈕 (確認文件存在後才顯示)
+        open_folder_button = ctk.CTkButton(
+            button_frame,
+            text="打開文件位置",
+            width=120,
+            height=25,
+            command=lambda p=path: self._open_file_location(p),
+            font=("Arial", 12, "bold")
+        )
+        if path:
+            self.path_widgets.setdefault(path, []).append((path_label, open_folder_button, redownload_button))
         
         # 在網頁中打開按鈕
         if record.get("url"):
@@ -218,6 +293,26 @@ class HistoryWindow(ctk.CTkToplevel):
             
         return item_frame
     
+    def _apply_file_status(self, status):
+        """
+        更新記錄的文件狀態顯示 (經事件總線在界面線程中調用)
+        
+        Args:
+            status (dict): 文件狀態
+        """
+        path = status['path']
+        for path_label, open_folder_button, redownload_button in self.path_widgets.get(path, []):
+            if not path_label.winfo_exists():
+                continue
+            if status['exists']:
+                path_label.configure(text=f"路徑: {path} (存在, {format_filesize(status['size'])})")
+                if not open_folder_button.winfo_manager():
+                    # 與原有按鈕順序一致，放在重新下載按鈕左側
+                    open_folder_button.pack(side="right", padx=5, after=redownload_button)
+            else:
+                path_label.configure(text=f"路徑: {path} (文件不存在)")
+                open_folder_button.pack_forget()
+    
     def _redownload_item(self, record):
         """
         重新下載項目
@@ -323,5 +418,8 @@ class HistoryWindow(ctk.CTkToplevel):
     
     def _on_close(self):
         """窗口關閉事件處理函數"""
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self.event_bus.unsubscribe(self.file_status_topic)
         self.grab_release()
         self.destroy()
@@ -20,9 +20,12 @@ from youtube_downloader.gui.history_window import HistoryWindow
 from youtube_downloader.gui.playlist_window import PlaylistWindow
 from youtube_downloader.gui.converter_window import ConverterWindow
 from youtube_downloader.core.video_info import VideoInfoExtractor
-from youtube_downloader.core.downloader import YouTubeDownloader
+from youtube_downloader.core.download_manager import DownloadManager
+from youtube_downloader.core.journal import DownloadJournal
 from youtube_downloader.core.utils import get_default_download_path
 from youtube_downloader.core.history import DownloadHistory
+from youtube_downloader.core.persistence import get_persistence_writer
+from youtube_downloader.core.event_bus import get_event_bus
 from youtube_downloader.core.updater import UpdateChecker
 from youtube_downloader.config import APP_NAME, APP_VERSION
 
@@ -60,11 +63,21 @@ class MainWindow(ctk.CTk):
         except Exception as e:
             print(f"設置圖標失敗：{e}")
         
+        # 後台線程的回調經事件總線轉到界面線程處理，進度事件按任務合併
+        self.event_bus = get_event_bus()
+        self.event_bus.subscribe('video_info', self._on_video_info_update)
+        self.event_bus.subscribe('download', self._on_download_update)
+        self.event_bus.subscribe('update', self._on_update_checked)
+        self.event_bus.start(self)
+        
         # 創建核心組件
-        self.video_info = VideoInfoExtractor(callback=self._on_video_info_update)
-        self.downloader = YouTubeDownloader(callback=self._on_download_update)
+        self.video_info = VideoInfoExtractor(callback=self.event_bus.publisher('video_info'))
+        self.download_manager = DownloadManager(
+            callback=self.event_bus.publisher('download', key_field='job_id'),
+            journal=DownloadJournal()
+        )
         self.history = DownloadHistory()
-        self.updater = UpdateChecker(parent=self, callback=self._on_update_checked)
+        self.updater = UpdateChecker(parent=self, callback=self.event_bus.publisher('update'))
         
         # 創建界面組件
         self._create_widgets()
@@ -81,6 +94,9 @@ class MainWindow(ctk.CTk):
         
         # 檢查更新
         self.updater.check_update()
+        
+        # 檢查上次未完成的下載任務
+        self.after(1000, self._check_unfinished_downloads)
 
         # 初始化其他窗口實例變數
         self.history_window = None
@@ -198,6 +214,16 @@ class MainWindow(ctk.CTk):
             hover_color="#b52e47",
             command=self._on_download_clicked
         )
+        
+        # 創建暫停/繼續按鈕
+        self.pause_button = ctk.CTkButton(
+            self,
+            text="暫停下載",
+            font=("Arial", 14, "bold"),
+            height=32,
+            width=300,
+            command=self._on_pause_clicked
+        )
     
     def _setup_layout(self):
         """設置界面布局"""
@@ -236,7 +262,10 @@ class MainWindow(ctk.CTk):
         self.embed_thumbnail_switch.pack(fill="x", padx=padding, pady=(0, padding))
         
         # 布局下載按鈕
-        self.download_button.pack(fill="x", padx=padding*3, pady=(10, 20))
+        self.download_button.pack(fill="x", padx=padding*3, pady=(10, 10))
+        
+        # 布局暫停/繼續按鈕
+        self.pause_button.pack(fill="x", padx=padding*3, pady=(0, 20))
         
         # 布局進度條組件
         self.progress_bar.pack(fill="x", padx=padding, pady=(padding, 0))
@@ -513,14 +542,51 @@ class MainWindow(ctk.CTk):
         output_path = self.path_selector.get_path()
         embed_thumbnail = self.embed_thumbnail
         
-        # 開始下載
-        self.downloader.download(
-            url=url,
-            output_path=output_path,
-            format_option=format_type.lower(),
-            quality_option=quality,
-            embed_thumbnail=embed_thumbnail
-        )
+        options = {
+            'output_path': output_path,
+            'format': format_type.lower(),
+            'quality': quality,
+            'embed_thumbnail': embed_thumbnail
+        }
+        
+        # 如果已為此 URL 提取過影片信息，直接交給下載器使用，省去再次提取
+        if self.current_video_info and self.current_video_info.get('source_url') == url:
+            options['info_dict'] = self.current_video_info.get('raw_info')
+        
+        # 提交下載任務，由下載管理器並行執行
+        self.download_manager.submit(url, options)
+    
+    def _on_pause_clicked(self):
+        """暫停/繼續按鈕點擊事件處理函數"""
+        jobs = self.download_manager.get_jobs()
+        
+        if any(job['status'] not in ('complete', 'error', 'cancelled', 'paused') for job in jobs):
+            # 有進行中的任務，全部暫停
+            self.download_manager.pause_all()
+            self.pause_button.configure(text="繼續下載")
+        else:
+            # 續傳所有已暫停的任務
+            for job in jobs:
+                if job['status'] == 'paused':
+                    self.download_manager.resume(job['id'])
+            self.pause_button.configure(text="暫停下載")
+    
+    def _check_unfinished_downloads(self):
+        """檢查下載日誌中上次未完成的任務，詢問是否續傳"""
+        job_ids = self.download_manager.restore_unfinished()
+        if not job_ids:
+            return
+        
+        if messagebox.askyesno(
+            f"{APP_NAME} - 未完成的下載",
+            f"發現 {len(job_ids)} 個上次未完成的下載任務，是否繼續下載？\n"
+            "選擇「否」將刪除已下載的部分文件。"
+        ):
+            for job_id in job_ids:
+                self.download_manager.resume(job_id)
+        else:
+            for job_id in job_ids:
+                self.download_manager.cancel(job_id)
     
     def _on_download_update(self, info):
         """
@@ -543,11 +609,13 @@ class MainWindow(ctk.CTk):
             print(f"目前影片信息狀態: {'有' if self.current_video_info else '無'}")
             
             if filename:
-                # 創建下載選項記錄
+                # 使用提交任務時的下載選項，而非當前界面上的選項
+                job = self.download_manager.get_job(info.get('job_id'))
+                job_options = job['options'] if job else {}
                 download_options = {
-                    'format': self.format_selector.get_format().lower(),
-                    'quality': self.quality_selector.get_quality(),
-                    'embed_thumbnail': self.embed_thumbnail
+                    'format': job_options.get('format', self.format_selector.get_format().lower()),
+                    'quality': job_options.get('quality', self.quality_selector.get_quality()),
+                    'embed_thumbnail': job_options.get('embed_thumbnail', self.embed_thumbnail)
                 }
                 
                 # 使用傳過來的影片信息或当前影片信息
@@ -714,9 +782,8 @@ class MainWindow(ctk.CTk):
             return
             
         if result['status'] == 'success' and result.get('has_update', False):
-            # 有更新可用，更新的對話框已在 UpdateChecker 中處理
-            # 我們不需要在這裡再次創建對話框
-            pass
+            # 有更新可用，異步檢查不在後台線程中顯示對話框，在此詢問是否更新
+            self.updater.show_update_dialog(result)
         elif result['status'] == 'success' and not result.get('silent', True):
             # 手動檢查且無更新時顯示訊息
             messagebox.showinfo(f"{APP_NAME} - 更新檢查", "您正在使用最新版本！")
@@ -739,8 +806,14 @@ class MainWindow(ctk.CTk):
     
     def _on_closing(self):
         """窗口關閉事件處理函數"""
-        # 取消下載
-        self.downloader.cancel()
+        # 暫停所有下載任務，未完成的任務保留在下載日誌中，下次啟動時可續傳
+        self.download_manager.shutdown()
+        
+        # 寫入排隊中的歷史記錄、緩存及日誌並落盤
+        get_persistence_writer().shutdown()
+        
+        # 停止事件總線的輪詢
+        self.event_bus.stop()
         
         # 關閉窗口
         self.destroy()
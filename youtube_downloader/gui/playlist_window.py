@@ -2,17 +2,22 @@
 播放列表下載窗口 - 處理播放列表的批量下載
 """
 import os
+import threading
 import customtkinter as ctk
 from PIL import Image
 
 from youtube_downloader.core.playlist import PlaylistProcessor
-from youtube_downloader.core.downloader import YouTubeDownloader
+from youtube_downloader.core.playlist_sync import PlaylistSync
 from youtube_downloader.core.history import DownloadHistory
+from youtube_downloader.core.utils import validate_playlist_url
+from youtube_downloader.core.event_bus import get_event_bus
 from youtube_downloader.gui.components.url_input import URLInput
 from youtube_downloader.gui.components.format_selector import FormatSelector
 from youtube_downloader.gui.components.quality_selector import QualitySelector
 from youtube_downloader.gui.components.path_selector import PathSelector
 from youtube_downloader.gui.components.progress_bar import ProgressBar
+from youtube_downloader.gui.components.virtual_list import VirtualList
+from youtube_downloader.config import PLAYLIST_VISIBLE_ROWS, PLAYLIST_TITLE_MAX_CHARS
 
 
 class PlaylistWindow(ctk.CTkToplevel):
@@ -33,9 +38,16 @@ class PlaylistWindow(ctk.CTkToplevel):
         self.geometry("1000x600")
         self.minsize(800, 600)
         
+        # 後台線程的回調經事件總線轉到界面線程處理 (每個窗口使用獨立的主題)
+        self.event_bus = get_event_bus()
+        self.playlist_topic = f"playlist:{id(self)}"
+        self.sync_topic = f"playlist_sync:{id(self)}"
+        self.event_bus.subscribe(self.playlist_topic, self._on_playlist_update)
+        self.event_bus.subscribe(self.sync_topic, self._on_sync_update)
+        
         # 創建核心組件
-        self.playlist_processor = PlaylistProcessor(callback=self._on_playlist_update)
-        self.downloader = YouTubeDownloader()
+        self.playlist_processor = PlaylistProcessor(callback=self.event_bus.publisher(self.playlist_topic))
+        self.playlist_sync = None
         # 使用傳入的歷史記錄管理器，如果沒有則創建新的
         self.history = history if history else DownloadHistory()
         
@@ -93,6 +105,7 @@ class PlaylistWindow(ctk.CTkToplevel):
             self,
             on_url_change=self._on_url_changed,
             on_url_submit=self._on_url_submitted,
+            validator=validate_playlist_url,
             fg_color="transparent"
         )
         
@@ -152,18 +165,26 @@ class PlaylistWindow(ctk.CTkToplevel):
             font=("Arial", 12)
         )
         
-        # 創建影片列表框架 - 改用滾動框架增強可視性
-        self.videos_list_frame = ctk.CTkScrollableFrame(
+        # 創建同步模式開關
+        self.sync_mode_var = ctk.BooleanVar(value=False)
+        self.sync_mode_switch = ctk.CTkSwitch(
             self.main_scrollable_frame,
-            label_text="播放列表影片",
-            label_font=("Arial", 12, "bold"),
-            height=200
+            text="同步模式 (只下載尚未下載過的影片)",
+            variable=self.sync_mode_var,
+            font=("Arial", 12)
         )
-        self.videos_list_frame.grid_columnconfigure(0, weight=1)  # 影片標題列
-        self.videos_list_frame.grid_columnconfigure(1, weight=0)  # 影片序號列
         
-        # 創建影片列表兩行表頭
-        self.video_items = []
+        # 創建影片列表 - 虛擬列表只為可見的行創建組件，數千個影片也能即時顯示
+        self.videos_list_frame = VirtualList(
+            self.main_scrollable_frame,
+            columns=[("影片標題", 1, "w"), ("序號", 0, "e")],
+            formatter=self._format_video_row,
+            visible_rows=PLAYLIST_VISIBLE_ROWS,
+            empty_text="播放列表中沒有影片",
+            on_visible_change=self._on_visible_videos_changed
+        )
+        # 已請求補全詳細信息的條目位置
+        self.detail_requested = set()
         
         # 創建進度條組件
         self.progress_bar = ProgressBar(self.main_scrollable_frame)
@@ -228,6 +249,9 @@ class PlaylistWindow(ctk.CTkToplevel):
         # 布局嵌入縮圖開關
         self.embed_thumbnail_switch.pack(fill="x", padx=0, pady=(0, padding))
         
+        # 布局同步模式開關
+        self.sync_mode_switch.pack(fill="x", padx=0, pady=(0, padding))
+        
         # 布局進度條組件
         self.progress_bar.pack(fill="x", padx=0, pady=(0, padding))
         
@@ -281,11 +305,25 @@ class PlaylistWindow(ctk.CTkToplevel):
         status = info.get('status', '')
         print(f"\033[1;36m收到播放列表更新狀態: {status}, 訊息: {info.get('message', '')}, 是否下載完成: {info.get('downloaded', False)}\033[0m")
         
-        if status == 'extracting':
+        if status == 'entry_detail':
+            self._on_entry_detail(info.get('index'), info.get('entry', {}))
+            
+        elif status == 'listing':
+            self._on_listing_started(info.get('playlist_info', {}))
+            
+        elif status == 'entry':
+            self._on_entry_listed(info.get('index'), info.get('entry', {}))
+            
+        elif status == 'listed':
+            # 邊列出邊下載時列出完成，保存播放列表信息以便之後重新下載
+            self.playlist_info = info.get('playlist_info')
+            self._update_playlist_details()
+            
+        elif status == 'extracting':
             # 顯示提取中信息
             self.progress_bar.update_progress({
                 'status': 'starting',
-                'message': '正在獲取播放列表信息...'
+                'message': info.get('message', '正在獲取播放列表信息...')
             })
             
         # 特別處理批量下載完成的情況
@@ -352,8 +390,11 @@ class PlaylistWindow(ctk.CTkToplevel):
             self.playlist_info = playlist_info
             print(f"\033[1;36m成功設置播放列表信息: {self.playlist_info.get('title')}, 影片數量: {len(self.playlist_info.get('entries', []))}\033[0m")
             
-            # 更新界面
-            self._update_playlist_info_ui()
+            # 更新界面 (影片行已逐個顯示時只更新詳情)
+            if len(self.videos_list_frame.items) == len(playlist_info['entries']):
+                self._update_playlist_details()
+            else:
+                self._update_playlist_info_ui()
                 
         elif status == 'error':
             # 顯示錯誤信息
@@ -457,7 +498,7 @@ class PlaylistWindow(ctk.CTkToplevel):
                 self.progress_bar.update_progress({
                     'status': 'downloading',
                     'percent': progress,
-                    'speed': info.get('speed', ''),
+                    'speed': info.get('speed'),
                     'downloaded': f"{info.get('completed_videos', current)}/{info.get('total_videos', total)} 個影片"
                 })
             
@@ -481,12 +522,7 @@ class PlaylistWindow(ctk.CTkToplevel):
         self.playlist_title_label.configure(text=title)
         
         # 更新播放列表詳情
-        uploader = self.playlist_info.get('uploader', '未知上傳者')
-        entries = self.playlist_info.get('entries', [])
-        video_count = len(entries)
-        
-        details_text = f"上傳者: {uploader} | 影片數量: {video_count}"
-        self.playlist_details_label.configure(text=details_text)
+        self._update_playlist_details()
         
         # 顯示影片列表框架 - 不使用after參數，直接放在滾動框架內
         self.videos_list_frame.pack(fill="both", expand=True, padx=0, pady=(0, 10))
@@ -494,79 +530,112 @@ class PlaylistWindow(ctk.CTkToplevel):
         # 更新影片列表
         self._update_videos_list()
     
+    def _update_playlist_details(self):
+        """更新播放列表詳情標籤"""
+        if not self.playlist_info:
+            return
+        
+        uploader = self.playlist_info.get('uploader', '未知上傳者')
+        video_count = len(self.playlist_info.get('entries', []))
+        
+        details_text = f"上傳者: {uploader} | 影片數量: {video_count}"
+        self.playlist_details_label.configure(text=details_text)
+    
     def _update_videos_list(self):
         """更新影片列表"""
-        # 清除現有項目
-        for widget in self.video_items:
-            widget.destroy()
-        self.video_items = []
-        
-        # 獲取影片列表
         entries = self.playlist_info.get('entries', [])
+        self.videos_list_frame.set_items(list(entries))
+    
+    def _clear_videos_list(self):
+        """清除影片列表中的所有項目"""
+        self.detail_requested = set()
+        self.videos_list_frame.clear()
+    
+    def _format_video_row(self, i, video):
+        """
+        生成影片行的顯示文本
         
-        if not entries:
-            # 創建無影片提示
-            no_video_label = ctk.CTkLabel(
-                self.videos_list_frame,
-                text="播放列表中沒有影片",
-                font=("Arial", 12),
-                anchor="center"
-            )
-            no_video_label.grid(row=0, column=0, columnspan=2, pady=20)
-            self.video_items.append(no_video_label)
-            return
-            
-        # 添加標題行
-        title_label = ctk.CTkLabel(
-            self.videos_list_frame,
-            text="影片標題",
-            font=("Arial", 12, "bold"),
-            anchor="w"
-        )
-        title_label.grid(row=0, column=0, sticky="w", padx=5, pady=(0, 10))
-        self.video_items.append(title_label)
+        Args:
+            i (int): 影片在播放列表中的位置
+            video (dict): 影片信息，尚未列出時為 None
         
-        number_label = ctk.CTkLabel(
-            self.videos_list_frame,
-            text="序號",
-            font=("Arial", 12, "bold"),
-            anchor="e"
-        )
-        number_label.grid(row=0, column=1, sticky="e", padx=5, pady=(0, 10))
-        self.video_items.append(number_label)
-        
-        # 添加分隔線
-        separator = ctk.CTkFrame(
-            self.videos_list_frame,
-            height=1,
-            fg_color="gray"
+        Returns:
+            tuple: (影片標題, 序號)
+        """
+        if video is None:
+            return "", f"#{i+1}"
+        title = video.get('title', f'未知標題 {i+1}')
+        # 行高固定，過長的標題截斷顯示
+        if len(title) > PLAYLIST_TITLE_MAX_CHARS:
+            title = title[:PLAYLIST_TITLE_MAX_CHARS - 1] + "…"
+        return title, f"#{i+1}"
+    
+    def _on_visible_videos_changed(self, start, end):
+        """
+        影片列表可見範圍變化時，在後台補全可見影片缺少的標題
+        
+        Args:
+            start (int): 第一個可見條目的位置
+            end (int): 最後一個可見條目之後的位置
+        """
+        items = self.videos_list_frame.items
+        self._request_missing_details((i, items[i]) for i in range(start, end) if items[i] is not None)
+    
+    def _request_missing_details(self, items):
+        """
+        快速列表模式下缺少標題的影片在後台補全 (每個條目只請求一次)
+        
+        Args:
+            items (iterable): (條目位置, 影片信息) 對
+        """
+        missing = [
+            (i, video) for i, video in items
+            if i not in self.detail_requested
+            and video.get('needs_detail') and video.get('title', '').startswith('未知標題')
+        ]
+        if missing:
+            self.detail_requested.update(i for i, video in missing)
+            self.playlist_processor.fetch_entry_details_async(missing)
+    
+    def _on_listing_started(self, playlist_meta):
+        """
+        播放列表開始逐個列出影片時顯示基本信息
+        
+        Args:
+            playlist_meta (dict): 播放列表基本信息 (不含條目)
+        """
+        self.playlist_info_frame.pack(fill="x", padx=0, pady=(0, 10))
+        self.playlist_title_label.configure(text=playlist_meta.get('title', '未知播放列表'))
+        self.playlist_details_label.configure(
+            text=f"上傳者: {playlist_meta.get('uploader', '未知上傳者')} | 正在列出影片..."
         )
-        separator.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(0, 10))
-        self.video_items.append(separator)
-        
-        # 添加影片項目
-        for i, video in enumerate(entries):
-            # 影片標題
-            title = video.get('title', f'未知標題 {i+1}')
-            title_label = ctk.CTkLabel(
-                self.videos_list_frame,
-                text=title,
-                font=("Arial", 12),
-                anchor="w",
-                wraplength=500
-            )
-            title_label.grid(row=i+2, column=0, sticky="w", padx=5, pady=2)
-            self.video_items.append(title_label)
-            
-            # 影片序號
-            number_label = ctk.CTkLabel(
-                self.videos_list_frame,
-                text=f"#{i+1}",
-                font=("Arial", 12),
-                anchor="e"
-            )
-            number_label.grid(row=i+2, column=1, sticky="e", padx=5, pady=2)
-            self.video_items.append(number_label)
+        
+        self.videos_list_frame.pack(fill="both", expand=True, padx=0, pady=(0, 10))
+        self._clear_videos_list()
+    
+    def _on_entry_listed(self, index, entry):
+        """
+        逐個顯示新列出的影片
+        
+        Args:
+            index (int): 影片在播放列表中的位置
+            entry (dict): 影片信息
+        """
+        items = self.videos_list_frame.items
+        if index < len(items) and items[index] is not None:
+            return
+        self.videos_list_frame.set_item(index, entry)
+    
+    def _on_entry_detail(self, index, entry):
+        """
+        更新補全了詳細信息的影片行
+        
+        Args:
+            index (int): 條目位置
+            entry (dict): 播放列表影片信息
+        """
+        if index < len(self.videos_list_frame.items):
+            self.videos_list_frame.set_item(index, entry)
     
     def _clear_playlist_info(self):
         """清除播放列表信息"""
@@ -582,9 +651,7 @@ class PlaylistWindow(ctk.CTkToplevel):
         self.playlist_details_label.configure(text="")
         
         # 清除影片列表
-        for widget in self.video_items:
-            widget.destroy()
-        self.video_items = []
+        self._clear_videos_list()
     
     def _on_format_changed(self, format_type):
         """
@@ -622,8 +689,9 @@ class PlaylistWindow(ctk.CTkToplevel):
         """下載按鈕點擊事件處理函數"""
         print("點擊了開始批量下載按鈕")
         
-        # 檢查是否有播放列表信息
-        if not self.playlist_info:
+        # 檢查是否有播放列表信息 (仍在列出時改為邊列出邊下載)
+        url = self.url_input.get_url()
+        if not self.playlist_info and not validate_playlist_url(url):
             print("無播放列表信息")
             self.progress_bar.update_progress({
                 'status': 'error',
@@ -632,7 +700,7 @@ class PlaylistWindow(ctk.CTkToplevel):
             return
             
         # 檢查是否有影片條目
-        if not self.playlist_info.get('entries'):
+        if self.playlist_info and not self.playlist_info.get('entries'):
             print("播放列表沒有影片條目")
             self.progress_bar.update_progress({
                 'status': 'error',
@@ -655,6 +723,24 @@ class PlaylistWindow(ctk.CTkToplevel):
             })
             return
         
+        if self.sync_mode_var.get():
+            # 同步模式：與上次的同步清單比對，只下載新影片
+            sync_url = url if validate_playlist_url(url) else self.playlist_info.get('webpage_url', '')
+            self._start_sync(sync_url, output_path, format_type.lower(), quality, embed_thumbnail)
+            return
+        
+        if not self.playlist_info:
+            # 播放列表尚未列出完成，邊列出邊下載
+            print(f"開始邊列出邊下載: {url}, 格式:{format_type}, 品質:{quality}")
+            self.playlist_processor.stream_download(
+                url=url,
+                output_path=output_path,
+                format_option=format_type.lower(),
+                quality_option=quality,
+                embed_thumbnail=embed_thumbnail
+            )
+            return
+        
         print(f"開始批量下載: {len(self.playlist_info.get('entries', []))}個影片, 格式:{format_type}, 品質:{quality}")
         
         # 開始批量下載
@@ -663,12 +749,89 @@ class PlaylistWindow(ctk.CTkToplevel):
             output_path=output_path,
             format_option=format_type.lower(),
             quality_option=quality,
-            embed_thumbnail=embed_thumbnail,
-            downloader=self.downloader
+            embed_thumbnail=embed_thumbnail
+        )
+    
+    def _start_sync(self, url, output_path, format_option, quality_option, embed_thumbnail):
+        """
+        在後台線程中同步播放列表
+        
+        Args:
+            url (str): 播放列表或頻道 URL
+            output_path (str): 輸出路徑
+            format_option (str): 格式選項
+            quality_option (str): 品質選項
+            embed_thumbnail (bool): 是否嵌入縮圖
+        """
+        if self.playlist_sync:
+            self.progress_bar.update_progress({
+                'status': 'error',
+                'error': '同步正在進行中'
+            })
+            return
+        
+        self.progress_bar.update_progress({
+            'status': 'starting',
+            'message': '正在比對同步清單...'
+        })
+        
+        self.playlist_sync = PlaylistSync(
+            callback=self.event_bus.publisher(self.sync_topic, key_field='job_id')
         )
+        
+        def run_sync():
+            sync = self.playlist_sync
+            try:
+                sync.sync(url, output_path, format_option, quality_option, embed_thumbnail)
+            finally:
+                sync.shutdown()
+                self.playlist_sync = None
+        
+        sync_thread = threading.Thread(target=run_sync)
+        sync_thread.daemon = True
+        sync_thread.start()
+    
+    def _on_sync_update(self, info):
+        """
+        處理同步事件並更新界面 (經事件總線在界面線程中調用)
+        
+        Args:
+            info (dict): 同步事件信息
+        """
+        status = info.get('status', '')
+        
+        if status == 'sync_listed':
+            self.progress_bar.update_progress({
+                'status': 'starting',
+                'message': info.get('message', '')
+            })
+        elif status == 'downloading':
+            self.progress_bar.update_progress(info)
+        elif status == 'complete' and info.get('info'):
+            # 新下載的影片添加到歷史記錄 (使用任務提交時的選項)
+            job_options = info.get('options') or {}
+            download_options = {
+                'format': job_options.get('format', self.format_selector.get_format().lower()),
+                'quality': job_options.get('quality', self.quality_selector.get_quality()),
+                'embed_thumbnail': job_options.get('embed_thumbnail', self.embed_thumbnail)
+            }
+            self.history.add_record(info['info'], download_options, info.get('filename', ''))
+        elif status == 'sync_complete':
+            self.progress_bar.update_progress({
+                'status': 'success',
+                'message': info.get('message', '同步完成')
+            })
+        elif status == 'error':
+            self.progress_bar.update_progress(info)
     
     def _on_cancel_clicked(self):
         """取消按鈕點擊事件處理函數"""
+        # 如果正在同步，則取消同步
+        if self.playlist_sync:
+            self.playlist_sync.cancel()
+            self.progress_bar.update_progress({'status': 'cancelled'})
+            return
+        
         # 如果正在下載，則取消下載
         if self.playlist_processor.is_processing:
             self.playlist_processor.cancel()
@@ -678,9 +841,18 @@ class PlaylistWindow(ctk.CTkToplevel):
     
     def _on_close(self):
         """窗口關閉事件處理函數"""
+        # 如果正在同步，則取消同步
+        if self.playlist_sync:
+            self.playlist_sync.cancel()
+        
         # 如果正在下載，則取消下載
         if self.playlist_processor.is_processing:
             self.playlist_processor.cancel()
+        self.playlist_processor.shutdown()
+        
+        # 停止接收後台事件
+        self.event_bus.unsubscribe(self.playlist_topic)
+        self.event_bus.unsubscribe(self.sync_topic)
         
         # 釋放窗口
         self.grab_release()